@@ -1,6 +1,6 @@
 import numpy as np
 from tqdm import tqdm
-from src.tile_coding import IHT, tiles
+from src.tile_coding import IHT, GridTileCoder, TileCache, tiles
 
 # region Hyper-parameters
 
@@ -104,13 +104,16 @@ class ValueFunction:
 
     # region Constructor
 
-    def __init__(self, num_of_tilings, ss_state_action_value=step_size_state_action_value, ss_average_reward=step_size_average_reward):
+    def __init__(self, num_of_tilings, ss_state_action_value=step_size_state_action_value, ss_average_reward=step_size_average_reward,
+                 use_grid_tiles: bool = False, cache_size: int = 1024):
         # region Summary
         """
         Constructor of ValueFunction class
         :param num_of_tilings: Number of tilings
         :param ss_state_action_value: Step-size parameter for learning state-action value (denoted as 𝛼)
         :param ss_average_reward: Step-size parameter for learning average reward (denoted as 𝛽)
+        :param use_grid_tiles: if True, compute tile indices directly on the bounded grid (GridTileCoder) instead of hashing them into an IHT
+        :param cache_size: Maximum number of memoized active tile lookups (0 disables the cache)
         """
         # endregion Summary
 
@@ -126,15 +129,29 @@ class ValueFunction:
         # The maximum number of indices
         self.max_size = 2048
 
+        # State features (server and priority) need scaling to satisfy the tile software
+        self.server_scale = self.num_of_tilings / float(number_of_servers)
+        self.priority_scale = self.num_of_tilings / float(len(priorities) - 1)
+
+        # Servers, priorities and actions are bounded, so the grid tile coder has exactly 1 index per tile (no collisions)
+        self.grid_tile_coder = None
+        if use_grid_tiles:
+            self.grid_tile_coder = GridTileCoder(num_tilings=self.num_of_tilings,
+                                                 float_bounds=[(0., self.server_scale * number_of_servers),
+                                                               (self.priority_scale * priorities[0], self.priority_scale * priorities[-1])],
+                                                 int_bounds=[(min(actions.values()), max(actions.values()))])
+            self.max_size = self.grid_tile_coder.size
+
         # Hash table
         self.hash_table = IHT(self.max_size)
 
         # Weight for each tile
         self.weights = np.zeros(self.max_size)
 
-        # State features (server and priority) need scaling to satisfy the tile software
-        self.server_scale = self.num_of_tilings / float(number_of_servers)
-        self.priority_scale = self.num_of_tilings / float(len(priorities) - 1)
+        # Memo cache of active tiles: there are only (servers + 1) × priorities × actions different lookups
+        self.tile_cache = None
+        if cache_size > 0:
+            self.tile_cache = TileCache(self.grid_tile_coder if use_grid_tiles else self.hash_table, self.num_of_tilings, cache_size)
 
         # Initialize average reward with 0
         self.average_reward = 0.0
@@ -158,6 +175,12 @@ class ValueFunction:
 
         # region Body
 
+        if self.tile_cache is not None:
+            return self.tile_cache.tiles(floats=[self.server_scale * free_servers, self.priority_scale * priority], ints=[action])
+
+        if self.grid_tile_coder is not None:
+            return self.grid_tile_coder.tiles(floats=[self.server_scale * free_servers, self.priority_scale * priority], ints=[action])
+
         active_tiles = tiles(iht_or_size=self.hash_table,
                              num_tilings=self.num_of_tilings,
                              floats=[self.server_scale * free_servers, self.priority_scale * priority],
@@ -0,0 +1,95 @@
+import time
+import tracemalloc
+
+import numpy as np
+
+from src.access_control import ValueFunction, actions, number_of_servers, priorities
+
+# region Helpers
+
+def time_lookups(value_function, states, repeats):
+    # region Summary
+    """
+    Time get_active_tiles() over the same states several times
+    :param value_function: ValueFunction
+    :param states: List of (free servers, priority, action)
+    :param repeats: Number of timed repetitions
+    :return: Best time per lookup (in seconds)
+    """
+    # endregion Summary
+
+    # region Body
+
+    times = []
+
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for free_servers, priority, action in states:
+            value_function.get_active_tiles(free_servers, priority, action)
+        times.append(time.perf_counter() - start)
+
+    return min(times) / len(states)
+
+    # endregion Body
+
+# endregion Helpers
+
+# region Functions
+
+def benchmark_grid_tile_coder(lookups=10000, repeats=5, num_of_tilings=8):
+    # region Summary
+    """
+    Compare ValueFunction.get_active_tiles() with the IHT (hashing) and with the GridTileCoder (direct indexing),
+    also against GridTileCoder.tiles_batch() over all states at once,
+    on states spread over all numbers of free servers, priorities and actions.
+    Memory of the IHT is measured with tracemalloc while it is filled, the GridTileCoder keeps no table at all.
+    :param lookups: Number of (free servers, priority, action) lookups per repetition
+    :param repeats: Number of timed repetitions (the best one is reported, the first one also fills the IHT)
+    :param num_of_tilings: Number of tilings
+    :return: Dictionary of "tile coder: dictionary of results" and the speedups per lookup
+    """
+    # endregion Summary
+
+    # region Body
+
+    states = list(zip(np.random.randint(number_of_servers + 1, size=lookups).tolist(),
+                      np.random.choice(priorities, lookups).tolist(),
+                      np.random.choice(list(actions.values()), lookups).tolist()))
+
+    results = dict()
+
+    for name, use_grid_tiles in (("hash", False), ("grid", True)):
+        # Without the memo cache, every lookup is timed
+        value_function = ValueFunction(num_of_tilings, use_grid_tiles=use_grid_tiles, cache_size=0)
+
+        # Memory allocated by the first pass (the IHT grows, the grid tile coder allocates nothing that stays)
+        tracemalloc.start()
+        for free_servers, priority, action in states:
+            value_function.get_active_tiles(free_servers, priority, action)
+        table_bytes = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+
+        results[name] = dict(seconds_per_lookup=time_lookups(value_function, states, repeats),
+                             table_bytes=table_bytes,
+                             weights_bytes=value_function.weights.nbytes,
+                             tiles=value_function.max_size if use_grid_tiles else value_function.hash_table.count(),
+                             collisions=value_function.hash_table.overfull_count)
+
+    # All lookups in 1 vectorized call of the grid tile coder
+    floats = np.array([[value_function.server_scale * free_servers, value_function.priority_scale * priority] for free_servers, priority, _ in states])
+    ints = np.array([[action] for _, _, action in states])
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        value_function.grid_tile_coder.tiles_batch(floats, ints)
+        times.append(time.perf_counter() - start)
+    results["grid (batched)"] = dict(seconds_per_lookup=min(times) / lookups)
+
+    results["speedup"] = results["hash"]["seconds_per_lookup"] / results["grid"]["seconds_per_lookup"]
+    results["batched speedup"] = results["hash"]["seconds_per_lookup"] / results["grid (batched)"]["seconds_per_lookup"]
+
+    return results
+
+    # endregion Body
+
+# endregion Functions
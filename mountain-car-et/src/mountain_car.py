@@ -1,6 +1,6 @@
 import numpy as np
 
-from src.tile_coding import IHT, tiles
+from src.tile_coding import IHT, TileCache, tiles
 
 # region Hyper-parameters
 
@@ -22,6 +22,12 @@ exploration_probability = 0
 # Maximum steps per episode
 step_limit = 5000
 
+# Sparse traces drop entries whose magnitude falls under this threshold
+trace_threshold = 1e-6
+
+# Sparse traces fold their global scale into the stored entries once it falls under this value
+minimum_trace_scale = 1e-6
+
 # endregion Hyper-parameters
 
 # region Helpers
@@ -101,6 +107,11 @@ def accumulating_trace(trace, active_tiles, trace_decay):
     # region Body
 
     # Update the ET vector
+    if isinstance(trace, SparseTrace):
+        trace.decay(discount * trace_decay)
+        trace.add(active_tiles, 1)
+        return trace
+
     trace *= discount * trace_decay
     trace[active_tiles] += 1
 
@@ -122,10 +133,16 @@ def dutch_trace(trace, active_tiles, trace_decay, step_size):
 
     # region Body
 
+    # Update the ET vector
+    if isinstance(trace, SparseTrace):
+        coefficient = 1 - step_size * discount * trace_decay * np.sum(trace.get_values(active_tiles))
+        trace.decay(discount * trace_decay)
+        trace.add(active_tiles, coefficient)
+        return trace
+
     # Calculate the coefficient of 2nd additive in the Equation (12.11)
     coefficient = 1 - step_size * discount * trace_decay * np.sum(trace[active_tiles])
 
-    # Update the ET vector
     trace *= discount * trace_decay
     trace[active_tiles] += coefficient
 
@@ -146,8 +163,14 @@ def replacing_trace(trace, active_tiles, trace_decay):
 
     # region Body
 
+    # A sparse trace decays every component, then replaces the active ones
+    if isinstance(trace, SparseTrace):
+        trace.decay(discount * trace_decay)
+        trace.replace(active_tiles, 1)
+        return trace
+
     # The replacing trace is defined on a component-by-component basis depending on whether the component of the feature vector was:
-    active = np.in1d(np.arange(len(trace)), active_tiles)
+    active = np.isin(np.arange(len(trace)), active_tiles)
 
     # a. active (= 1),
     trace[active] = 1
@@ -173,8 +196,15 @@ def replacing_trace_with_clearing(trace, active_tiles, trace_decay, clearing_til
 
     # region Body
 
+    # A sparse trace decays every component, clears the tiles of the other actions, then replaces the active ones
+    if isinstance(trace, SparseTrace):
+        trace.decay(discount * trace_decay)
+        trace.clear(clearing_tiles)
+        trace.replace(active_tiles, 1)
+        return trace
+
     # The replacing trace is defined on a component-by-component basis depending on whether the component of the feature vector was:
-    active = np.in1d(np.arange(len(trace)), active_tiles)
+    active = np.isin(np.arange(len(trace)), active_tiles)
 
     # a. inactive (= 0),
     trace[~active] *= discount * trace_decay
@@ -192,6 +222,226 @@ def replacing_trace_with_clearing(trace, active_tiles, trace_decay, clearing_til
 # endregion Eligibility Traces
 
 
+class SparseTrace:
+    # region Summary
+    """
+    Sparse eligibility trace (𝒛) with lazy decay, for SARSA(𝜆) with many more tiles than recently active ones.
+    Only non-negligible entries are stored, as z_i = scale * entries[i]: decaying the whole trace only multiplies the global scale.
+    Weight updates (𝒘 ← 𝒘 + 𝛼𝛿𝒛) are deferred the same way: the true weight of a tile is weights[i] + increment * entries[i],
+    so a step only adds 𝛼𝛿 * scale to the global increment. Whenever an entry changes, weights[i] is adjusted to keep its true weight.
+    Once the scale falls under minimum_trace_scale, scale and increment are folded into the stored entries and weights
+    (and entries under trace_threshold are dropped), so the cost of a step is proportional to the number of active tiles
+    (the folding is amortized over the many steps it takes the scale to fall).
+    Until then weights lags behind the true weights: call fold() before reading it directly (save_model() does so).
+    """
+    # endregion Summary
+
+    # region Constructor
+
+    def __init__(self, weights, threshold=trace_threshold, minimum_scale=minimum_trace_scale):
+        # region Summary
+        """
+        Constructor of SparseTrace class
+        :param weights: Weight vector the trace is applied to (its entries are adjusted in place)
+        :param threshold: Entries whose magnitude falls under this threshold are dropped
+        :param minimum_scale: Scale under which the scale and the increment are folded into the entries and the weights
+        """
+        # endregion Summary
+
+        # region Body
+
+        self.weights = weights
+        self.threshold = threshold
+        self.minimum_scale = minimum_scale
+
+        # Stored entries (tile: z_i / scale), global scale and deferred weight increment
+        self.entries = dict()
+        self.scale = 1.0
+        self.increment = 0.0
+
+        # endregion Body
+
+    # endregion Constructor
+
+    # region Functions
+
+    def get_weights(self, tiles):
+        # region Summary
+        """
+        Get the true weights of given tiles (including the deferred updates)
+        :param tiles: Tile indices
+        :return: Weights
+        """
+        # endregion Summary
+
+        # region Body
+
+        return np.array([self.weights[tile] + self.increment * self.entries.get(tile, 0.0) for tile in tiles])
+
+        # endregion Body
+
+    def get_values(self, tiles):
+        # region Summary
+        """
+        Get the trace values of given tiles
+        :param tiles: Tile indices
+        :return: Trace values
+        """
+        # endregion Summary
+
+        # region Body
+
+        return np.array([self.scale * self.entries.get(tile, 0.0) for tile in tiles])
+
+        # endregion Body
+
+    def set_entry(self, tile, entry):
+        # region Summary
+        """
+        Change the stored entry of a tile, keeping its true weight
+        :param tile: Tile index
+        :param entry: New stored entry (z_i / scale)
+        """
+        # endregion Summary
+
+        # region Body
+
+        self.weights[tile] -= self.increment * (entry - self.entries.get(tile, 0.0))
+        self.entries[tile] = entry
+
+        # endregion Body
+
+    def add(self, tiles, amount):
+        # region Summary
+        """
+        Add an amount to the trace of given tiles (every distinct tile once, like trace[tiles] += amount)
+        :param tiles: Tile indices
+        :param amount: Amount
+        """
+        # endregion Summary
+
+        # region Body
+
+        for tile in dict.fromkeys(tiles):
+            self.set_entry(tile, self.entries.get(tile, 0.0) + amount / self.scale)
+
+        # endregion Body
+
+    def replace(self, tiles, value):
+        # region Summary
+        """
+        Set the trace of given tiles (like trace[tiles] = value)
+        :param tiles: Tile indices
+        :param value: Value
+        """
+        # endregion Summary
+
+        # region Body
+
+        for tile in dict.fromkeys(tiles):
+            self.set_entry(tile, value / self.scale)
+
+        # endregion Body
+
+    def clear(self, tiles):
+        # region Summary
+        """
+        Set the trace of given tiles to 0 and stop storing them
+        :param tiles: Tile indices
+        """
+        # endregion Summary
+
+        # region Body
+
+        for tile in dict.fromkeys(tiles):
+            if tile in self.entries:
+                self.weights[tile] += self.increment * self.entries.pop(tile)
+
+        # endregion Body
+
+    def decay(self, factor):
+        # region Summary
+        """
+        Multiply the whole trace by a factor (like trace *= factor)
+        :param factor: Factor (e.g. 𝛾𝜆)
+        """
+        # endregion Summary
+
+        # region Body
+
+        # A trace decaying to 0 is simply cleared
+        if factor == 0:
+            self.clear(list(self.entries))
+            return
+
+        self.scale *= factor
+
+        if self.scale < self.minimum_scale:
+            self.fold()
+
+        # endregion Body
+
+    def update_weights(self, coefficient):
+        # region Summary
+        """
+        Add the trace times a coefficient to the weights (like weights += coefficient * trace)
+        :param coefficient: Coefficient (e.g. 𝛼𝛿)
+        """
+        # endregion Summary
+
+        # region Body
+
+        self.increment += coefficient * self.scale
+
+        # endregion Body
+
+    def fold(self):
+        # region Summary
+        """
+        Fold the scale and the deferred weight increment into the stored entries and the weights,
+        and drop the entries under the threshold
+        """
+        # endregion Summary
+
+        # region Body
+
+        if self.entries:
+            tiles = np.fromiter(self.entries.keys(), dtype=np.int64, count=len(self.entries))
+            entries = np.fromiter(self.entries.values(), dtype=float, count=len(self.entries))
+
+            # Tiles are distinct, so every weight gets exactly its own deferred update
+            self.weights[tiles] += self.increment * entries
+
+            values = self.scale * entries
+            kept = np.abs(values) >= self.threshold
+            self.entries = dict(zip(tiles[kept].tolist(), values[kept].tolist()))
+
+        self.scale = 1.0
+        self.increment = 0.0
+
+        # endregion Body
+
+    def to_dense(self):
+        # region Summary
+        """
+        Get the trace as a dense vector (e.g. to compare it with the dense update rules)
+        :return: Trace of the same size as the weights
+        """
+        # endregion Summary
+
+        # region Body
+
+        trace = np.zeros(len(self.weights))
+        for tile, entry in self.entries.items():
+            trace[tile] = self.scale * entry
+
+        return trace
+
+        # endregion Body
+
+    # endregion Functions
+
+
 class SARSA:
     # region Summary
     """
@@ -205,7 +455,8 @@ class SARSA:
 
     # region Constructor
 
-    def __init__(self, step_size, trace_decay, trace_update=accumulating_trace, num_of_tilings=8, max_size=2048):
+    def __init__(self, step_size, trace_decay, trace_update=accumulating_trace, num_of_tilings=8, max_size=2048, cache_size: int = 1024,
+                 sparse_trace: bool = False):
         # region Summary
         """
         Constructor of SARSA class
@@ -214,6 +465,9 @@ class SARSA:
         :param trace_update: Eligibility trace type (accumulating, Dutch, replacing)
         :param num_of_tilings: Number of tilings
         :param max_size: The maximum number of indices
+        :param cache_size: Maximum number of memoized active tile lookups (0 disables the cache)
+        :param sparse_trace: if True, keep the trace as a SparseTrace (lazy decay and deferred weight updates), so a step costs
+                             in proportion to the active tiles instead of max_size
         """
         # endregion Summary
 
@@ -230,16 +484,22 @@ class SARSA:
         # Hash table
         self.hash_table = IHT(max_size)
 
-        # Weight for each tile
+        # Weight for each tile (with a sparse trace, call trace.fold() before reading them directly,
+        # get_weights() includes the deferred updates)
         self.weights = np.zeros(max_size)
 
         # Trace for each tile
-        self.trace = np.zeros(max_size)
+        self.trace = SparseTrace(self.weights) if sparse_trace else np.zeros(max_size)
 
         # State features (position and velocity) need scaling to satisfy the tile software
         self.position_scale = self.num_of_tilings / (POSITION["max"] - POSITION["min"])
         self.velocity_scale = self.num_of_tilings / (VELOCITY["max"] - VELOCITY["min"])
 
+        # Memo cache of active tiles: action selection, value and learning look up the same (state, action) within and across steps
+        self.tile_cache = None
+        if cache_size > 0:
+            self.tile_cache = TileCache(self.hash_table, self.num_of_tilings, cache_size)
+
         # endregion Body
 
     # endregion Constructor
@@ -259,6 +519,9 @@ class SARSA:
 
         # region Body
 
+        if self.tile_cache is not None:
+            return self.tile_cache.tiles(floats=[self.position_scale * position, self.velocity_scale * velocity], ints=[action])
+
         # Probably, position_scale * (position - position_min) would be a good normalization.
         # However, position_scale * position_min is a constant, so it's OK to ignore it.
         active_tiles = tiles(iht_or_size=self.hash_table,
@@ -270,6 +533,24 @@ class SARSA:
 
         # endregion Body
 
+    def get_weights(self, active_tiles):
+        # region Summary
+        """
+        Get the weights of given tiles
+        :param active_tiles: Tile indices
+        :return: Weights (including the updates deferred by a sparse trace)
+        """
+        # endregion Summary
+
+        # region Body
+
+        if isinstance(self.trace, SparseTrace):
+            return self.trace.get_weights(active_tiles)
+
+        return self.weights[active_tiles]
+
+        # endregion Body
+
     def value(self, position, velocity, action):
         # region Summary
         """
@@ -293,7 +574,7 @@ class SARSA:
             active_tiles = self.get_active_tiles(position, velocity, action)
 
             # Calculate value estimate
-            value_estimate = np.sum(self.weights[active_tiles])
+            value_estimate = np.sum(self.get_weights(active_tiles))
 
         return value_estimate
 
@@ -316,7 +597,7 @@ class SARSA:
         active_tiles = self.get_active_tiles(position, velocity, action)
 
         # Calculate value estimate
-        value_estimation = np.sum(self.weights[active_tiles])
+        value_estimation = np.sum(self.get_weights(active_tiles))
 
         # Calculate TD error (denoted as 𝛿)
         TD_error = target - value_estimation
@@ -349,8 +630,11 @@ class SARSA:
         else:
             raise Exception("Unexpected Trace Type")
 
-        # Update weights (equation on page 303)
-        self.weights += self.step_size * TD_error * self.trace
+        # Update weights (equation on page 303), a sparse trace defers the update
+        if isinstance(self.trace, SparseTrace):
+            self.trace.update_weights(self.step_size * TD_error)
+        else:
+            self.weights += self.step_size * TD_error * self.trace
 
         # endregion Body
 
@@ -384,11 +668,12 @@ class SARSA:
 
 # region Functions
 
-def play(evaluator):
+def play(evaluator, recorder=None):
     # region Summary
     """
     Play for 1 episode based on given method evaluator
     :param evaluator: Given method
+    :param recorder: EpisodeRecorder to record the episode with (None to not record it)
     :return: Total steps in this episode
     """
     # endregion Summary
@@ -404,6 +689,9 @@ def play(evaluator):
     # Get initial action
     current_action = get_action(current_position, current_velocity, evaluator)
 
+    if recorder is not None:
+        recorder.record(current_position, current_velocity, current_action)
+
     # Track the steps
     steps = 0
 
@@ -417,6 +705,9 @@ def play(evaluator):
         # Increment steps
         steps += 1
 
+        if recorder is not None:
+            recorder.record(next_position, next_velocity, next_action, reward)
+
         # Calculate target
         target = reward + discount *evaluator.value(next_position, next_velocity, next_action)
 
@@ -441,6 +732,9 @@ def play(evaluator):
                 print(" - Step Limit Exceeded!")
                 break
 
+    if recorder is not None:
+        recorder.end_episode(truncated=next_position != POSITION["max"])
+
     return steps
     # endregion Body
 
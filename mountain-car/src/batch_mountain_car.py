@@ -0,0 +1,507 @@
+import numpy as np
+
+from src import mountain_car
+from src.mountain_car import POSITION, VELOCITY, ValueFunction, all_actions
+from src.tile_coding import GridTileCoder
+
+class BatchMountainCar:
+    # region Summary
+    """
+    N independent mountain cars stepped in lockstep.
+    Positions and velocities are (N,) arrays, so one call to step() advances every car with a handful of vectorized
+    NumPy operations, with exactly the dynamics of step() in mountain_car.
+    Every car terminates on its own (when it reaches the right bound) and can be reset on its own.
+    """
+    # endregion Summary
+
+    # region Constructor
+
+    def __init__(self, cars):
+        # region Summary
+        """
+        Constructor of BatchMountainCar class
+        :param cars: Number of cars
+        """
+        # endregion Summary
+
+        # region Body
+
+        self.cars = cars
+
+        self.positions = np.zeros(cars)
+        self.velocities = np.zeros(cars)
+
+        self.reset()
+
+        # endregion Body
+
+    # endregion Constructor
+
+    # region Functions
+
+    def reset(self, cars=None):
+        # region Summary
+        """
+        Start new episodes: a random position around the bottom of the valley and 0 velocity
+        :param cars: Indices (or boolean mask) of the cars to reset, all cars if None
+        """
+        # endregion Summary
+
+        # region Body
+
+        if cars is None:
+            cars = np.arange(self.cars)
+
+        self.positions[cars] = np.random.uniform(-0.6, -0.4, size=self.positions[cars].shape)
+        self.velocities[cars] = 0.0
+
+        # endregion Body
+
+    def step(self, actions, cars=None):
+        # region Summary
+        """
+        Take an action in every given car
+        :param actions: Actions of the given cars (-1, 0 or 1)
+        :param cars: Indices (or boolean mask) of the cars to step, all cars if None
+        :return: New positions, new velocities, rewards (always -1) and terminations of the given cars
+        """
+        # endregion Summary
+
+        # region Body
+
+        if cars is None:
+            cars = slice(None)
+
+        positions = self.positions[cars]
+        velocities = self.velocities[cars]
+
+        # Calculate new velocities
+        new_velocities = np.clip(velocities + 0.001 * actions - 0.0025 * np.cos(3 * positions), VELOCITY["min"], VELOCITY["max"])
+
+        # Calculate new positions
+        new_positions = np.clip(positions + new_velocities, POSITION["min"], POSITION["max"])
+
+        # Cars which reached the left bound have their velocity reset to 0
+        new_velocities[new_positions == POSITION["min"]] = 0.0
+
+        self.positions[cars] = new_positions
+        self.velocities[cars] = new_velocities
+
+        # The reward is -1 on all time steps until the car moves past its goal position
+        rewards = np.full(len(new_positions), -1.0)
+
+        return new_positions, new_velocities, rewards, new_positions == POSITION["max"]
+
+        # endregion Body
+
+    # endregion Functions
+
+
+class BatchValueFunction:
+    # region Summary
+    """
+    N independent state-action VFs learned in lockstep (one per learner, each with its own step size).
+    Every learner uses the same grid tile coder (GridTileCoder), so the tile indices of all (learner, state, action)
+    inputs are computed in one batched call, and the weights of learner i are row i of a (N, size) array.
+    Grid tiles are the tiles of ValueFunction without the hashing, so every learner learns exactly like a ValueFunction
+    whose IHT never collides.
+    """
+    # endregion Summary
+
+    # region Constructor
+
+    def __init__(self, step_sizes, num_of_tilings=8):
+        # region Summary
+        """
+        Constructor of BatchValueFunction class
+        :param step_sizes: Step-size parameter of every learner, of shape (N,)
+        :param num_of_tilings: Number of tilings (shared by all learners)
+        """
+        # endregion Summary
+
+        # region Body
+
+        step_sizes = np.asarray(step_sizes, dtype=float)
+
+        self.learners = len(step_sizes)
+
+        # Divide step sizes equally to each tiling
+        self.step_sizes = step_sizes / num_of_tilings
+
+        self.num_of_tilings = num_of_tilings
+
+        # Same scaling as ValueFunction
+        self.position_scale = self.num_of_tilings / (POSITION["max"] - POSITION["min"])
+        self.velocity_scale = self.num_of_tilings / (VELOCITY["max"] - VELOCITY["min"])
+
+        self.grid_tile_coder = GridTileCoder(num_tilings=self.num_of_tilings,
+                                             float_bounds=[(self.position_scale * POSITION["min"], self.position_scale * POSITION["max"]),
+                                                           (self.velocity_scale * VELOCITY["min"], self.velocity_scale * VELOCITY["max"])],
+                                             int_bounds=[(min(all_actions.values()), max(all_actions.values()))])
+        self.max_size = self.grid_tile_coder.size
+
+        # Weights of every learner for each tile
+        self.weights = np.zeros((self.learners, self.max_size))
+
+        # endregion Body
+
+    # endregion Constructor
+
+    # region Functions
+
+    def get_active_tiles(self, positions, velocities, actions):
+        # region Summary
+        """
+        Get indices of active tiles for given states and actions
+        :param positions: Positions of shape (M,)
+        :param velocities: Velocities of shape (M,)
+        :param actions: Actions of shape (M,)
+        :return: Active tiles of shape (M, num_of_tilings)
+        """
+        # endregion Summary
+
+        # region Body
+
+        floats = np.column_stack([self.position_scale * np.asarray(positions), self.velocity_scale * np.asarray(velocities)])
+
+        return self.grid_tile_coder.tiles_batch(floats, np.asarray(actions, dtype=np.int64).reshape(-1, 1))
+
+        # endregion Body
+
+    def values(self, learners, positions, velocities, actions):
+        # region Summary
+        """
+        Estimate the value of given states and actions, each under the VF of its learner
+        :param learners: Learner of every state, of shape (M,)
+        :param positions: Positions of shape (M,)
+        :param velocities: Velocities of shape (M,)
+        :param actions: Actions of shape (M,)
+        :return: Value estimates of shape (M,), 0 for states at the right bound (the episode was terminated)
+        """
+        # endregion Summary
+
+        # region Body
+
+        active_tiles = self.get_active_tiles(positions, velocities, actions)
+        value_estimates = self.weights[np.asarray(learners)[:, np.newaxis], active_tiles].sum(axis=1)
+
+        return np.where(np.asarray(positions) == POSITION["max"], 0.0, value_estimates)
+
+        # endregion Body
+
+    def get_actions(self, learners, positions, velocities):
+        # region Summary
+        """
+        Get the action of every given learner at its state, based on ε-greedy policy (like get_action in mountain_car)
+        :param learners: Learners of shape (M,)
+        :param positions: Positions of shape (M,)
+        :param velocities: Velocities of shape (M,)
+        :return: Actions of shape (M,)
+        """
+        # endregion Summary
+
+        # region Body
+
+        learners = np.asarray(learners)
+        action_values = np.array(list(all_actions.values()))
+
+        # Values of all actions of all states in 1 batch, of shape (M, actions)
+        values = self.values(np.repeat(learners, len(action_values)),
+                             np.repeat(positions, len(action_values)),
+                             np.repeat(velocities, len(action_values)),
+                             np.tile(action_values, len(learners))).reshape(len(learners), len(action_values))
+
+        # Greedy action selection, breaking ties randomly: give every greedy action a random priority and every other action -1
+        is_greedy = values == np.max(values, axis=1, keepdims=True)
+        actions = action_values[np.argmax(np.where(is_greedy, np.random.rand(*values.shape), -1.), axis=1)]
+
+        # ε-greedy action selection
+        explore = np.random.binomial(n=1, p=mountain_car.exploration_probability, size=len(learners)) == 1
+        actions[explore] = np.random.choice(action_values, size=np.count_nonzero(explore))
+
+        return actions
+
+        # endregion Body
+
+    def learn(self, learners, positions, velocities, actions, targets):
+        # region Summary
+        """
+        Learn with given states, actions and targets, each in the VF of its learner
+        :param learners: Learners of shape (M,), without duplicates
+        :param positions: Positions of shape (M,)
+        :param velocities: Velocities of shape (M,)
+        :param actions: Actions of shape (M,)
+        :param targets: Targets of shape (M,)
+        """
+        # endregion Summary
+
+        # region Body
+
+        learners = np.asarray(learners)[:, np.newaxis]
+        active_tiles = self.get_active_tiles(positions, velocities, actions)
+
+        # Calculate value estimates and update sizes
+        value_estimations = self.weights[learners, active_tiles].sum(axis=1)
+        update_sizes = self.step_sizes[learners[:, 0]] * (targets - value_estimations)
+
+        # Active tiles of 1 state are distinct (1 per tiling) and learners are distinct, so no weight is updated twice
+        self.weights[learners, active_tiles] += update_sizes[:, np.newaxis]
+
+        # endregion Body
+
+    def value_function(self, learner):
+        # region Summary
+        """
+        Get the VF of 1 learner as a ValueFunction (e.g. for print_cost)
+        :param learner: Learner
+        :return: ValueFunction using grid tiles, with a copy of the weights of the learner
+        """
+        # endregion Summary
+
+        # region Body
+
+        value_function = ValueFunction(self.step_sizes[learner] * self.num_of_tilings, self.num_of_tilings, use_grid_tiles=True)
+        value_function.weights = np.array(self.weights[learner])
+
+        return value_function
+
+        # endregion Body
+
+    # endregion Functions
+
+# region Functions
+
+def lockstep_n_step_sarsa(batch_value_function, number_of_steps, episodes):
+    # region Summary
+    """
+    Semi-gradient n-step SARSA of N independent learners in lockstep: every learner drives its own car of a
+    BatchMountainCar, and all learners take 1 step (action selection, bootstrapping and learning) per iteration.
+    Every learner follows semi_gradient_n_step_sarsa exactly, with its own number of steps, so a learner whose episode
+    ends simply starts its next one while the others continue. The last n + 1 states, actions and rewards of every learner
+    are kept in (N, max n + 1) ring buffers.
+    :param batch_value_function: BatchValueFunction of the N learners
+    :param number_of_steps: Number of steps of every learner, an integer or of shape (N,)
+    :param episodes: Number of episodes of every learner
+    :return: Time steps (as returned by semi_gradient_n_step_sarsa) of every episode, of shape (N, episodes)
+    """
+    # endregion Summary
+
+    # region Body
+
+    learners = batch_value_function.learners
+    number_of_steps = np.broadcast_to(np.asarray(number_of_steps, dtype=np.int64), (learners,))
+    all_learners = np.arange(learners)
+
+    # Ring buffers: time t of a learner is stored in slot t % slots
+    slots = int(number_of_steps.max()) + 1
+    positions = np.zeros((learners, slots))
+    velocities = np.zeros((learners, slots))
+    actions = np.zeros((learners, slots), dtype=np.int64)
+    rewards = np.zeros((learners, slots))
+
+    environment = BatchMountainCar(learners)
+
+    # Time step, length of the current episode (denoted as T, "infinite" until the goal is reached) and episode of every learner
+    time_steps = np.zeros(learners, dtype=np.int64)
+    episode_lengths = np.full(learners, np.iinfo(np.int64).max)
+    episode = np.zeros(learners, dtype=np.int64)
+
+    steps = np.zeros((learners, episodes), dtype=np.int64)
+
+    def start(starting):
+        # Start new episodes of the given learners: initial state and action at time 0
+        environment.reset(starting)
+        positions[starting, 0] = environment.positions[starting]
+        velocities[starting, 0] = environment.velocities[starting]
+        actions[starting, 0] = batch_value_function.get_actions(starting, environment.positions[starting], environment.velocities[starting])
+        time_steps[starting] = 0
+        episode_lengths[starting] = np.iinfo(np.int64).max
+
+    start(all_learners)
+    active = all_learners
+
+    while active.size:
+
+        # Move to next time step
+        time_steps[active] += 1
+        current = time_steps[active] % slots
+        previous = (time_steps[active] - 1) % slots
+
+        # Learners whose episode is not over take their current action, move to the new state and choose a new action
+        moving = time_steps[active] < episode_lengths[active]
+        movers = active[moving]
+        if movers.size:
+            new_positions, new_velocities, new_rewards, terminated = environment.step(actions[movers, previous[moving]], movers)
+            positions[movers, current[moving]] = new_positions
+            velocities[movers, current[moving]] = new_velocities
+            rewards[movers, current[moving]] = new_rewards
+            actions[movers, current[moving]] = batch_value_function.get_actions(movers, new_positions, new_velocities)
+
+            # The goal was reached and the episode was terminated
+            episode_lengths[movers[terminated]] = time_steps[movers[terminated]]
+
+        # Get the time of the state to update
+        update_times = time_steps[active] - number_of_steps[active]
+
+        updating = update_times >= 0
+        updaters = active[updating]
+        if updaters.size:
+            update_times = update_times[updating]
+            update_steps = number_of_steps[updaters]
+            lengths = episode_lengths[updaters]
+
+            # Rewards of times update time + 1 ... min(T, update time + n)
+            offsets = np.arange(1, slots)
+            included = offsets[np.newaxis, :] <= np.minimum(lengths - update_times, update_steps)[:, np.newaxis]
+            times = update_times[:, np.newaxis] + offsets[np.newaxis, :]
+            returns = np.where(included, rewards[updaters[:, np.newaxis], times % slots], 0.0).sum(axis=1)
+
+            # Add the estimated state-action value to the returns which don't reach the end of the episode
+            bootstrapping = update_times + update_steps <= lengths
+            if bootstrapping.any():
+                learners_ = updaters[bootstrapping]
+                bootstrap_slots = (update_times[bootstrapping] + update_steps[bootstrapping]) % slots
+                returns[bootstrapping] += batch_value_function.values(learners_,
+                                                                      positions[learners_, bootstrap_slots],
+                                                                      velocities[learners_, bootstrap_slots],
+                                                                      actions[learners_, bootstrap_slots])
+
+            # Update the state-action value functions
+            update_slots = update_times % slots
+            learning = positions[updaters, update_slots] != POSITION["max"]
+            batch_value_function.learn(updaters[learning],
+                                       positions[updaters[learning], update_slots[learning]],
+                                       velocities[updaters[learning], update_slots[learning]],
+                                       actions[updaters[learning], update_slots[learning]],
+                                       returns[learning])
+
+        # Learners which updated the last time of their episode record it, and start the next one (if any)
+        finished = active[time_steps[active] - number_of_steps[active] == episode_lengths[active] - 1]
+        if finished.size:
+            steps[finished, episode[finished]] = time_steps[finished]
+            episode[finished] += 1
+
+            starting = finished[episode[finished] < episodes]
+            if starting.size:
+                start(starting)
+
+            active = all_learners[episode < episodes]
+
+    return steps
+
+    # endregion Body
+
+def lockstep_sweep(step_sizes, number_of_steps, runs, episodes, num_of_tilings=8):
+    # region Summary
+    """
+    Learn every (step size, number of steps) combination for several independent runs as 1 vectorized job
+    (e.g. the runs × episodes sweeps of Figures 10.2-10.4)
+    :param step_sizes: Step-size parameters, of shape (C,)
+    :param number_of_steps: Numbers of steps, of shape (C,)
+    :param runs: Number of independent runs of every combination
+    :param episodes: Number of episodes of every run
+    :param num_of_tilings: Number of tilings
+    :return: Time steps of every episode, of shape (C, runs, episodes)
+    """
+    # endregion Summary
+
+    # region Body
+
+    step_sizes, number_of_steps = np.broadcast_arrays(np.asarray(step_sizes, dtype=float), np.asarray(number_of_steps, dtype=np.int64))
+
+    # 1 learner per (combination, run)
+    batch_value_function = BatchValueFunction(np.repeat(step_sizes, runs), num_of_tilings)
+    steps = lockstep_n_step_sarsa(batch_value_function, np.repeat(number_of_steps, runs), episodes)
+
+    return steps.reshape(len(step_sizes), runs, episodes)
+
+    # endregion Body
+
+def greedy_actions(value_function, positions, velocities):
+    # region Summary
+    """
+    Get the greedy action of a ValueFunction at many states at once (ties are broken randomly, there is no exploration).
+    The action values are estimated with 1 batched, read-only tile lookup (ValueFunction.values()).
+    :param value_function: ValueFunction
+    :param positions: Positions of shape (M,)
+    :param velocities: Velocities of shape (M,)
+    :return: Actions of shape (M,)
+    """
+    # endregion Summary
+
+    # region Body
+
+    action_values = np.array(list(all_actions.values()))
+
+    values = value_function.values(np.repeat(positions, len(action_values)),
+                                   np.repeat(velocities, len(action_values)),
+                                   np.tile(action_values, len(positions))).reshape(len(positions), len(action_values))
+
+    is_greedy = values == np.max(values, axis=1, keepdims=True)
+
+    return action_values[np.argmax(np.where(is_greedy, np.random.rand(*values.shape), -1.), axis=1)]
+
+    # endregion Body
+
+def evaluate_greedy_policy(value_function, episodes=1000, max_steps=10000):
+    # region Summary
+    """
+    Evaluate the greedy policy of a ValueFunction without learning: run exploration-free episodes from sampled start states
+    (like the training episodes, a random position around the bottom of the valley and 0 velocity) as 1 vectorized batch.
+    The hash table and the weights are only read, so it can be called during a long training run to track policy quality.
+    :param value_function: ValueFunction
+    :param episodes: Number of episodes
+    :param max_steps: Step budget of every episode
+    :return: Steps to reach the goal of every episode, of shape (episodes,), -1 for episodes which exceeded max_steps
+    """
+    # endregion Summary
+
+    # region Body
+
+    environment = BatchMountainCar(episodes)
+
+    steps = np.full(episodes, -1, dtype=np.int64)
+    running = np.arange(episodes)
+
+    for time_step in range(1, max_steps + 1):
+        actions = greedy_actions(value_function, environment.positions[running], environment.velocities[running])
+        _, _, _, terminated = environment.step(actions, running)
+
+        steps[running[terminated]] = time_step
+
+        running = running[~terminated]
+        if not running.size:
+            break
+
+    return steps
+
+    # endregion Body
+
+def steps_statistics(steps):
+    # region Summary
+    """
+    Summarize a steps-to-goal distribution (as returned by evaluate_greedy_policy)
+    :param steps: Steps of every episode, -1 for episodes which didn't reach the goal
+    :return: Dictionary of the share of episodes which reached the goal, and the mean, standard deviation,
+             minimum, percentiles (5, 25, 50, 75, 95) and maximum of their steps
+    """
+    # endregion Summary
+
+    # region Body
+
+    steps = np.asarray(steps)
+    reached = steps[steps >= 0]
+
+    statistics = dict(success_rate=len(reached) / len(steps) if len(steps) else 0.0)
+
+    if len(reached):
+        percentiles = np.percentile(reached, [5, 25, 50, 75, 95])
+        statistics.update(mean=float(reached.mean()), std=float(reached.std()), min=int(reached.min()),
+                          p5=float(percentiles[0]), p25=float(percentiles[1]), median=float(percentiles[2]),
+                          p75=float(percentiles[3]), p95=float(percentiles[4]), max=int(reached.max()))
+
+    return statistics
+
+    # endregion Body
+
+# endregion Functions
@@ -0,0 +1,173 @@
+import time
+import tracemalloc
+
+import numpy as np
+
+from src.mountain_car import POSITION, VELOCITY, ValueFunction, all_actions
+from src.tile_coding import benchmarks as tile_coding_benchmarks
+
+# region Helpers
+
+def time_lookups(value_function, states, repeats):
+    # region Summary
+    """
+    Time get_active_tiles() over the same states several times
+    :param value_function: ValueFunction
+    :param states: List of (position, velocity, action)
+    :param repeats: Number of timed repetitions
+    :return: Best time per lookup (in seconds)
+    """
+    # endregion Summary
+
+    # region Body
+
+    times = []
+
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for position, velocity, action in states:
+            value_function.get_active_tiles(position, velocity, action)
+        times.append(time.perf_counter() - start)
+
+    return min(times) / len(states)
+
+    # endregion Body
+
+# endregion Helpers
+
+# region Functions
+
+def benchmark_grid_tile_coder(lookups=10000, repeats=5, num_of_tilings=8):
+    # region Summary
+    """
+    Compare ValueFunction.get_active_tiles() with the IHT (hashing) and with the GridTileCoder (direct indexing),
+    also against GridTileCoder.tiles_batch() over all states at once,
+    on states spread over the whole position × velocity × action domain.
+    Memory of the IHT is measured with tracemalloc while it is filled, the GridTileCoder keeps no table at all.
+    :param lookups: Number of (position, velocity, action) lookups per repetition
+    :param repeats: Number of timed repetitions (the best one is reported, the first one also fills the IHT)
+    :param num_of_tilings: Number of tilings
+    :return: Dictionary of "tile coder: dictionary of results" and the speedups per lookup
+    """
+    # endregion Summary
+
+    # region Body
+
+    states = list(zip(np.random.uniform(POSITION["min"], POSITION["max"], lookups).tolist(),
+                      np.random.uniform(VELOCITY["min"], VELOCITY["max"], lookups).tolist(),
+                      np.random.choice(list(all_actions.values()), lookups).tolist()))
+
+    results = dict()
+
+    for name, use_grid_tiles in (("hash", False), ("grid", True)):
+        # Without the memo cache, every lookup is timed
+        value_function = ValueFunction(step_size=0.3, num_of_tilings=num_of_tilings, use_grid_tiles=use_grid_tiles, cache_size=0)
+
+        # Memory allocated by the first pass (the IHT grows, the grid tile coder allocates nothing that stays)
+        tracemalloc.start()
+        for position, velocity, action in states:
+            value_function.get_active_tiles(position, velocity, action)
+        table_bytes = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+
+        results[name] = dict(seconds_per_lookup=time_lookups(value_function, states, repeats),
+                             table_bytes=table_bytes,
+                             weights_bytes=value_function.weights.nbytes,
+                             tiles=value_function.max_size if use_grid_tiles else value_function.hash_table.count(),
+                             collisions=value_function.hash_table.overfull_count)
+
+    # All lookups in 1 vectorized call of the grid tile coder
+    floats = np.array([[value_function.position_scale * position, value_function.velocity_scale * velocity] for position, velocity, _ in states])
+    ints = np.array([[action] for _, _, action in states])
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        value_function.grid_tile_coder.tiles_batch(floats, ints)
+        times.append(time.perf_counter() - start)
+    results["grid (batched)"] = dict(seconds_per_lookup=min(times) / lookups)
+
+    results["speedup"] = results["hash"]["seconds_per_lookup"] / results["grid"]["seconds_per_lookup"]
+    results["batched speedup"] = results["hash"]["seconds_per_lookup"] / results["grid (batched)"]["seconds_per_lookup"]
+
+    return results
+
+    # endregion Body
+
+def benchmark_value_function(num_tilings_list=(4, 8, 16, 32, 64), max_sizes=(2048, 65536), lookups=2000, repeats=3):
+    # region Summary
+    """
+    Time ValueFunction.value() and ValueFunction.learn() for every tiling count and IHT size,
+    with the IHT, the GridTileCoder, and either of them behind the memo cache
+    :param num_tilings_list: Numbers of tilings
+    :param max_sizes: IHT sizes (the grid tile coder sizes itself)
+    :param lookups: Number of (position, velocity, action) calls per repetition
+    :param repeats: Number of timed repetitions (the best one is reported, the first one also fills the table)
+    :return: List of results in the format of tile_coding.benchmarks
+    """
+    # endregion Summary
+
+    # region Body
+
+    # Positions stay below the goal, where value() has to look up the tiles
+    states = list(zip(np.random.uniform(POSITION["min"], POSITION["max"] - 0.01, lookups).tolist(),
+                      np.random.uniform(VELOCITY["min"], VELOCITY["max"], lookups).tolist(),
+                      np.random.choice(list(all_actions.values()), lookups).tolist()))
+
+    results = []
+
+    for num_tilings in num_tilings_list:
+        for max_size in max_sizes:
+            for table, use_grid_tiles in (("IHT", False), ("grid", True)):
+                # The grid tile coder sizes itself, so it is timed once per tiling count
+                if use_grid_tiles and max_size != max_sizes[0]:
+                    continue
+
+                for mode, cache_size in (("single", 0), ("cached", 1024)):
+                    value_function = ValueFunction(step_size=0.3, num_of_tilings=num_tilings, max_size=max_size,
+                                                   use_grid_tiles=use_grid_tiles, cache_size=cache_size)
+
+                    def value():
+                        for position, velocity, action in states:
+                            value_function.value(position, velocity, action)
+
+                    def learn():
+                        for position, velocity, action in states:
+                            value_function.learn(position, velocity, action, -1.)
+
+                    for benchmark, function in (("value", value), ("learn", learn)):
+                        seconds = tile_coding_benchmarks.best_time(function, repeats)
+                        results.append(dict(benchmark=benchmark, mode=mode, table=table, num_tilings=num_tilings, dimensions=2,
+                                            size=value_function.max_size, fill=None, seconds_per_lookup=seconds / lookups))
+
+    return results
+
+    # endregion Body
+
+def tile_coding_suite(path="tile_coding_baseline.json", baseline=None, lookups=1000, repeats=3):
+    # region Summary
+    """
+    Run the whole tile-coding benchmark suite (tiles(), get_index(), ValueFunction.value() / learn(), single vs batched)
+    and write the results to a JSON baseline
+    :param path: Path of the JSON file to write the results to
+    :param baseline: Path of an earlier JSON baseline to compare with (None for no comparison)
+    :param lookups: Number of lookups per repetition of every benchmark
+    :param repeats: Number of timed repetitions (the best one is reported)
+    :return: Results, and their comparison with the baseline (None if there is no baseline)
+    """
+    # endregion Summary
+
+    # region Body
+
+    results = (tile_coding_benchmarks.benchmark_tiles(lookups=lookups, repeats=repeats) +
+               tile_coding_benchmarks.benchmark_get_index(lookups=lookups, repeats=repeats) +
+               benchmark_value_function(lookups=lookups, repeats=repeats))
+
+    comparison = None if baseline is None else tile_coding_benchmarks.compare_baseline(results, baseline)
+
+    tile_coding_benchmarks.save_baseline(results, path)
+
+    return results, comparison
+
+    # endregion Body
+
+# endregion Functions
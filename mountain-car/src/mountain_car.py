@@ -1,6 +1,6 @@
 import numpy as np
 
-from src.tile_coding import IHT, tiles
+from src.tile_coding import IHT, GridTileCoder, TileCache, tiles, tiles_batch
 
 # region Hyper-parameters
 
@@ -16,18 +16,21 @@ VELOCITY = dict(min=-0.07, max=0.07)
 # Use optimistic initial value, so it's OK to set ε = 0
 exploration_probability = 0
 
+# Maximum number of (state, action) pairs tiled per batch when evaluating a cost-to-go surface (bounds the memory of the tile coordinates)
+surface_chunk_size = 1 << 16
+
 # endregion Hyper-parameters
 
 # region Helpers
 
-def get_action(position, velocity, value_function):
+def get_action_value(position, velocity, value_function):
     # region Summary
     """
-    Get action at given state (position and velocity) based on ε-greedy policy and given VF
+    Get action at given state (position and velocity) based on ε-greedy policy and given VF, together with its value estimate
     :param position: Current position
     :param velocity: Current velocity
     :param value_function: VF
-    :return: Action
+    :return: Action and its value estimate
     """
     # endregion Summary
 
@@ -35,14 +38,34 @@ def get_action(position, velocity, value_function):
 
     # ε-greedy action selection: every once in a while, with small probability ε, select randomly from among all the actions with equal probability, independently of the action-value estimates.
     if np.random.binomial(n=1, p=exploration_probability) == 1:
-        return np.random.choice(list(all_actions.values()))
+        action = np.random.choice(list(all_actions.values()))
+        return action, value_function.value(position, velocity, action)
 
     # Greedy action selection: select one of the actions with the highest estimated value, that is, one of the greedy actions.
     # If there is more than one greedy action, then a selection is made among them in some arbitrary way, perhaps randomly.
     values = []
     for action in list(all_actions.values()):
         values.append(value_function.value(position, velocity, action))
-    return np.random.choice([action_ for action_, value_ in enumerate(values) if value_ == np.max(values)]) - 1
+    index = np.random.choice([action_ for action_, value_ in enumerate(values) if value_ == np.max(values)])
+
+    return index - 1, values[index]
+
+    # endregion Body
+
+def get_action(position, velocity, value_function):
+    # region Summary
+    """
+    Get action at given state (position and velocity) based on ε-greedy policy and given VF
+    :param position: Current position
+    :param velocity: Current velocity
+    :param value_function: VF
+    :return: Action
+    """
+    # endregion Summary
+
+    # region Body
+
+    return get_action_value(position, velocity, value_function)[0]
 
     # endregion Body
 
@@ -93,13 +116,15 @@ class ValueFunction:
 
     # region Constructor
 
-    def __init__(self, step_size, num_of_tilings=8, max_size=2048):
+    def __init__(self, step_size, num_of_tilings=8, max_size=2048, use_grid_tiles: bool = False, cache_size: int = 1024):
         # region Summary
         """
         Constructor of ValueFunction class
         :param step_size: Step-size parameter
         :param num_of_tilings: Number of tilings
-        :param max_size: The maximum number of indices
+        :param max_size: The maximum number of indices (ignored if use_grid_tiles)
+        :param use_grid_tiles: if True, compute tile indices directly on the bounded grid (GridTileCoder) instead of hashing them into an IHT
+        :param cache_size: Maximum number of memoized active tile lookups (0 disables the cache)
         """
         # endregion Summary
 
@@ -111,15 +136,29 @@ class ValueFunction:
         self.num_of_tilings = num_of_tilings
         self.max_size = max_size
 
+        # State features (position and velocity) need scaling to satisfy the tile software
+        self.position_scale = self.num_of_tilings / (POSITION["max"] - POSITION["min"])
+        self.velocity_scale = self.num_of_tilings / (VELOCITY["max"] - VELOCITY["min"])
+
+        # Position, velocity and action are bounded, so the grid tile coder has exactly 1 index per tile (no collisions)
+        self.grid_tile_coder = None
+        if use_grid_tiles:
+            self.grid_tile_coder = GridTileCoder(num_tilings=self.num_of_tilings,
+                                                 float_bounds=[(self.position_scale * POSITION["min"], self.position_scale * POSITION["max"]),
+                                                               (self.velocity_scale * VELOCITY["min"], self.velocity_scale * VELOCITY["max"])],
+                                                 int_bounds=[(min(all_actions.values()), max(all_actions.values()))])
+            self.max_size = self.grid_tile_coder.size
+
         # Hash table
-        self.hash_table = IHT(max_size)
+        self.hash_table = IHT(self.max_size)
 
         # Weight for each tile
-        self.weights = np.zeros(max_size)
+        self.weights = np.zeros(self.max_size)
 
-        # State features (position and velocity) need scaling to satisfy the tile software
-        self.position_scale = self.num_of_tilings / (POSITION["max"] - POSITION["min"])
-        self.velocity_scale = self.num_of_tilings / (VELOCITY["max"] - VELOCITY["min"])
+        # Memo cache of active tiles: action selection, value and learning look up the same (state, action) within and across steps
+        self.tile_cache = None
+        if cache_size > 0:
+            self.tile_cache = TileCache(self.grid_tile_coder if use_grid_tiles else self.hash_table, self.num_of_tilings, cache_size)
 
         # endregion Body
 
@@ -140,6 +179,12 @@ class ValueFunction:
 
         # region Body
 
+        if self.tile_cache is not None:
+            return self.tile_cache.tiles(floats=[self.position_scale * position, self.velocity_scale * velocity], ints=[action])
+
+        if self.grid_tile_coder is not None:
+            return self.grid_tile_coder.tiles(floats=[self.position_scale * position, self.velocity_scale * velocity], ints=[action])
+
         # Probably, position_scale * (position - position_min) would be a good normalization.
         # However, position_scale * position_min is a constant, so it's OK to ignore it.
         active_tiles = tiles(iht_or_size=self.hash_table,
@@ -209,6 +254,60 @@ class ValueFunction:
 
         # endregion Body
 
+    def get_active_tiles_batch(self, positions, velocities, actions):
+        # region Summary
+        """
+        Get indices of active tiles for many states and actions at once, without adding tiles to the hash table
+        :param positions: Positions of shape (N,)
+        :param velocities: Velocities of shape (N,)
+        :param actions: Actions of shape (N,)
+        :return: Active tiles of shape (N, num_of_tilings), -1 for tiles which were never visited
+        """
+        # endregion Summary
+
+        # region Body
+
+        floats = np.column_stack([self.position_scale * np.asarray(positions, dtype=float),
+                                  self.velocity_scale * np.asarray(velocities, dtype=float)])
+        ints = np.asarray(actions, dtype=np.int64).reshape(-1, 1)
+
+        if self.grid_tile_coder is not None:
+            return self.grid_tile_coder.tiles_batch(floats, ints)
+
+        return tiles_batch(self.hash_table, self.num_of_tilings, floats, ints, read_only=True)
+
+        # endregion Body
+
+    def values(self, positions, velocities, actions):
+        # region Summary
+        """
+        Estimate the values of many states and actions at once (the batched counterpart of value()).
+        Unseen tiles count as 0 while the hash table has room, and once it is full they collide with the same index as in value()
+        :param positions: Positions of shape (N,)
+        :param velocities: Velocities of shape (N,)
+        :param actions: Actions of shape (N,)
+        :return: Value estimates of shape (N,)
+        """
+        # endregion Summary
+
+        # region Body
+
+        active_tiles = self.get_active_tiles_batch(positions, velocities, actions)
+
+        # A full hash table maps unseen tiles to the index they collide with (IHT.get_index), so look those rows up like value()
+        if self.grid_tile_coder is None and self.hash_table.full():
+            positions, velocities, actions = np.asarray(positions), np.asarray(velocities), np.asarray(actions)
+            for row in np.flatnonzero((active_tiles < 0).any(axis=1)):
+                active_tiles[row] = self.get_active_tiles(positions[row], velocities[row], actions[row])
+
+        # Tiles which were never visited still have their initial weight of 0
+        value_estimates = np.where(active_tiles >= 0, self.weights[np.maximum(active_tiles, 0)], 0.0).sum(axis=1)
+
+        # The goal was reached at the right bound, so the episode was terminated
+        return np.where(np.asarray(positions) == POSITION["max"], 0.0, value_estimates)
+
+        # endregion Body
+
     def cost_to_go(self, position, velocity):
         # region Summary
         """
@@ -239,83 +338,85 @@ class ValueFunction:
 
 # region Functions
 
-def semi_gradient_n_step_sarsa(value_function, number_of_steps=1):
+def semi_gradient_n_step_sarsa(value_function, number_of_steps=1, max_steps=None, recorder=None):
     # region Summary
     """
-    Semi-gradient n-step SARSA
+    Semi-gradient n-step SARSA.
+    Only the last n + 1 states, actions and rewards are needed, so they are kept in (n + 1)-slot ring buffers (time t in slot t % (n + 1)).
+    The sum of the rewards of the n-step return is maintained incrementally, and the bootstrap value is the value estimate
+    of the newest action, which was already computed when selecting it. So every step costs the same whatever n is.
     :param value_function: State-value function to learn
     :param number_of_steps: Number of steps
-    :return: Time step
+    :param max_steps: Step budget of the episode (None for no budget): a diverging VF can keep the car from ever reaching the goal
+    :param recorder: EpisodeRecorder to record the episode with (None to not record it)
+    :return: Time step, None if the goal wasn't reached within max_steps time steps
     """
     # endregion Summary
 
     # region Body
 
-    # Start at a random position around the bottom of the valley
-    current_position = np.random.uniform(-0.6, -0.4)
+    slots = number_of_steps + 1
 
+    # Ring buffers of the last n + 1 positions, velocities, actions and rewards
+    positions = [0.0] * slots
+    velocities = [0.0] * slots
+    actions = [0] * slots
+    rewards = [0.0] * slots
 
-    # Start with 0 initial velocity
-    current_velocity = 0.0
-
+    # Start at a random position around the bottom of the valley, with 0 initial velocity
+    positions[0] = np.random.uniform(-0.6, -0.4)
+    velocities[0] = 0.0
 
     # Get initial action
-    current_action = get_action(current_position, current_velocity, value_function)
-
-
-    # Track previous positions
-    positions = [current_position]
-
-
-    # Track previous velocities
-    velocities = [current_velocity]
+    actions[0], _ = get_action_value(positions[0], velocities[0], value_function)
 
+    if recorder is not None:
+        recorder.record(positions[0], velocities[0], actions[0])
 
-    # Track previous actions
-    actions = [current_action]
-
-
-    # Track previous rewards
-    rewards = [0.0]
+    # Sum of the rewards of times update time + 1 ... min(T, time step)
+    reward_sum = 0.0
 
+    # Value estimate of the newest state and action (the bootstrap value)
+    new_value = 0.0
 
     # Track the time step
     time_step = 0
 
-
     # Define the length of this episode (denoted as T)
     episode_length = float('inf')
 
-
     while True:
 
         # move to next time step
         time_step += 1
 
+        # abort the episode once it exceeds the step budget (the last n updates of an episode which reached the goal don't count)
+        if max_steps is not None and time_step > max_steps and episode_length == float('inf'):
+            if recorder is not None:
+                recorder.end_episode(truncated=True)
+            return None
 
         # if episode is not over
         if time_step < episode_length:
 
-
             # take current action and move to the new state
-            new_position, new_velocity, reward = step(current_position, current_velocity, current_action)
+            previous = (time_step - 1) % slots
+            new_position, new_velocity, reward = step(positions[previous], velocities[previous], actions[previous])
 
-            new_action = get_action(new_position, new_velocity, value_function)
             # choose new action
-            positions.append(new_position)
-            velocities.append(new_velocity)
-            actions.append(new_action)
-
-
-            # track new state
-            rewards.append(reward)
+            new_action, new_value = get_action_value(new_position, new_velocity, value_function)
 
+            # track new state, new action and reward
+            current = time_step % slots
+            positions[current] = new_position
+            velocities[current] = new_velocity
+            actions[current] = new_action
+            rewards[current] = reward
 
-            # track new action
-
-
-            # track reward
+            reward_sum += reward
 
+            if recorder is not None:
+                recorder.record(new_position, new_velocity, new_action, reward)
 
             # when position reached the right bound,
             if new_position == POSITION["max"]:
@@ -323,50 +424,106 @@ def semi_gradient_n_step_sarsa(value_function, number_of_steps=1):
                 # the goal was reached and the episode was terminated
                 episode_length = time_step
 
-
         # get the time of the state to update
         update_time = time_step - number_of_steps
 
+        if update_time >= 0:
 
+            returns = reward_sum
 
-        if update_time >= 0:
+            # add estimated state-action value of time update time + n (the newest one) to the return
+            if update_time + number_of_steps <= episode_length:
+                returns += new_value
 
-            # initialize returns with 0
-            returns = 0.0
+            # update the state-value function
+            update_slot = update_time % slots
+            if positions[update_slot] != POSITION['max']:
+                value_function.learn(positions[update_slot], velocities[update_slot], actions[update_slot], returns)
 
+            # the reward of time update time + 1 leaves the next return
+            if update_time + 1 <= episode_length:
+                reward_sum -= rewards[(update_time + 1) % slots]
 
-            # calculate corresponding returns
-            for t in range(update_time + 1, min(episode_length, update_time + number_of_steps) + 1):
-                returns += rewards[t]
+        if update_time == episode_length - 1:
+            break
 
+    if recorder is not None:
+        recorder.end_episode()
 
-            if update_time + number_of_steps <= episode_length:
+    return time_step
+
+    # endregion Body
 
+def cost_to_go_surface(value_function, resolution=40):
+    # region Summary
+    """
+    Evaluate the cost to go on a resolution × resolution grid of positions and velocities.
+    All (position, velocity, action) triples of the grid are tiled with batched lookups (in chunks of surface_chunk_size),
+    instead of calling cost_to_go() for every grid point.
+    :param value_function: Value Function
+    :param resolution: Number of positions and of velocities
+    :return: Positions of shape (resolution,), velocities of shape (resolution,) and costs of shape (resolution, resolution),
+             where costs[i, j] is the cost to go at (positions[i], velocities[j])
+    """
+    # endregion Summary
 
+    # region Body
 
-                # add estimated state-action value to the return
-                returns += value_function.value(positions[update_time + number_of_steps], velocities[update_time + number_of_steps], actions[update_time + number_of_steps] )
+    positions = np.linspace(POSITION["min"], POSITION["max"], resolution)
+    velocities = np.linspace(VELOCITY["min"], VELOCITY["max"], resolution)
+    action_values = np.array(list(all_actions.values()))
 
+    # Every (position, velocity, action) triple of the grid, positions varying slowest and actions fastest
+    grid_positions, grid_velocities, grid_actions = [axis.ravel() for axis in np.meshgrid(positions, velocities, action_values, indexing="ij")]
 
-            # update the state-value function
-            if positions[update_time] != POSITION['max']:
-                value_function.learn(positions[update_time], velocities[update_time], actions[update_time], returns)
+    values = np.empty(len(grid_positions))
+    for start in range(0, len(grid_positions), surface_chunk_size):
+        chunk = slice(start, start + surface_chunk_size)
+        values[chunk] = value_function.values(grid_positions[chunk], grid_velocities[chunk], grid_actions[chunk])
 
-        if update_time == episode_length - 1:
-            break
+    costs = -values.reshape(resolution, resolution, len(action_values)).max(axis=2)
 
+    return positions, velocities, costs
 
-        # move to the next state
-        current_position = new_position
-        current_velocity = new_velocity
+    # endregion Body
 
+def save_cost_to_go(path, positions, velocities, costs, episode=None):
+    # region Summary
+    """
+    Export a cost-to-go surface to a compressed NPZ file (costs are stored as float32), e.g. to plot it offline
+    or to diff the surfaces of 2 episodes
+    :param path: NPZ file path
+    :param positions: Positions of shape (P,)
+    :param velocities: Velocities of shape (V,)
+    :param costs: Costs of shape (P, V)
+    :param episode: Episode of the surface (stored as -1 if None)
+    """
+    # endregion Summary
 
-        # move to the next action
-        current_action = new_action
-    return time_step
+    # region Body
 
+    np.savez_compressed(path,
+                        positions=np.asarray(positions, dtype=np.float64),
+                        velocities=np.asarray(velocities, dtype=np.float64),
+                        costs=np.asarray(costs, dtype=np.float32),
+                        episode=np.int64(-1 if episode is None else episode))
 
+    # endregion Body
 
+def load_cost_to_go(path):
+    # region Summary
+    """
+    Import a cost-to-go surface exported by save_cost_to_go()
+    :param path: NPZ file path
+    :return: Positions, velocities, costs and episode (None if it wasn't given)
+    """
+    # endregion Summary
+
+    # region Body
+
+    with np.load(path) as surface:
+        episode = int(surface["episode"])
+        return surface["positions"], surface["velocities"], surface["costs"], None if episode < 0 else episode
 
     # endregion Body
 
@@ -384,24 +541,11 @@ def print_cost(value_function, episode, ax):
 
     grid_size = 40
 
-    positions = np.linspace(POSITION["min"], POSITION["max"], grid_size)
-
-    # positionStep = (POSITION_MAX - POSITION_MIN) / grid_size
-    # positions = np.arange(POSITION_MIN, POSITION_MAX + positionStep, positionStep)
-    # velocityStep = (VELOCITY_MAX - VELOCITY_MIN) / grid_size
-    # velocities = np.arange(VELOCITY_MIN, VELOCITY_MAX + velocityStep, velocityStep)
-
-    velocities = np.linspace(VELOCITY["min"], VELOCITY["max"], grid_size)
-
-    axis_x = []
-    axis_y = []
-    axis_z = []
+    positions, velocities, costs = cost_to_go_surface(value_function, grid_size)
 
-    for position in positions:
-        for velocity in velocities:
-            axis_x.append(position)
-            axis_y.append(velocity)
-            axis_z.append(value_function.cost_to_go(position, velocity))
+    # 1 point per (position, velocity) pair, positions varying slowest
+    axis_x, axis_y = [axis.ravel() for axis in np.meshgrid(positions, velocities, indexing="ij")]
+    axis_z = costs.ravel()
 
     ax.scatter(axis_x, axis_y, axis_z)
 
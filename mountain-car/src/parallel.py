@@ -0,0 +1,168 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from src.mountain_car import ValueFunction, semi_gradient_n_step_sarsa
+from src.tile_coding import SharedIHT, TileCache
+
+# region Hyper-parameters
+
+# Key of a tile: tiling, position coordinate, velocity coordinate, action
+key_width = 4
+
+# Table shared by the workers of the current process pool (set by attach)
+shared_table = None
+
+# endregion Hyper-parameters
+
+# region Helpers
+
+def attach(table):
+    # region Summary
+    """
+    Process pool initializer: remember the shared table (it is unpickled by attaching to its shared memory block)
+    :param table: SharedIHT
+    """
+    # endregion Summary
+
+    # region Body
+
+    global shared_table
+    shared_table = table
+
+    # endregion Body
+
+def shared_value_function(table, step_size, num_of_tilings, hogwild: bool):
+    # region Summary
+    """
+    Create a ValueFunction that maps tiles through the shared table
+    :param table: SharedIHT
+    :param step_size: Step-size parameter
+    :param num_of_tilings: Number of tilings
+    :param hogwild: if True, learn directly into the shared weights, otherwise into a private copy
+    :return: ValueFunction
+    """
+    # endregion Summary
+
+    # region Body
+
+    value_function = ValueFunction(step_size, num_of_tilings, max_size=table.size, cache_size=0)
+    value_function.hash_table = table
+    value_function.weights = table.weights if hogwild else np.array(table.weights)
+
+    # Indices never change once assigned, so every process can keep its own cache
+    value_function.tile_cache = TileCache(table, num_of_tilings)
+
+    return value_function
+
+    # endregion Body
+
+def reduce(table, value_function, base_weights):
+    # region Summary
+    """
+    Add the changes of a private copy to the shared weights, then continue from the combined weights
+    :param table: SharedIHT
+    :param value_function: ValueFunction learning into a private copy
+    :param base_weights: Shared weights the private copy started from
+    :return: New base weights
+    """
+    # endregion Summary
+
+    # region Body
+
+    with table.lock:
+        table.weights += value_function.weights - base_weights
+        base_weights = np.array(table.weights)
+
+    value_function.weights[:] = base_weights
+
+    return base_weights
+
+    # endregion Body
+
+def run_worker(episodes, step_size, num_of_tilings, number_of_steps, reduction_interval, seed):
+    # region Summary
+    """
+    Learn episodes in 1 worker process
+    :param episodes: Number of episodes
+    :param step_size: Step-size parameter
+    :param num_of_tilings: Number of tilings
+    :param number_of_steps: Number of steps of n-step SARSA
+    :param reduction_interval: Number of episodes between reductions, None for Hogwild-style updates
+    :param seed: Seed of the random number generator used by this worker
+    :return: Steps of every episode
+    """
+    # endregion Summary
+
+    # region Body
+
+    # Every worker gets its own random stream, otherwise forked workers would repeat the same episodes
+    np.random.seed(seed)
+
+    value_function = shared_value_function(shared_table, step_size, num_of_tilings, hogwild=reduction_interval is None)
+    base_weights = None if reduction_interval is None else np.array(value_function.weights)
+
+    steps = []
+
+    for episode in range(episodes):
+        steps.append(semi_gradient_n_step_sarsa(value_function, number_of_steps))
+
+        if reduction_interval is not None and ((episode + 1) % reduction_interval == 0 or episode + 1 == episodes):
+            base_weights = reduce(shared_table, value_function, base_weights)
+
+    return steps
+
+    # endregion Body
+
+# endregion Helpers
+
+# region Functions
+
+def parallel_sarsa(workers=None, episodes=100, step_size=0.3, num_of_tilings=8, max_size=4096, number_of_steps=1,
+                   reduction_interval=None, seed=None):
+    # region Summary
+    """
+    Semi-gradient n-step SARSA with several workers learning 1 shared value function.
+    Tiles are mapped through 1 SharedIHT, so identical (position, velocity, action) inputs get identical indices in every worker.
+    Workers either update the shared weights directly (Hogwild-style, lock-free) or learn into private copies
+    and add their changes to the shared weights every reduction_interval episodes.
+    :param workers: Number of worker processes (None uses all CPUs)
+    :param episodes: Number of episodes per worker
+    :param step_size: Step-size parameter
+    :param num_of_tilings: Number of tilings
+    :param max_size: The maximum number of indices
+    :param number_of_steps: Number of steps of n-step SARSA
+    :param reduction_interval: Number of episodes between reductions, None for Hogwild-style updates
+    :param seed: Seed for the independent random streams of the workers
+    :return: Learned weights of shape (max_size,), number of stored tiles and steps of every episode of shape (workers, episodes)
+    """
+    # endregion Summary
+
+    # region Body
+
+    if workers is None:
+        workers = os.cpu_count()
+
+    seeds = [sequence.generate_state(1)[0] for sequence in np.random.SeedSequence(seed).spawn(workers)]
+
+    table = SharedIHT(max_size, key_width)
+
+    try:
+        # The table (and its lock) can only reach the workers when they start
+        with ProcessPoolExecutor(max_workers=workers, initializer=attach, initargs=(table,)) as executor:
+            steps = list(executor.map(run_worker, [episodes] * workers, [step_size] * workers, [num_of_tilings] * workers,
+                                      [number_of_steps] * workers, [reduction_interval] * workers, seeds))
+
+        weights = np.array(table.weights)
+        count = table.count()
+
+    finally:
+        table.close()
+        table.unlink()
+
+    return weights, count, np.array(steps)
+
+    # endregion Body
+
+# endregion Functions
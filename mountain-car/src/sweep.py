@@ -0,0 +1,248 @@
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from src.mountain_car import ValueFunction, semi_gradient_n_step_sarsa
+
+# region Hyper-parameters
+
+# Default step budget of an episode: converging settings need at most a few thousand steps in their first episodes,
+# while diverging ones (large α and n) can keep the car from ever reaching the goal
+max_episode_steps = 10000
+
+# endregion Hyper-parameters
+
+# region Helpers
+
+def cell_key(run, number_of_steps, step_size):
+    # region Summary
+    """
+    Get the key of a (run, n, α) cell in the results store
+    :param run: Run
+    :param number_of_steps: Number of steps
+    :param step_size: Step-size parameter
+    :return: Key tuple
+    """
+    # endregion Summary
+
+    # region Body
+
+    return int(run), int(number_of_steps), round(float(step_size), 6)
+
+    # endregion Body
+
+def cell_seed(seed, run, number_of_steps, step_size):
+    # region Summary
+    """
+    Get the seed of the random stream of a cell. It only depends on the sweep seed and the cell itself
+    (not on the other cells or the order they run in), so a resumed sweep gives the same results.
+    :param seed: Seed of the sweep
+    :param run: Run
+    :param number_of_steps: Number of steps
+    :param step_size: Step-size parameter
+    :return: Seed
+    """
+    # endregion Summary
+
+    # region Body
+
+    run, number_of_steps, step_size = cell_key(run, number_of_steps, step_size)
+    sequence = np.random.SeedSequence(seed, spawn_key=(run, number_of_steps, int(round(step_size * 1e6))))
+
+    return int(sequence.generate_state(1)[0])
+
+    # endregion Body
+
+def load_results(path):
+    # region Summary
+    """
+    Read the finished cells of a results store (a JSON line per cell).
+    A line cut off by a crash is ignored, so its cell simply runs again.
+    :param path: Results store path
+    :return: Dictionary of cell key: record
+    """
+    # endregion Summary
+
+    # region Body
+
+    results = dict()
+
+    if not os.path.exists(path):
+        return results
+
+    with open(path) as file:
+        for line in file:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            results[cell_key(record["run"], record["number_of_steps"], record["step_size"])] = record
+
+    return results
+
+    # endregion Body
+
+def drop_partial_line(path):
+    # region Summary
+    """
+    Cut a results store back to its last complete line, so that a line cut off by a crash doesn't swallow the next record
+    :param path: Results store path
+    """
+    # endregion Summary
+
+    # region Body
+
+    if not os.path.exists(path):
+        return
+
+    with open(path, "r+b") as file:
+        data = file.read()
+        if data and not data.endswith(b"\n"):
+            file.truncate(data.rfind(b"\n") + 1)
+
+    # endregion Body
+
+def run_cell(run, number_of_steps, step_size, episodes, num_of_tilings, max_steps, seed):
+    # region Summary
+    """
+    Learn 1 (run, n, α) cell of the sweep in a worker process
+    :param run: Run
+    :param number_of_steps: Number of steps
+    :param step_size: Step-size parameter
+    :param episodes: Number of episodes
+    :param num_of_tilings: Number of tilings
+    :param max_steps: Step budget of every episode
+    :param seed: Seed of the random stream of the cell
+    :return: Record of the cell: its parameters, the steps of every finished episode and whether it was aborted
+    """
+    # endregion Summary
+
+    # region Body
+
+    np.random.seed(seed)
+
+    value_function = ValueFunction(step_size, num_of_tilings)
+
+    steps = []
+    aborted = False
+
+    for _ in range(episodes):
+        time_step = semi_gradient_n_step_sarsa(value_function, number_of_steps, max_steps)
+
+        # The episode exceeded the budget, so the setting is treated as diverging
+        if time_step is None:
+            aborted = True
+            break
+
+        steps.append(time_step)
+
+    return dict(run=int(run), number_of_steps=int(number_of_steps), step_size=float(step_size), episodes=episodes,
+                num_of_tilings=num_of_tilings, max_steps=max_steps, seed=seed, steps=steps, aborted=aborted)
+
+    # endregion Body
+
+# endregion Helpers
+
+# region Functions
+
+def parameter_sweep(path, step_sizes, n_steps, runs=5, episodes=50, num_of_tilings=8, max_steps=max_episode_steps,
+                    workers=None, seed=None):
+    # region Summary
+    """
+    Learn every (run, n, α) cell of a parameter sweep (e.g. Figure 10.4) with a process pool.
+    Every finished cell is appended to the results store at once, and cells already in the store are skipped,
+    so a sweep interrupted by a crash or a kernel restart resumes where it stopped.
+    Cells whose episodes exceed max_steps are aborted and marked as such, instead of excluding diverging settings by hand.
+    If some cells fail, all other cells are still stored, then a RuntimeError lists the failed cells.
+    :param path: Results store path (JSON lines)
+    :param step_sizes: Step-size parameters
+    :param n_steps: Numbers of steps
+    :param runs: Number of independent runs
+    :param episodes: Number of episodes of every cell
+    :param num_of_tilings: Number of tilings
+    :param max_steps: Step budget of every episode
+    :param workers: Number of worker processes (None uses all CPUs)
+    :param seed: Seed of the sweep (every cell gets its own random stream derived from it), None for fresh entropy
+    :return: Dictionary of cell key: record, for every cell of the sweep
+    """
+    # endregion Summary
+
+    # region Body
+
+    # Cells stored with other settings run again (their new records replace the old ones when the store is read)
+    results = {key: record for key, record in load_results(path).items()
+               if (record["episodes"], record["num_of_tilings"], record["max_steps"]) == (episodes, num_of_tilings, max_steps)}
+
+    cells = [(run, number_of_steps, step_size) for run in range(runs) for number_of_steps in n_steps for step_size in step_sizes]
+    pending = [cell for cell in cells if cell_key(*cell) not in results]
+
+    if pending:
+        # New records are appended after the last complete line
+        drop_partial_line(path)
+
+        with ProcessPoolExecutor(max_workers=workers) as executor, open(path, "a") as file:
+            futures = [executor.submit(run_cell, run, number_of_steps, step_size, episodes, num_of_tilings, max_steps,
+                                       cell_seed(seed, run, number_of_steps, step_size))
+                       for run, number_of_steps, step_size in pending]
+
+            cells_of_futures = dict(zip(futures, pending))
+            failures = []
+
+            for future in as_completed(futures):
+                # A failing cell doesn't stop the others from being stored
+                try:
+                    record = future.result()
+                except Exception as exception:
+                    failures.append((cells_of_futures[future], exception))
+                    continue
+
+                # Persist the cell before anything else can fail
+                file.write(json.dumps(record) + "\n")
+                file.flush()
+                os.fsync(file.fileno())
+
+                results[cell_key(record["run"], record["number_of_steps"], record["step_size"])] = record
+
+        if failures:
+            raise RuntimeError(f"{len(failures)} sweep cells failed (the other cells are stored): "
+                               + ", ".join(f"(run, n, α) = {cell}: {exception!r}" for cell, exception in failures)) from failures[0][1]
+
+    return {cell_key(*cell): results[cell_key(*cell)] for cell in cells}
+
+    # endregion Body
+
+def summarize(results, step_sizes, n_steps, runs, episodes, aborted_steps=np.nan):
+    # region Summary
+    """
+    Average the steps per episode of every (n, α) setting over its runs and episodes
+    :param results: Dictionary of cell key: record (as returned by parameter_sweep)
+    :param step_sizes: Step-size parameters
+    :param n_steps: Numbers of steps
+    :param runs: Number of independent runs
+    :param episodes: Number of episodes of every cell
+    :param aborted_steps: Steps per episode counted for every episode of an aborted cell (e.g. the upper limit of a plot)
+    :return: Average steps per episode of shape (len(n_steps), len(step_sizes))
+    """
+    # endregion Summary
+
+    # region Body
+
+    time_steps = np.zeros((len(n_steps), len(step_sizes)))
+
+    for n_step_index, number_of_steps in enumerate(n_steps):
+        for step_size_index, step_size in enumerate(step_sizes):
+            for run in range(runs):
+                record = results[cell_key(run, number_of_steps, step_size)]
+
+                if record["aborted"]:
+                    time_steps[n_step_index, step_size_index] += aborted_steps * episodes
+                else:
+                    time_steps[n_step_index, step_size_index] += np.sum(record["steps"])
+
+    return time_steps / (runs * episodes)
+
+    # endregion Body
+
+# endregion Functions
@@ -0,0 +1,39 @@
+import sys
+from pathlib import Path
+
+# The project root makes the src package importable
+project_root = str(Path(__file__).resolve().parents[1])
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from src.sweep import cell_key, load_results, parameter_sweep
+
+
+def test_resume_after_cut_off_line(tmp_path):
+    # region Summary
+    """
+    A store whose last line was cut off by a crash is resumed: the cut cell runs again and every cell loads
+    """
+    # endregion Summary
+
+    # region Body
+
+    path = tmp_path / "sweep.jsonl"
+    settings = dict(step_sizes=[0.3, 0.5], n_steps=[1, 2], runs=2, episodes=1, max_steps=200, workers=2, seed=0)
+
+    parameter_sweep(str(path), **settings)
+
+    # Cut the last line in the middle, as a crash while writing it would
+    data = path.read_bytes()
+    last_line_start = data.rstrip(b"\n").rfind(b"\n") + 1
+    path.write_bytes(data[:last_line_start + 20])
+    assert len(load_results(str(path))) == 7
+
+    results = parameter_sweep(str(path), **settings)
+
+    stored = load_results(str(path))
+    assert len(stored) == 8
+    assert set(stored) == set(results)
+    assert all(cell_key(record["run"], record["number_of_steps"], record["step_size"]) in stored for record in results.values())
+
+    # endregion Body
@@ -186,6 +186,24 @@ class Bandit:
         # a normal (Gaussian) distribution with μ = 𝑞_∗(𝑎) mean and σ = 1 variance
         actual_reward = np.random.randn() + self.action_values[action]
 
+        # Update estimated action value with the sampled reward
+        self.update(action, actual_reward)
+
+        return actual_reward
+
+        # endregion Body
+
+    def update(self, action, actual_reward):
+        # region Summary
+        """
+        Update estimated action value with a reward observed for this action (e.g. a reward arriving from outside the simulation).
+        :param action: Action
+        :param actual_reward: Observed reward
+        """
+        # endregion Summary
+
+        # region Body
+
         # Add 1 to time step
         self.time += 1
 
@@ -215,7 +233,85 @@ class Bandit:
             # Incremental Implementation (Equation 2.3) with constant step size parameter
             self.estimated_action_values[action] += self.step_size * (actual_reward - self.estimated_action_values[action])
 
-        return actual_reward
+        # endregion Body
+
+    def update_batch(self, actions, actual_rewards, sequential: bool = False):
+        # region Summary
+        """
+        Update estimated action values with a batch of rewards observed for a batch of actions, in the order they are given.
+        The result is the same as calling update() for every (action, reward) pair in order:
+          - sample-average method doesn't depend on the order, per-action sums are scattered with np.bincount,
+          - constant step size does: the 𝑗-th of 𝑚 rewards of action 𝑎 is weighted by 𝛼(1 - 𝛼)^(𝑚 - 𝑗)
+            and the old estimate by (1 - 𝛼)^𝑚, which reproduces the sequential updates exactly,
+          - the average reward (baseline) is the exact running average at every observation.
+        GBA changes the policy 𝜋_𝑡 after every update, so by default the whole batch uses the policy of the current preferences
+        (1 vectorized update); with sequential=True the policy is recomputed after every update instead (exact, 1 update per pair).
+        :param actions: Actions
+        :param actual_rewards: Observed rewards
+        :param sequential: if True, apply GBA updates one by one with the policy recomputed after every update
+        """
+        # endregion Summary
+
+        # region Body
+
+        actions = np.asarray(actions, dtype=np.int64)
+        actual_rewards = np.asarray(actual_rewards, dtype=float)
+        batch_size = len(actions)
+
+        if batch_size == 0:
+            return
+
+        if self.use_gradient and not self.use_sample_averages and sequential:
+            for action, actual_reward in zip(actions, actual_rewards):
+                # Policy of the current preferences
+                exponential_estimations = np.exp(self.estimated_action_values)
+                self.action_probability = exponential_estimations / np.sum(exponential_estimations)
+
+                self.update(action, actual_reward)
+
+            return
+
+        # Number of times each action has been selected in this batch
+        batch_count = np.bincount(actions, minlength=self.k)
+
+        # Running average of the rewards after every observation of the batch
+        average_rewards = (self.average_reward * self.time + np.cumsum(actual_rewards)) / (self.time + np.arange(1, batch_size + 1))
+
+        if self.use_sample_averages: # Sample-average method: new estimate is the average of old and new rewards
+            selected = batch_count > 0
+            reward_sums = np.bincount(actions, weights=actual_rewards, minlength=self.k)
+            self.estimated_action_values[selected] = ((self.estimated_action_values[selected] * self.action_selection_count[selected] + reward_sums[selected]) /
+                                                      (self.action_selection_count[selected] + batch_count[selected]))
+
+        elif self.use_gradient: # GBA with the policy of the current preferences for the whole batch
+            exponential_estimations = np.exp(self.estimated_action_values - np.max(self.estimated_action_values))
+            self.action_probability = exponential_estimations / np.sum(exponential_estimations)
+
+            baselines = average_rewards if self.use_gradient_baseline else 0
+            update_sizes = self.step_size * (actual_rewards - baselines)
+
+            # Sum of Equation 2.12 over the batch: every update pushes the selected action up and all actions down by 𝜋
+            self.estimated_action_values -= np.sum(update_sizes) * self.action_probability
+            self.estimated_action_values += np.bincount(actions, weights=update_sizes, minlength=self.k)
+
+        else: # Constant step size: weight every reward by how many later rewards of the same action decay it
+            order = np.argsort(actions, kind="stable")
+            sorted_actions = actions[order]
+
+            # Position of every observation among the observations of the same action
+            positions = np.arange(batch_size) - np.searchsorted(sorted_actions, sorted_actions, side="left")
+
+            # Number of later observations of the same action (denoted as 𝑚 - 𝑗)
+            later_count = batch_count[sorted_actions] - 1 - positions
+
+            weights = self.step_size * np.power(1 - self.step_size, later_count)
+
+            self.estimated_action_values *= np.power(1 - self.step_size, batch_count)
+            self.estimated_action_values += np.bincount(sorted_actions, weights=weights * actual_rewards[order], minlength=self.k)
+
+        self.time += batch_size
+        self.action_selection_count += batch_count
+        self.average_reward = average_rewards[-1]
 
         # endregion Body
 
@@ -0,0 +1,316 @@
+import numpy as np
+
+class BatchedBandit:
+    # region Summary
+    """
+    k-armed Bandit that advances many independent runs in lockstep.
+    Every per-run quantity of Bandit is stored as a (runs, k) or (runs,) array, so one call to act() or step()
+    advances all runs with a handful of vectorized NumPy operations instead of one Python-level call per run.
+    """
+    # endregion Summary
+
+    # region Constructor
+
+    def __init__(self, runs: int = 2000, arms_number: int = 10, use_sample_averages: bool = False, epsilon=0., initial_action_value_estimates=0., confidence_level=None,
+                 use_gradient: bool = False, step_size=0.1, use_gradient_baseline: bool = False, true_expected_reward=0.):
+        # region Summary
+        """
+        Batched k-armed Bandit.
+        :param runs: Number of independent runs (bandit problems) advanced together
+        :param arms_number: (denoted as k) number of bandit's arms
+        :param use_sample_averages: if True, use sample-average method for estimating action values
+        :param epsilon: (denoted as ε) probability for exploration in ε-greedy algorithm
+        :param initial_action_value_estimates: (denoted as 𝑄_1(𝑎)) initial estimation for each action value
+        :param confidence_level: (denoted as 𝑐) if not None, use Upper-Confidence-Bound (UCB) action selection
+        :param use_gradient: if True, use Gradient Bandit Algorithm (GBA)
+        :param step_size: (denoted as 𝛼) constant step size for updating estimates
+        :param use_gradient_baseline: if True, use average reward as baseline for GBA
+        :param true_expected_reward: true expected rewards selected from normal (Gaussian) distribution with μ=4 mean and σ=1 variance
+        NOTE: epsilon, initial_action_value_estimates, confidence_level, step_size and true_expected_reward can also be
+        arrays of shape (runs,), so that every run uses its own parameter value (e.g. for parameter studies).
+        use_sample_averages can be a boolean array of shape (runs,) as well, to mix sample-average and constant step size runs.
+        """
+        # endregion Summary
+
+        # region Body
+
+        self.runs = runs
+        self.k = arms_number
+
+        # Row index of every run, used to pick one entry per row of (runs, k) arrays
+        self.rows = np.arange(self.runs)
+
+        # Value of each action for every run (denoted as 𝑞_∗(𝑎)), shape (runs, k)
+        self.action_values = None
+
+        # Estimated value of each action for every run (denoted as 𝑄_𝑡(𝑎)), shape (runs, k)
+        self.estimated_action_values = None
+
+        self.use_sample_averages = use_sample_averages
+        self.epsilon = epsilon
+        self.initial_action_value_estimates = initial_action_value_estimates
+        self.confidence_level = confidence_level
+
+        # Time steps (all runs move in lockstep, so they share the same time)
+        self.time = 0
+
+        # Number of times each action has been selected for every run (denoted as 𝑁_𝑡(𝑎)), shape (runs, k)
+        self.action_selection_count = None
+
+        self.use_gradient = use_gradient
+
+        # Probability of taking action 𝑎 at time 𝑡 for every run (denoted as 𝜋_𝑡(𝑎)), shape (runs, k)
+        self.action_probability = None
+
+        self.step_size = step_size
+
+        # Average of the rewards up to (but not including) time 𝑡 for every run (denoted as 𝑅̅_𝑡), shape (runs,)
+        self.average_reward = None
+
+        self.use_gradient_baseline = use_gradient_baseline
+        self.true_expected_reward = true_expected_reward
+
+        # Optimal action for every run, shape (runs,)
+        self.optimal_action = None
+
+        # endregion Body
+
+    # endregion Constructor
+
+    # region Functions
+
+    @staticmethod
+    def column(value):
+        # region Summary
+        """
+        Reshape a scalar or per-run parameter, so that it broadcasts against (runs, k) arrays
+        :param value: Scalar or array of shape (runs,)
+        :return: Array of shape (1,) or (runs, 1)
+        """
+        # endregion Summary
+
+        # region Body
+
+        return np.asarray(value, dtype=float)[..., np.newaxis]
+
+        # endregion Body
+
+    @classmethod
+    def from_bandit(cls, bandit, runs):
+        # region Summary
+        """
+        Create a batched copy of the configuration of a scalar Bandit
+        :param bandit: Bandit whose parameters are copied
+        :param runs: Number of independent runs
+        :return: BatchedBandit
+        """
+        # endregion Summary
+
+        # region Body
+
+        return cls(runs=runs,
+                   arms_number=bandit.k,
+                   use_sample_averages=bandit.use_sample_averages,
+                   epsilon=bandit.epsilon,
+                   initial_action_value_estimates=bandit.initial_action_value_estimates,
+                   confidence_level=bandit.confidence_level,
+                   use_gradient=bandit.use_gradient,
+                   step_size=bandit.step_size,
+                   use_gradient_baseline=bandit.use_gradient_baseline,
+                   true_expected_reward=bandit.true_expected_reward)
+
+        # endregion Body
+
+    def initialize(self):
+        # region Summary
+        """
+        Initialize action parameters of every run
+        """
+        # endregion Summary
+
+        # region Body
+
+        # Initialize action values of every run according to a normal (Gaussian) distribution with μ=0 mean and σ=1 variance.
+        # In case of GBA, add true_expected_reward != 0.
+        self.action_values = np.random.randn(self.runs, self.k) + self.column(self.true_expected_reward)
+
+        # Realistic (0s) or optimistic (initial_action_value_estimates != 0) initial estimates
+        self.estimated_action_values = np.zeros((self.runs, self.k)) + self.column(self.initial_action_value_estimates)
+
+        # Set time steps to 0
+        self.time = 0
+
+        # None of actions has been selected yet
+        self.action_selection_count = np.zeros((self.runs, self.k))
+
+        # Average reward of every run starts from 0
+        self.average_reward = np.zeros(self.runs)
+
+        # Optimal action of every run is the action with the highest value
+        self.optimal_action = np.argmax(self.action_values, axis=1)
+
+        # endregion Body
+
+    def greedy(self, values):
+        # region Summary
+        """
+        Select the greedy action of every run, breaking ties randomly
+        :param values: Action values of shape (runs, k)
+        :return: Actions of shape (runs,)
+        """
+        # endregion Summary
+
+        # region Body
+
+        # Mark the actions with the highest value in every row
+        is_greedy = values == np.max(values, axis=1, keepdims=True)
+
+        # Give every greedy action a random priority and every other action -1, so argmax picks uniformly among ties
+        return np.argmax(np.where(is_greedy, np.random.rand(self.runs, self.k), -1.), axis=1)
+
+        # endregion Body
+
+    def act(self):
+        # region Summary
+        """
+        Get an action for every run.
+        :return: Actions of shape (runs,)
+        """
+        # endregion Summary
+
+        # region Body
+
+        # region UCB
+
+        if self.confidence_level is not None:
+            UCB_estimation = (self.estimated_action_values +
+                              self.column(self.confidence_level) * np.sqrt(np.log(self.time + 1) / (self.action_selection_count + 1e-5)))
+            actions = self.greedy(UCB_estimation)
+
+        # endregion UCB
+
+        # region GBA
+
+        elif self.use_gradient:
+            # Subtracting the row maximum doesn't change the soft-max distribution but keeps np.exp from overflowing
+            exponential_estimations = np.exp(self.estimated_action_values - np.max(self.estimated_action_values, axis=1, keepdims=True))
+            self.action_probability = exponential_estimations / np.sum(exponential_estimations, axis=1, keepdims=True)
+
+            # Inverse transform sampling: count how many cumulative probabilities lie below a uniform sample in every row
+            cumulative_probability = np.cumsum(self.action_probability, axis=1)
+            actions = np.sum(cumulative_probability < np.random.rand(self.runs, 1), axis=1)
+            actions = np.minimum(actions, self.k - 1)
+
+        # endregion GBA
+
+        # region Greedy
+
+        else:
+            actions = self.greedy(self.estimated_action_values)
+
+        # endregion Greedy
+
+        # region ε-greedy
+
+        # With small probability ε, every run independently replaces its action with a uniformly random one
+        explore = np.random.rand(self.runs) < self.epsilon
+        actions[explore] = np.random.randint(self.k, size=np.count_nonzero(explore))
+
+        # endregion ε-greedy
+
+        return actions
+
+        # endregion Body
+
+    def step(self, actions):
+        # region Summary
+        """
+        Update estimated action values and return rewards for the actions of every run.
+        :param actions: Actions of shape (runs,)
+        :return: Rewards of shape (runs,)
+        """
+        # endregion Summary
+
+        # region Body
+
+        # Rewards are selected from a normal (Gaussian) distribution with μ = 𝑞_∗(𝑎) mean and σ = 1 variance
+        actual_rewards = np.random.randn(self.runs) + self.action_values[self.rows, actions]
+
+        # Add 1 to time step
+        self.time += 1
+
+        # Add 1 to number of times the selected actions have been selected
+        self.action_selection_count[self.rows, actions] += 1
+
+        # The average of the rewards can be computed incrementally
+        self.average_reward += (actual_rewards - self.average_reward) / self.time
+
+        if np.all(self.use_sample_averages): # Update estimated action values using sample-average method (Equation 2.3)
+            self.estimated_action_values[self.rows, actions] += ((actual_rewards - self.estimated_action_values[self.rows, actions]) /
+                                                                 self.action_selection_count[self.rows, actions])
+
+        elif self.use_gradient: # Update estimated action values using GBA (Equation 2.12)
+            one_hot_encoding = np.zeros((self.runs, self.k))
+            one_hot_encoding[self.rows, actions] = 1
+
+            baseline = self.average_reward if self.use_gradient_baseline else 0
+
+            self.estimated_action_values += self.column(self.step_size) * (actual_rewards - baseline)[:, np.newaxis] * (one_hot_encoding - self.action_probability)
+
+        else: # Update estimated action values with constant step size
+            step_sizes = self.step_size
+
+            # Runs using sample-average method (if any) use 1 / 𝑁_𝑡(𝑎) as step size instead
+            if np.any(self.use_sample_averages):
+                step_sizes = np.where(self.use_sample_averages, 1 / self.action_selection_count[self.rows, actions], self.step_size)
+
+            self.estimated_action_values[self.rows, actions] += step_sizes * (actual_rewards - self.estimated_action_values[self.rows, actions])
+
+        return actual_rewards
+
+        # endregion Body
+
+    # endregion Functions
+
+
+# region Functions
+
+def simulate(runs, times, bandits):
+    # region Summary
+    """
+    Batched counterpart of the notebook's simulate(): every bandit configuration runs all of its runs in lockstep.
+    :param runs: Number of runs
+    :param times: Number of times
+    :param bandits: Bandit problems (Bandit or BatchedBandit instances; a Bandit is only used as a configuration)
+    :return: Optimal action count mean and reward mean, each of shape (len(bandits), times)
+    """
+    # endregion Summary
+
+    # region Body
+
+    rewards = np.zeros((len(bandits), times))
+    optimal_action_counts = np.zeros(rewards.shape)
+
+    # For every bandit
+    for i, bandit in enumerate(bandits):
+        # create a batched copy of scalar bandits
+        if not isinstance(bandit, BatchedBandit):
+            bandit = BatchedBandit.from_bandit(bandit, runs)
+
+        # initialize all runs at once
+        bandit.initialize()
+
+        # for every time step
+        for time in range(times):
+            # select an action for every run
+            actions = bandit.act()
+
+            # average the rewards and the optimal action hits over runs
+            rewards[i, time] = np.mean(bandit.step(actions))
+            optimal_action_counts[i, time] = np.mean(actions == bandit.optimal_action)
+
+    return optimal_action_counts, rewards
+
+    # endregion Body
+
+# endregion Functions
@@ -0,0 +1,175 @@
+from statistics import NormalDist
+
+import numpy as np
+
+from src.bandit import Bandit
+from src.batched_bandit import BatchedBandit
+
+class BatchedBayesianBandit(BatchedBandit):
+    # region Summary
+    """
+    Batched k-armed Bandit with Gaussian Bayesian action selection.
+    Every action value has a normal (Gaussian) posterior, updated in closed form from normally distributed rewards with known σ.
+    Posterior means are kept in estimated_action_values and posterior precisions in posterior_precision, both of shape (runs, k):
+      - Thompson sampling: draw 1 sample from every posterior of every run (1 call to the random number generator per step)
+        and select the action with the highest sample,
+      - Bayesian UCB: select the action with the highest posterior quantile of level 1 - 1/(𝑡 + 2).
+    """
+    # endregion Summary
+
+    # region Constructor
+
+    def __init__(self, runs: int = 2000, arms_number: int = 10, selection="thompson", prior_mean=0., prior_std=1., reward_std=1.,
+                 epsilon=0., true_expected_reward=0.):
+        # region Summary
+        """
+        Constructor of BatchedBayesianBandit class
+        :param runs: Number of independent runs (bandit problems) advanced together
+        :param arms_number: (denoted as k) number of bandit's arms
+        :param selection: "thompson" for Thompson sampling or "bayes_ucb" for Bayesian UCB
+        :param prior_mean: Mean of the prior of every action value
+        :param prior_std: Standard deviation of the prior of every action value
+        :param reward_std: Known standard deviation of the rewards
+        :param epsilon: (denoted as ε) probability for exploration in ε-greedy algorithm
+        :param true_expected_reward: true expected rewards selected from normal (Gaussian) distribution with μ=4 mean and σ=1 variance
+        """
+        # endregion Summary
+
+        # region Body
+
+        if selection not in ("thompson", "bayes_ucb"):
+            raise ValueError(f"Unexpected selection {selection}")
+
+        super().__init__(runs=runs, arms_number=arms_number, epsilon=epsilon, initial_action_value_estimates=prior_mean,
+                         true_expected_reward=true_expected_reward)
+
+        self.selection = selection
+        self.prior_std = prior_std
+        self.reward_std = reward_std
+
+        # Precision (1 / variance) of the posterior of every action value for every run, shape (runs, k)
+        self.posterior_precision = None
+
+        # endregion Body
+
+    # endregion Constructor
+
+    # region Functions
+
+    def initialize(self):
+        # region Summary
+        """
+        Initialize action parameters and posteriors of every run
+        """
+        # endregion Summary
+
+        # region Body
+
+        super().initialize()
+
+        # Posteriors start out as priors
+        self.posterior_precision = np.full((self.runs, self.k), 1 / self.prior_std ** 2)
+
+        # endregion Body
+
+    def act(self):
+        # region Summary
+        """
+        Get an action for every run.
+        :return: Actions of shape (runs,)
+        """
+        # endregion Summary
+
+        # region Body
+
+        posterior_std = 1 / np.sqrt(self.posterior_precision)
+
+        if self.selection == "thompson":
+            # 1 sample from every posterior of every run, ties have zero probability
+            samples = self.estimated_action_values + posterior_std * np.random.randn(self.runs, self.k)
+            actions = np.argmax(samples, axis=1)
+
+        else:
+            # The quantile level is shared by all runs, so the standard normal quantile is computed once per step
+            quantile = NormalDist().inv_cdf(1 - 1 / (self.time + 2))
+            actions = self.greedy(self.estimated_action_values + quantile * posterior_std)
+
+        # With small probability ε, every run independently replaces its action with a uniformly random one
+        explore = np.random.rand(self.runs) < self.epsilon
+        actions[explore] = np.random.randint(self.k, size=np.count_nonzero(explore))
+
+        return actions
+
+        # endregion Body
+
+    def step(self, actions):
+        # region Summary
+        """
+        Update posteriors and return rewards for the actions of every run.
+        :param actions: Actions of shape (runs,)
+        :return: Rewards of shape (runs,)
+        """
+        # endregion Summary
+
+        # region Body
+
+        actual_rewards = self.reward_std * np.random.randn(self.runs) + self.action_values[self.rows, actions]
+
+        self.time += 1
+        self.action_selection_count[self.rows, actions] += 1
+        self.average_reward += (actual_rewards - self.average_reward) / self.time
+
+        # Conjugate normal update: precisions add up, means are precision-weighted averages
+        reward_precision = 1 / self.reward_std ** 2
+        old_precision = self.posterior_precision[self.rows, actions]
+        new_precision = old_precision + reward_precision
+
+        self.estimated_action_values[self.rows, actions] = ((self.estimated_action_values[self.rows, actions] * old_precision +
+                                                             actual_rewards * reward_precision) / new_precision)
+        self.posterior_precision[self.rows, actions] = new_precision
+
+        return actual_rewards
+
+        # endregion Body
+
+    # endregion Functions
+
+
+# region Functions
+
+def compare_regret(runs, times, bandits):
+    # region Summary
+    """
+    Compare the expected cumulative regret of batched bandits: at every step a run loses 𝑞_∗(𝑎_∗) - 𝑞_∗(𝐴_𝑡).
+    :param runs: Number of runs
+    :param times: Number of times
+    :param bandits: Bandit problems (BatchedBandit instances or Bandit configurations)
+    :return: Cumulative regret averaged over runs, of shape (len(bandits), times)
+    """
+    # endregion Summary
+
+    # region Body
+
+    regrets = np.zeros((len(bandits), times))
+
+    # For every bandit
+    for i, bandit in enumerate(bandits):
+        if isinstance(bandit, Bandit):
+            bandit = BatchedBandit.from_bandit(bandit, runs)
+
+        bandit.initialize()
+
+        # Value of the optimal action of every run
+        optimal_values = np.max(bandit.action_values, axis=1)
+
+        for time in range(times):
+            actions = bandit.act()
+            regrets[i, time] = np.mean(optimal_values - bandit.action_values[bandit.rows, actions])
+            bandit.step(actions)
+
+    # Average of cumulative sums is the cumulative sum of averages
+    return np.cumsum(regrets, axis=1)
+
+    # endregion Body
+
+# endregion Functions
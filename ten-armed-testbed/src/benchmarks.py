@@ -0,0 +1,64 @@
+import copy
+import time
+
+import numpy as np
+
+from src.bandit import Bandit
+
+# region Functions
+
+def benchmark_update_batch(batch_size=10000, repeats=5, arms_number=10):
+    # region Summary
+    """
+    Compare Bandit.update_batch() against looping Bandit.update() over the same (action, reward) pairs
+    (which is what looping Bandit.step() does after sampling the rewards).
+    :param batch_size: Number of (action, reward) pairs per batch
+    :param repeats: Number of timed repetitions (the best one is reported)
+    :param arms_number: (denoted as k) number of bandit's arms
+    :return: Dictionary of "mode: (loop seconds, batch seconds, speedup)"
+    """
+    # endregion Summary
+
+    # region Body
+
+    modes = {
+        "sample averages": dict(use_sample_averages=True),
+        "constant step size": dict(step_size=0.1),
+        "gradient": dict(use_gradient=True, use_gradient_baseline=True),
+        "gradient (sequential)": dict(use_gradient=True, use_gradient_baseline=True),
+    }
+
+    results = dict()
+
+    for mode, parameters in modes.items():
+        bandit = Bandit(arms_number=arms_number, **parameters)
+        bandit.initialize()
+        bandit.act()
+
+        actions = np.random.randint(arms_number, size=batch_size)
+        actual_rewards = np.random.randn(batch_size) + bandit.action_values[actions]
+
+        loop_times = []
+        batch_times = []
+
+        for _ in range(repeats):
+            # Loop over update() on a copy
+            looped = copy.deepcopy(bandit)
+            start = time.perf_counter()
+            for action, actual_reward in zip(actions, actual_rewards):
+                looped.update(action, actual_reward)
+            loop_times.append(time.perf_counter() - start)
+
+            # 1 update_batch() call on another copy
+            batched = copy.deepcopy(bandit)
+            start = time.perf_counter()
+            batched.update_batch(actions, actual_rewards, sequential=mode.endswith("(sequential)"))
+            batch_times.append(time.perf_counter() - start)
+
+        results[mode] = (min(loop_times), min(batch_times), min(loop_times) / min(batch_times))
+
+    return results
+
+    # endregion Body
+
+# endregion Functions
@@ -0,0 +1,353 @@
+import time
+
+import numpy as np
+
+from src.batched_bandit import BatchedBandit
+
+class Hook:
+    # region Summary
+    """
+    Base class of simulation hooks. Every callback does nothing, subclasses override the ones they need.
+    Callbacks always receive batched views: actions and rewards of shape (runs,) and action values of shape (runs, k),
+    where a scalar Bandit is seen as a batch of 1 run.
+    """
+    # endregion Summary
+
+    # region Hyper-parameters
+
+    # If True, simulate() measures the time spent in act() and step() and reports it to timed()
+    timing = False
+
+    # endregion Hyper-parameters
+
+    # region Functions
+
+    def start(self, bandits_number, runs, times, arms_number):
+        # region Summary
+        """
+        Called once before the simulation
+        :param bandits_number: Number of simulated bandits
+        :param runs: Number of runs
+        :param times: Number of times
+        :param arms_number: (denoted as k) number of bandit's arms
+        """
+        # endregion Summary
+
+        # region Body
+
+        pass
+
+        # endregion Body
+
+    def step(self, index, time_step, action_values, optimal_actions, actions, rewards):
+        # region Summary
+        """
+        Called after every step
+        :param index: Index of the bandit
+        :param time_step: Time step
+        :param action_values: True action values of shape (runs, k) at the moment of the action
+        :param optimal_actions: Optimal actions of shape (runs,) at the moment of the action
+        :param actions: Selected actions of shape (runs,)
+        :param rewards: Rewards of shape (runs,)
+        """
+        # endregion Summary
+
+        # region Body
+
+        pass
+
+        # endregion Body
+
+    def timed(self, index, steps, act_time, step_time):
+        # region Summary
+        """
+        Called after every step when timing is True
+        :param index: Index of the bandit
+        :param steps: Number of run-steps performed (runs for a batched step, 1 for a scalar one)
+        :param act_time: Time spent in act() (in nanoseconds)
+        :param step_time: Time spent in step() (in nanoseconds)
+        """
+        # endregion Summary
+
+        # region Body
+
+        pass
+
+        # endregion Body
+
+    # endregion Functions
+
+
+class RegretHook(Hook):
+    # region Summary
+    """
+    Cumulative regret: at every step a run loses 𝑞_∗(optimal action) - 𝑞_∗(𝐴_𝑡)
+    """
+    # endregion Summary
+
+    # region Functions
+
+    def start(self, bandits_number, runs, times, arms_number):
+        # region Summary
+        """
+        Reset the regrets (see Hook.start)
+        :param bandits_number: Number of simulated bandits
+        :param runs: Number of runs
+        :param times: Number of times
+        :param arms_number: (denoted as k) number of bandit's arms
+        """
+        # endregion Summary
+
+        # region Body
+
+        self.runs = runs
+
+        # Sum of the regrets of all runs at every time step
+        self.regret = np.zeros((bandits_number, times))
+
+        # endregion Body
+
+    def step(self, index, time_step, action_values, optimal_actions, actions, rewards):
+        # region Summary
+        """
+        Add the regrets of a step (see Hook.step)
+        :param index: Index of the bandit
+        :param time_step: Time step
+        :param action_values: True action values of shape (runs, k) at the moment of the action
+        :param optimal_actions: Optimal actions of shape (runs,) at the moment of the action
+        :param actions: Selected actions of shape (runs,)
+        :param rewards: Rewards of shape (runs,)
+        """
+        # endregion Summary
+
+        # region Body
+
+        rows = np.arange(len(actions))
+        self.regret[index, time_step] += np.sum(action_values[rows, optimal_actions] - action_values[rows, actions])
+
+        # endregion Body
+
+    def cumulative_regret(self):
+        # region Summary
+        """
+        Get the cumulative regret averaged over runs
+        :return: Cumulative regret of shape (bandits, times)
+        """
+        # endregion Summary
+
+        # region Body
+
+        return np.cumsum(self.regret / self.runs, axis=1)
+
+        # endregion Body
+
+    # endregion Functions
+
+
+class PullHistogramHook(Hook):
+    # region Summary
+    """
+    Per-arm pull histograms, both by arm index and by the rank of the arm's true value (rank 0 is the optimal arm),
+    since arm indices carry no meaning across independent runs.
+    """
+    # endregion Summary
+
+    # region Functions
+
+    def start(self, bandits_number, runs, times, arms_number):
+        # region Summary
+        """
+        Reset the histograms (see Hook.start)
+        :param bandits_number: Number of simulated bandits
+        :param runs: Number of runs
+        :param times: Number of times
+        :param arms_number: (denoted as k) number of bandit's arms
+        """
+        # endregion Summary
+
+        # region Body
+
+        self.k = arms_number
+        self.pulls = np.zeros((bandits_number, arms_number), dtype=np.int64)
+        self.rank_pulls = np.zeros((bandits_number, arms_number), dtype=np.int64)
+
+        # endregion Body
+
+    def step(self, index, time_step, action_values, optimal_actions, actions, rewards):
+        # region Summary
+        """
+        Count the pulls of a step by arm and by rank (see Hook.step)
+        :param index: Index of the bandit
+        :param time_step: Time step
+        :param action_values: True action values of shape (runs, k) at the moment of the action
+        :param optimal_actions: Optimal actions of shape (runs,) at the moment of the action
+        :param actions: Selected actions of shape (runs,)
+        :param rewards: Rewards of shape (runs,)
+        """
+        # endregion Summary
+
+        # region Body
+
+        rows = np.arange(len(actions))
+        self.pulls[index] += np.bincount(actions, minlength=self.k)
+
+        # Rank is the number of arms with a higher true value
+        ranks = np.sum(action_values > action_values[rows, actions][:, np.newaxis], axis=1)
+        self.rank_pulls[index] += np.bincount(ranks, minlength=self.k)
+
+        # endregion Body
+
+    # endregion Functions
+
+
+class TimingHook(Hook):
+    # region Summary
+    """
+    Wall-clock throughput, split between action selection (act) and update (step)
+    """
+    # endregion Summary
+
+    # region Hyper-parameters
+
+    timing = True
+
+    # endregion Hyper-parameters
+
+    # region Functions
+
+    def start(self, bandits_number, runs, times, arms_number):
+        # region Summary
+        """
+        Reset the timings (see Hook.start)
+        :param bandits_number: Number of simulated bandits
+        :param runs: Number of runs
+        :param times: Number of times
+        :param arms_number: (denoted as k) number of bandit's arms
+        """
+        # endregion Summary
+
+        # region Body
+
+        self.steps = np.zeros(bandits_number, dtype=np.int64)
+        self.act_time = np.zeros(bandits_number, dtype=np.int64)
+        self.step_time = np.zeros(bandits_number, dtype=np.int64)
+
+        # endregion Body
+
+    def timed(self, index, steps, act_time, step_time):
+        # region Summary
+        """
+        Add the timings of a step (see Hook.timed)
+        :param index: Index of the bandit
+        :param steps: Number of run-steps performed (runs for a batched step, 1 for a scalar one)
+        :param act_time: Time spent in act() (in nanoseconds)
+        :param step_time: Time spent in step() (in nanoseconds)
+        """
+        # endregion Summary
+
+        # region Body
+
+        self.steps[index] += steps
+        self.act_time[index] += act_time
+        self.step_time[index] += step_time
+
+        # endregion Body
+
+    def summary(self):
+        # region Summary
+        """
+        Get run-steps per second and the share of time spent in action selection for every bandit
+        :return: List of dictionaries (1 per bandit)
+        """
+        # endregion Summary
+
+        # region Body
+
+        total_time = (self.act_time + self.step_time) / 1e9
+
+        return [dict(steps_per_second=steps / seconds if seconds > 0 else 0.,
+                     act_seconds=act_time / 1e9,
+                     step_seconds=step_time / 1e9,
+                     act_share=act_time / (act_time + step_time) if act_time + step_time > 0 else 0.)
+                for steps, seconds, act_time, step_time in zip(self.steps, total_time, self.act_time, self.step_time)]
+
+        # endregion Body
+
+    # endregion Functions
+
+
+# region Functions
+
+def simulate(runs, times, bandits, hooks=(), batched: bool = True):
+    # region Summary
+    """
+    Simulate bandits like the notebook's simulate() and report every step to hooks.
+    Without hooks the plain loop runs, so instrumentation costs nothing when it is switched off.
+    :param runs: Number of runs
+    :param times: Number of times
+    :param bandits: Bandit problems (Bandit configurations, or BatchedBandit instances if batched)
+    :param hooks: Hooks to report to
+    :param batched: if True, advance all runs of a bandit together with BatchedBandit, otherwise run Bandit one run at a time
+    :return: Optimal action count mean and reward mean, each of shape (len(bandits), times)
+    """
+    # endregion Summary
+
+    # region Body
+
+    rewards = np.zeros((len(bandits), times))
+    optimal_action_counts = np.zeros(rewards.shape)
+
+    timing = any(hook.timing for hook in hooks)
+
+    for hook in hooks:
+        hook.start(len(bandits), runs, times, bandits[0].k)
+
+    # For every bandit
+    for i, bandit in enumerate(bandits):
+        if batched and not isinstance(bandit, BatchedBandit):
+            bandit = BatchedBandit.from_bandit(bandit, runs)
+
+        # A batched bandit advances all runs at once, a scalar one repeats every run
+        for run in range(1 if batched else runs):
+            bandit.initialize()
+
+            for time_step in range(times):
+                # Optimal actions at the moment of the action (step() of a nonstationary bandit replaces them)
+                optimal_actions = bandit.optimal_action
+
+                # Hooks see the true values at the moment of the action (a nonstationary bandit drifts them in place)
+                if hooks:
+                    action_values = np.array(bandit.action_values)
+
+                if timing:
+                    start = time.perf_counter_ns()
+                    actions = bandit.act()
+                    middle = time.perf_counter_ns()
+                    step_rewards = bandit.step(actions)
+                    end = time.perf_counter_ns()
+                else:
+                    actions = bandit.act()
+                    step_rewards = bandit.step(actions)
+
+                hits = actions == optimal_actions
+
+                # Average over runs (a scalar run contributes 1 / runs)
+                rewards[i, time_step] += np.sum(step_rewards) / runs
+                optimal_action_counts[i, time_step] += np.sum(hits) / runs
+
+                if hooks:
+                    batch_actions = np.atleast_1d(actions)
+                    batch_rewards = np.atleast_1d(step_rewards)
+                    batch_action_values = np.atleast_2d(action_values)
+                    batch_optimal_actions = np.atleast_1d(optimal_actions)
+
+                    for hook in hooks:
+                        hook.step(i, time_step, batch_action_values, batch_optimal_actions, batch_actions, batch_rewards)
+                        if timing:
+                            hook.timed(i, len(batch_actions), middle - start, end - middle)
+
+    return optimal_action_counts, rewards
+
+    # endregion Body
+
+# endregion Functions
@@ -0,0 +1,429 @@
+import numpy as np
+
+class TournamentTree:
+    # region Summary
+    """
+    Kinetic tournament tree over the scores 𝑠_𝑖(𝜆) = 𝑎_𝑖 + 𝜆 * 𝑏_𝑖 of k items, where 𝜆 can only grow.
+    Every internal node stores the winner (highest score) of its subtree and the smallest 𝜆 at which the winner
+    of some node in the subtree may change (its "melting" point), so:
+      - the winner of all items is read from the root in O(1),
+      - changing 1 item replays only the matches on its path to the root in O(log k),
+      - increasing 𝜆 replays only the matches whose outcome actually changes.
+    With all slopes 𝑏 equal to 0 (e.g. greedy action selection) nothing ever melts and the tree is a plain tournament tree.
+    Ties are broken by a random key per item, which is redrawn every time the item changes.
+    """
+    # endregion Summary
+
+    # region Constructor
+
+    def __init__(self, intercepts, slopes=None):
+        # region Summary
+        """
+        Constructor of TournamentTree class
+        :param intercepts: Intercepts of the scores (denoted as 𝑎)
+        :param slopes: Slopes of the scores (denoted as 𝑏), 0s if None
+        """
+        # endregion Summary
+
+        # region Body
+
+        self.k = len(intercepts)
+
+        # Number of leaves: the smallest power of 2 which is not less than k
+        self.size = 1 << max(0, (self.k - 1).bit_length())
+
+        # Padding leaves have -∞ scores, so they never win against real items
+        self.intercepts = np.full(self.size, -np.inf)
+        self.intercepts[:self.k] = intercepts
+
+        self.slopes = np.zeros(self.size)
+        if slopes is not None:
+            self.slopes[:self.k] = slopes
+
+        # Random tie-breaking key of every item
+        self.keys = np.random.rand(self.size)
+
+        # Current 𝜆
+        self.time = 0.
+
+        # Winner item of every node (node 1 is the root, node 𝑛 has children 2𝑛 and 2𝑛 + 1, leaves are nodes size..2 * size - 1)
+        self.winner = np.zeros(2 * self.size, dtype=np.int64)
+        self.winner[self.size:] = np.arange(self.size)
+
+        # Smallest 𝜆 at which the winner of some node in the subtree may change
+        self.melt = np.full(2 * self.size, np.inf)
+
+        self.build()
+
+        # endregion Body
+
+    # endregion Constructor
+
+    # region Functions
+
+    def compete(self, left, right):
+        # region Summary
+        """
+        Play the matches between items of the left and right children of many nodes at once
+        :param left: Winner items of the left children
+        :param right: Winner items of the right children
+        :return: Winner items and the 𝜆 at which every loser overtakes its winner
+        """
+        # endregion Summary
+
+        # region Body
+
+        left_scores = self.intercepts[left] + self.time * self.slopes[left]
+        right_scores = self.intercepts[right] + self.time * self.slopes[right]
+
+        left_wins = (left_scores > right_scores) | ((left_scores == right_scores) & (self.keys[left] > self.keys[right]))
+        winners = np.where(left_wins, left, right)
+        losers = np.where(left_wins, right, left)
+
+        # A loser with a steeper slope overtakes the winner when both lines cross
+        with np.errstate(divide="ignore", invalid="ignore"):
+            crossings = (self.intercepts[winners] - self.intercepts[losers]) / (self.slopes[losers] - self.slopes[winners])
+        crossings = np.where(self.slopes[losers] > self.slopes[winners], crossings, np.inf)
+
+        # Lines which are tied right now (and won by the key) cross just after the current 𝜆
+        crossings = np.where(crossings <= self.time, np.nextafter(self.time, np.inf), crossings)
+
+        return winners, crossings
+
+        # endregion Body
+
+    def build(self):
+        # region Summary
+        """
+        Play all the matches level by level, from the leaves up to the root
+        """
+        # endregion Summary
+
+        # region Body
+
+        level = self.size // 2
+        while level >= 1:
+            nodes = np.arange(level, 2 * level)
+            winners, crossings = self.compete(self.winner[2 * nodes], self.winner[2 * nodes + 1])
+            self.winner[nodes] = winners
+            self.melt[nodes] = np.minimum(crossings, np.minimum(self.melt[2 * nodes], self.melt[2 * nodes + 1]))
+            level //= 2
+
+        # endregion Body
+
+    def replay(self, node):
+        # region Summary
+        """
+        Replay the match of 1 node from the current winners of its children
+        :param node: Node
+        """
+        # endregion Summary
+
+        # region Body
+
+        left, right = self.winner[2 * node], self.winner[2 * node + 1]
+
+        a, b, keys, time = self.intercepts, self.slopes, self.keys, self.time
+        left_score = a[left] + time * b[left]
+        right_score = a[right] + time * b[right]
+
+        if left_score > right_score or (left_score == right_score and keys[left] > keys[right]):
+            winner, loser = left, right
+        else:
+            winner, loser = right, left
+
+        crossing = np.inf
+        if b[loser] > b[winner]:
+            crossing = max((a[winner] - a[loser]) / (b[loser] - b[winner]), np.nextafter(time, np.inf))
+
+        self.winner[node] = winner
+        self.melt[node] = min(crossing, self.melt[2 * node], self.melt[2 * node + 1])
+
+        # endregion Body
+
+    def update(self, item, intercept, slope=0.):
+        # region Summary
+        """
+        Change the score of 1 item in O(log k)
+        :param item: Item index
+        :param intercept: New intercept
+        :param slope: New slope
+        """
+        # endregion Summary
+
+        # region Body
+
+        self.intercepts[item] = intercept
+        self.slopes[item] = slope
+        self.keys[item] = np.random.rand()
+
+        # Replay the matches on the path from the leaf to the root
+        node = (item + self.size) // 2
+        while node >= 1:
+            self.replay(node)
+            node //= 2
+
+        # endregion Body
+
+    def fix(self, node):
+        # region Summary
+        """
+        Replay the melted matches of a subtree
+        :param node: Root of the subtree
+        """
+        # endregion Summary
+
+        # region Body
+
+        for child in (2 * node, 2 * node + 1):
+            if self.melt[child] <= self.time:
+                self.fix(child)
+
+        self.replay(node)
+
+        # endregion Body
+
+    def advance(self, time):
+        # region Summary
+        """
+        Move 𝜆 forward, replaying only the matches whose outcome changes
+        :param time: New 𝜆 (not less than the current one)
+        """
+        # endregion Summary
+
+        # region Body
+
+        self.time = max(self.time, time)
+
+        if self.melt[1] <= self.time:
+            self.fix(1)
+
+        # endregion Body
+
+    def argmax(self):
+        # region Summary
+        """
+        Get the item with the highest score
+        :return: Item index
+        """
+        # endregion Summary
+
+        # region Body
+
+        return int(self.winner[1])
+
+        # endregion Body
+
+    # endregion Functions
+
+
+class LargeBandit:
+    # region Summary
+    """
+    k-armed Bandit for large numbers of arms (10⁴–10⁶).
+    Bandit.act() scans all k estimates on every step. Here greedy, ε-greedy and UCB action selection read the winner
+    of a TournamentTree and every update replays only the path of the selected arm, so act + step cost O(log k):
+      - greedy: scores are the estimates 𝑄_𝑡(𝑎),
+      - UCB: scores are 𝑄_𝑡(𝑎) + 𝜆_𝑡 * 𝑏_𝑡(𝑎) with 𝜆_𝑡 = 𝑐 * sqrt(ln 𝑡) shared by all arms and 𝑏_𝑡(𝑎) = 1 / sqrt(𝑁_𝑡(𝑎)),
+        so only the pulled arm's line changes and the growth of 𝜆_𝑡 is handled by the kinetic tree.
+    NOTE: the gradient update (Equation 2.12) changes the preference of every arm, so GBA stays O(k) per step.
+    The exponentials of the preferences and their sum (the soft-max normalizer) are maintained by step() for act() to sample from.
+    """
+    # endregion Summary
+
+    # region Constructor
+
+    def __init__(self, arms_number: int = 10000, use_sample_averages: bool = False, epsilon=0., initial_action_value_estimates=0., confidence_level=None,
+                 use_gradient: bool = False, step_size=0.1, use_gradient_baseline: bool = False, true_expected_reward=0.):
+        # region Summary
+        """
+        Large k-armed Bandit.
+        :param arms_number: (denoted as k) number of bandit's arms
+        :param use_sample_averages: if True, use sample-average method for estimating action values
+        :param epsilon: (denoted as ε) probability for exploration in ε-greedy algorithm
+        :param initial_action_value_estimates: (denoted as 𝑄_1(𝑎)) initial estimation for each action value
+        :param confidence_level: (denoted as 𝑐) if not None, use Upper-Confidence-Bound (UCB) action selection
+        :param use_gradient: if True, use Gradient Bandit Algorithm (GBA)
+        :param step_size: (denoted as 𝛼) constant step size for updating estimates
+        :param use_gradient_baseline: if True, use average reward as baseline for GBA
+        :param true_expected_reward: true expected rewards selected from normal (Gaussian) distribution with μ=4 mean and σ=1 variance
+        """
+        # endregion Summary
+
+        # region Body
+
+        self.k = arms_number
+        self.use_sample_averages = use_sample_averages
+        self.epsilon = epsilon
+        self.initial_action_value_estimates = initial_action_value_estimates
+        self.confidence_level = confidence_level
+        self.use_gradient = use_gradient
+        self.step_size = step_size
+        self.use_gradient_baseline = use_gradient_baseline
+        self.true_expected_reward = true_expected_reward
+
+        # Value of each action (denoted as 𝑞_∗(𝑎))
+        self.action_values = None
+
+        # Estimated value of each action (denoted as 𝑄_𝑡(𝑎)), preferences (denoted as 𝐻_𝑡(𝑎)) in case of GBA
+        self.estimated_action_values = None
+
+        # Number of times each action has been selected (denoted as 𝑁_𝑡(𝑎))
+        self.action_selection_count = None
+
+        # Time steps
+        self.time = 0
+
+        # Average of the rewards up to (but not including) time 𝑡 (denoted as 𝑅̅_𝑡)
+        self.average_reward = 0
+
+        # Tournament tree over the action selection scores (greedy and UCB)
+        self.tree = None
+
+        # Exponentials of the preferences shifted by their maximum and their sum (GBA)
+        self.exponential_estimations = None
+        self.normalizer = None
+
+        # Probability of taking action 𝑎 at time 𝑡 (denoted as 𝜋_𝑡(𝑎))
+        self.action_probability = None
+
+        # Optimal action
+        self.optimal_action = None
+
+        # endregion Body
+
+    # endregion Constructor
+
+    # region Functions
+
+    def slope(self, count):
+        # region Summary
+        """
+        Get the UCB exploration slope of an arm (the UCB bonus is 𝜆_𝑡 times this slope)
+        :param count: Number of times the arm has been selected
+        :return: Slope
+        """
+        # endregion Summary
+
+        # region Body
+
+        return 1 / np.sqrt(count + 1e-5)
+
+        # endregion Body
+
+    def initialize(self):
+        # region Summary
+        """
+        Initialize action parameters in O(k)
+        """
+        # endregion Summary
+
+        # region Body
+
+        self.action_values = np.random.randn(self.k) + self.true_expected_reward
+        self.estimated_action_values = np.zeros(self.k) + self.initial_action_value_estimates
+        self.action_selection_count = np.zeros(self.k)
+        self.time = 0
+        self.average_reward = 0
+        self.optimal_action = np.argmax(self.action_values)
+
+        if self.use_gradient:
+            self.update_exponentials()
+        elif self.confidence_level is not None:
+            self.tree = TournamentTree(self.estimated_action_values, self.slope(self.action_selection_count))
+        else:
+            self.tree = TournamentTree(self.estimated_action_values)
+
+        # endregion Body
+
+    def update_exponentials(self):
+        # region Summary
+        """
+        Recompute the exponentials of the preferences and the soft-max normalizer (GBA)
+        """
+        # endregion Summary
+
+        # region Body
+
+        # Shifting by the maximum preference doesn't change the soft-max distribution but keeps np.exp from overflowing
+        self.exponential_estimations = np.exp(self.estimated_action_values - np.max(self.estimated_action_values))
+        self.normalizer = np.sum(self.exponential_estimations)
+
+        # endregion Body
+
+    def act(self):
+        # region Summary
+        """
+        Get an action for this bandit.
+        :return: Action
+        """
+        # endregion Summary
+
+        # region Body
+
+        # ε-greedy: with small probability ε, select randomly from among all the actions with equal probability
+        if np.random.rand() < self.epsilon:
+            return np.random.randint(self.k)
+
+        # GBA: sample from the soft-max distribution by inverse transform sampling
+        if self.use_gradient:
+            action = np.searchsorted(np.cumsum(self.exponential_estimations), np.random.rand() * self.normalizer, side="right")
+            return min(int(action), self.k - 1)
+
+        # UCB: the exploration multiplier 𝜆_𝑡 = 𝑐 * sqrt(ln(𝑡 + 1)) only grows, so the kinetic tree only replays melted matches
+        if self.confidence_level is not None:
+            self.tree.advance(self.confidence_level * np.sqrt(np.log(self.time + 1)))
+
+        # Greedy (or UCB) action with random tie-breaking
+        return self.tree.argmax()
+
+        # endregion Body
+
+    def step(self, action):
+        # region Summary
+        """
+        Update estimated action value and return reward for this action.
+        :param action: Action
+        :return: Reward
+        """
+        # endregion Summary
+
+        # region Body
+
+        actual_reward = np.random.randn() + self.action_values[action]
+
+        self.time += 1
+        self.action_selection_count[action] += 1
+        self.average_reward += (actual_reward - self.average_reward) / self.time
+
+        if self.use_gradient: # Update preferences using GBA (Equation 2.12), every arm changes
+            # Policy the action was selected from (also when it was an ε-greedy exploration step)
+            self.action_probability = self.exponential_estimations / self.normalizer
+
+            baseline = self.average_reward if self.use_gradient_baseline else 0
+            update_size = self.step_size * (actual_reward - baseline)
+
+            self.estimated_action_values -= update_size * self.action_probability
+            self.estimated_action_values[action] += update_size
+
+            self.update_exponentials()
+
+            return actual_reward
+
+        if self.use_sample_averages: # Sample-average method (Equation 2.3)
+            self.estimated_action_values[action] += (actual_reward - self.estimated_action_values[action]) / self.action_selection_count[action]
+
+        else: # Constant step size
+            self.estimated_action_values[action] += self.step_size * (actual_reward - self.estimated_action_values[action])
+
+        # Only the selected arm's score changes
+        if self.confidence_level is not None:
+            self.tree.update(action, self.estimated_action_values[action], self.slope(self.action_selection_count[action]))
+        else:
+            self.tree.update(action, self.estimated_action_values[action])
+
+        return actual_reward
+
+        # endregion Body
+
+    # endregion Functions
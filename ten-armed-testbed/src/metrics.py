@@ -0,0 +1,230 @@
+import numpy as np
+
+from src.batched_bandit import BatchedBandit
+
+class StreamingMetrics:
+    # region Summary
+    """
+    Streaming accumulator of the per-time-step reward and optimal action rate of a bandit simulation.
+    Instead of keeping a (runs, times) matrix per bandit, only running means (and optionally running sums of squared deviations)
+    per time step are stored, so memory grows with the horizon only and doesn't depend on the number of runs.
+    Observations are merged with Welford's / Chan's parallel algorithm, so they can be fed one run at a time (Bandit)
+    or a whole batch of runs at a time (BatchedBandit).
+    """
+    # endregion Summary
+
+    # region Constructor
+
+    def __init__(self, times, track_variance: bool = False):
+        # region Summary
+        """
+        Constructor of StreamingMetrics class
+        :param times: Number of time steps
+        :param track_variance: if True, also track variances, which are needed for confidence intervals
+        """
+        # endregion Summary
+
+        # region Body
+
+        self.times = times
+        self.track_variance = track_variance
+
+        # Number of observations at each time step
+        self.count = np.zeros(times, dtype=np.int64)
+
+        # Running mean of the reward and of the optimal action hits at each time step
+        self.reward_mean = np.zeros(times)
+        self.optimal_action_mean = np.zeros(times)
+
+        # Running sum of squared deviations from the mean (denoted as 𝑀_2) at each time step
+        self.reward_m2 = np.zeros(times) if track_variance else None
+        self.optimal_action_m2 = np.zeros(times) if track_variance else None
+
+        # endregion Body
+
+    # endregion Constructor
+
+    # region Functions
+
+    def update(self, time, rewards, optimal_action_hits):
+        # region Summary
+        """
+        Merge the observations of one time step
+        :param time: Time step
+        :param rewards: Reward of 1 run or rewards of a batch of runs
+        :param optimal_action_hits: Whether the selected action was optimal, for 1 run or for a batch of runs
+        """
+        # endregion Summary
+
+        # region Body
+
+        rewards = np.asarray(rewards, dtype=float)
+        optimal_action_hits = np.asarray(optimal_action_hits, dtype=float)
+
+        # Number of observations already merged and number of new observations
+        old_count = self.count[time]
+        new_count = rewards.size
+        total_count = old_count + new_count
+
+        # Mean of the new observations and its distance from the running mean
+        reward_delta = np.mean(rewards) - self.reward_mean[time]
+        optimal_action_delta = np.mean(optimal_action_hits) - self.optimal_action_mean[time]
+
+        # Move the running means towards the mean of the new observations proportionally to their weight
+        self.reward_mean[time] += reward_delta * new_count / total_count
+        self.optimal_action_mean[time] += optimal_action_delta * new_count / total_count
+
+        if self.track_variance:
+            # Chan's parallel algorithm: 𝑀_2 = 𝑀_2,𝑎 + 𝑀_2,𝑏 + 𝛿² * 𝑛_𝑎 * 𝑛_𝑏 / 𝑛
+            self.reward_m2[time] += (np.sum((rewards - np.mean(rewards)) ** 2) +
+                                     reward_delta ** 2 * old_count * new_count / total_count)
+            self.optimal_action_m2[time] += (np.sum((optimal_action_hits - np.mean(optimal_action_hits)) ** 2) +
+                                             optimal_action_delta ** 2 * old_count * new_count / total_count)
+
+        self.count[time] = total_count
+
+        # endregion Body
+
+    def variance(self, m2):
+        # region Summary
+        """
+        Get the unbiased sample variance at each time step from a running sum of squared deviations
+        :param m2: Running sum of squared deviations
+        :return: Variance at each time step
+        """
+        # endregion Summary
+
+        # region Body
+
+        if not self.track_variance:
+            raise ValueError("Variances are only available when track_variance is True")
+
+        return m2 / np.maximum(self.count - 1, 1)
+
+        # endregion Body
+
+    def reward_variance(self):
+        # region Summary
+        """
+        Get the variance of the reward at each time step
+        :return: Reward variance
+        """
+        # endregion Summary
+
+        # region Body
+
+        return self.variance(self.reward_m2)
+
+        # endregion Body
+
+    def optimal_action_variance(self):
+        # region Summary
+        """
+        Get the variance of the optimal action hits at each time step
+        :return: Optimal action variance
+        """
+        # endregion Summary
+
+        # region Body
+
+        return self.variance(self.optimal_action_m2)
+
+        # endregion Body
+
+    def confidence_interval(self, mean, variance, z=1.96):
+        # region Summary
+        """
+        Get the normal-approximation confidence interval of a running mean at each time step
+        :param mean: Running mean
+        :param variance: Variance at each time step
+        :param z: Standard normal quantile (1.96 for 95% confidence)
+        :return: Lower and upper bounds
+        """
+        # endregion Summary
+
+        # region Body
+
+        half_width = z * np.sqrt(variance / np.maximum(self.count, 1))
+
+        return mean - half_width, mean + half_width
+
+        # endregion Body
+
+    def reward_confidence_interval(self, z=1.96):
+        # region Summary
+        """
+        Get the confidence interval of the average reward at each time step
+        :param z: Standard normal quantile (1.96 for 95% confidence)
+        :return: Lower and upper bounds
+        """
+        # endregion Summary
+
+        # region Body
+
+        return self.confidence_interval(self.reward_mean, self.reward_variance(), z)
+
+        # endregion Body
+
+    def optimal_action_confidence_interval(self, z=1.96):
+        # region Summary
+        """
+        Get the confidence interval of the optimal action rate at each time step
+        :param z: Standard normal quantile (1.96 for 95% confidence)
+        :return: Lower and upper bounds
+        """
+        # endregion Summary
+
+        # region Body
+
+        return self.confidence_interval(self.optimal_action_mean, self.optimal_action_variance(), z)
+
+        # endregion Body
+
+    # endregion Functions
+
+
+# region Functions
+
+def simulate_streaming(runs, times, bandits, track_variance: bool = False, batch_size=1000):
+    # region Summary
+    """
+    Memory-bounded counterpart of simulate(): runs are simulated in batches of at most batch_size runs
+    and every batch is merged into a StreamingMetrics accumulator, so no (runs, times) matrix is ever allocated.
+    :param runs: Number of runs
+    :param times: Number of times
+    :param bandits: Bandit problems (Bandit configurations)
+    :param track_variance: if True, also track variances, which are needed for confidence intervals
+    :param batch_size: Maximum number of runs advanced together
+    :return: StreamingMetrics of every bandit
+    """
+    # endregion Summary
+
+    # region Body
+
+    metrics = []
+
+    # For every bandit
+    for bandit in bandits:
+        bandit_metrics = StreamingMetrics(times, track_variance)
+
+        # for every batch of runs
+        for first_run in range(0, runs, batch_size):
+            # create a batched copy of the bandit configuration for this batch
+            batched_bandit = BatchedBandit.from_bandit(bandit, min(batch_size, runs - first_run))
+            batched_bandit.initialize()
+
+            # for every time step
+            for time in range(times):
+                actions = batched_bandit.act()
+                rewards = batched_bandit.step(actions)
+
+                # merge the batch into the running statistics
+                bandit_metrics.update(time, rewards, actions == batched_bandit.optimal_action)
+
+        metrics.append(bandit_metrics)
+
+    return metrics
+
+    # endregion Body
+
+# endregion Functions
@@ -0,0 +1,161 @@
+import numpy as np
+
+from src.batched_bandit import BatchedBandit
+
+class NonstationaryBatchedBandit(BatchedBandit):
+    # region Summary
+    """
+    Batched k-armed Bandit whose true action values take independent random walks (Exercise 2.5):
+    after every step a normally distributed increment with μ=0 mean and σ=drift_std is added to every 𝑞_∗(𝑎) of every run.
+    Drift increments are drawn in blocks of block_size steps with 1 call to the random number generator per block.
+    """
+    # endregion Summary
+
+    # region Constructor
+
+    def __init__(self, runs: int = 2000, drift_std=0.01, block_size: int = 64, equal_initial_values: bool = True, **kwargs):
+        # region Summary
+        """
+        Constructor of NonstationaryBatchedBandit class
+        :param runs: Number of independent runs (bandit problems) advanced together
+        :param drift_std: Standard deviation of the random-walk increments of the true action values
+        :param block_size: Number of steps whose drift increments are drawn at once
+        :param equal_initial_values: if True, all true action values of a run start out equal (as in Exercise 2.5),
+                                     otherwise they are initialized as in the stationary testbed
+        :param kwargs: Other keyword arguments of BatchedBandit
+        """
+        # endregion Summary
+
+        # region Body
+
+        super().__init__(runs=runs, **kwargs)
+
+        self.drift_std = drift_std
+        self.block_size = block_size
+        self.equal_initial_values = equal_initial_values
+
+        # Block of drift increments of shape (block_size, runs, k) and the index of the next unused increment
+        self.drift_increments = None
+        self.drift_index = 0
+
+        # endregion Body
+
+    # endregion Constructor
+
+    # region Functions
+
+    def initialize(self):
+        # region Summary
+        """
+        Initialize action parameters of every run
+        """
+        # endregion Summary
+
+        # region Body
+
+        super().initialize()
+
+        if self.equal_initial_values:
+            # All true action values start out equal
+            self.action_values = np.zeros((self.runs, self.k)) + self.column(self.true_expected_reward)
+            self.optimal_action = np.argmax(self.action_values, axis=1)
+
+        # Force a new block of drift increments on the first step
+        self.drift_increments = None
+        self.drift_index = self.block_size
+
+        # endregion Body
+
+    def drift(self):
+        # region Summary
+        """
+        Move every true action value by 1 random-walk increment and update the optimal actions
+        """
+        # endregion Summary
+
+        # region Body
+
+        # Draw the increments of the next block_size steps at once
+        if self.drift_index == self.block_size:
+            self.drift_increments = np.random.normal(0, self.drift_std, size=(self.block_size, self.runs, self.k))
+            self.drift_index = 0
+
+        self.action_values += self.drift_increments[self.drift_index]
+        self.drift_index += 1
+
+        # The optimal action can change after every step
+        self.optimal_action = np.argmax(self.action_values, axis=1)
+
+        # endregion Body
+
+    def step(self, actions):
+        # region Summary
+        """
+        Update estimated action values, return rewards for the actions of every run and let the true action values drift.
+        :param actions: Actions of shape (runs,)
+        :return: Rewards of shape (runs,)
+        """
+        # endregion Summary
+
+        # region Body
+
+        actual_rewards = super().step(actions)
+
+        self.drift()
+
+        return actual_rewards
+
+        # endregion Body
+
+    # endregion Functions
+
+
+# region Functions
+
+def compare_tracking(runs=2000, times=10000, epsilon=0.1, step_size=0.1, drift_std=0.01, block_size=64):
+    # region Summary
+    """
+    Compare sample-average and constant step size action-value methods on the nonstationary testbed (Exercise 2.5).
+    Both methods are advanced in 1 batched bandit of 2 * runs rows: the first runs rows use sample averages,
+    the last runs rows use the constant step size.
+    :param runs: Number of runs per method
+    :param times: Number of times
+    :param epsilon: (denoted as ε) probability for exploration in ε-greedy algorithm
+    :param step_size: (denoted as 𝛼) constant step size
+    :param drift_std: Standard deviation of the random-walk increments of the true action values
+    :param block_size: Number of steps whose drift increments are drawn at once
+    :return: Tracking error (root-mean-square error of the estimates), average reward and optimal action rate,
+             each of shape (2, times) with the sample-average method first
+    """
+    # endregion Summary
+
+    # region Body
+
+    # First half of the runs uses sample averages, second half uses the constant step size
+    use_sample_averages = np.repeat([True, False], runs)
+
+    bandit = NonstationaryBatchedBandit(runs=2 * runs, drift_std=drift_std, block_size=block_size,
+                                        use_sample_averages=use_sample_averages, epsilon=epsilon, step_size=step_size)
+    bandit.initialize()
+
+    tracking_errors = np.zeros((2, times))
+    rewards = np.zeros((2, times))
+    optimal_action_counts = np.zeros((2, times))
+
+    # For every time step
+    for time in range(times):
+        actions = bandit.act()
+        optimal_actions = bandit.optimal_action
+
+        rewards[:, time] = bandit.step(actions).reshape(2, runs).mean(axis=1)
+        optimal_action_counts[:, time] = (actions == optimal_actions).reshape(2, runs).mean(axis=1)
+
+        # Root-mean-square distance between estimates and the (drifted) true values of every run, averaged per method
+        errors = np.sqrt(np.mean((bandit.estimated_action_values - bandit.action_values) ** 2, axis=1))
+        tracking_errors[:, time] = errors.reshape(2, runs).mean(axis=1)
+
+    return tracking_errors, rewards, optimal_action_counts
+
+    # endregion Body
+
+# endregion Functions
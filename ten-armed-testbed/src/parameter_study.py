@@ -0,0 +1,201 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from src.batched_bandit import BatchedBandit
+
+# region Hyper-parameters
+
+# Parameters that can differ between configurations of the same chunk (they are passed to BatchedBandit as per-run arrays)
+per_run_parameters = dict(epsilon=0., initial_action_value_estimates=0., confidence_level=0., step_size=0.1, true_expected_reward=0.)
+
+# endregion Hyper-parameters
+
+# region Helpers
+
+def mode(configuration):
+    # region Summary
+    """
+    Get the part of a configuration that must be shared by all configurations advanced by the same BatchedBandit
+    :param configuration: Keyword arguments of Bandit
+    :return: Mode of the configuration
+    """
+    # endregion Summary
+
+    # region Body
+
+    return (configuration.get("arms_number", 10),
+            configuration.get("use_sample_averages", False),
+            configuration.get("confidence_level") is not None,
+            configuration.get("use_gradient", False),
+            configuration.get("use_gradient_baseline", False))
+
+    # endregion Body
+
+def split(configurations, chunk_size):
+    # region Summary
+    """
+    Group configurations of the same mode into chunks of at most chunk_size configurations
+    :param configurations: List of keyword arguments of Bandit
+    :param chunk_size: Maximum number of configurations in a chunk
+    :return: List of chunks, every chunk is a list of configuration indices
+    """
+    # endregion Summary
+
+    # region Body
+
+    # Group configuration indices by mode, keeping the order of the first appearance of every mode
+    groups = dict()
+    for index, configuration in enumerate(configurations):
+        groups.setdefault(mode(configuration), []).append(index)
+
+    return [indices[start:start + chunk_size] for indices in groups.values() for start in range(0, len(indices), chunk_size)]
+
+    # endregion Body
+
+def run_chunk(configurations, runs, steps, seed):
+    # region Summary
+    """
+    Simulate a chunk of configurations of the same mode as 1 BatchedBandit of shape (configurations × runs, arms)
+    :param configurations: List of keyword arguments of Bandit sharing the same mode
+    :param runs: Number of runs per configuration
+    :param steps: Number of steps
+    :param seed: Seed of the random number generator used for this chunk
+    :return: Average reward over all steps and runs of every configuration
+    """
+    # endregion Summary
+
+    # region Body
+
+    # BatchedBandit samples from the global random stream, which belongs to the caller when the chunk runs in its process
+    caller_state = np.random.get_state()
+
+    try:
+        # Every chunk gets its own random stream, otherwise forked workers would repeat the same samples
+        np.random.seed(seed)
+
+        return simulate_chunk(configurations, runs, steps)
+
+    finally:
+        np.random.set_state(caller_state)
+
+    # endregion Body
+
+def simulate_chunk(configurations, runs, steps):
+    # region Summary
+    """
+    Simulate a chunk of configurations of the same mode with the global random stream (see run_chunk)
+    :param configurations: List of keyword arguments of Bandit sharing the same mode
+    :param runs: Number of runs per configuration
+    :param steps: Number of steps
+    :return: Average reward over all steps and runs of every configuration
+    """
+    # endregion Summary
+
+    # region Body
+
+    arms_number, use_sample_averages, use_ucb, use_gradient, use_gradient_baseline = mode(configurations[0])
+
+    # Repeat every configuration's parameters for each of its runs
+    parameters = {name: np.repeat([configuration.get(name, default) for configuration in configurations], runs)
+                  for name, default in per_run_parameters.items()}
+
+    if not use_ucb:
+        parameters["confidence_level"] = None
+
+    bandit = BatchedBandit(runs=len(configurations) * runs,
+                           arms_number=arms_number,
+                           use_sample_averages=use_sample_averages,
+                           use_gradient=use_gradient,
+                           use_gradient_baseline=use_gradient_baseline,
+                           **parameters)
+    bandit.initialize()
+
+    # Sum of the rewards of every run
+    total_rewards = np.zeros(bandit.runs)
+
+    for _ in range(steps):
+        total_rewards += bandit.step(bandit.act())
+
+    # Average over steps, then over the runs of every configuration
+    return (total_rewards / steps).reshape(len(configurations), runs).mean(axis=1)
+
+    # endregion Body
+
+# endregion Helpers
+
+# region Functions
+
+def parameter_study_configurations():
+    # region Summary
+    """
+    Get the configurations of the parameter study of Figure 2.6 in the book
+    :return: Dictionary of "method name: (parameter name, parameter values, list of keyword arguments of Bandit)"
+    """
+    # endregion Summary
+
+    # region Body
+
+    epsilons = np.power(2., np.arange(-7, -1))
+    step_sizes = np.power(2., np.arange(-5, 2))
+    confidence_levels = np.power(2., np.arange(-4, 3))
+    initial_values = np.power(2., np.arange(-2, 3))
+
+    return {
+        "ε-greedy": ("ε", epsilons,
+                     [dict(epsilon=epsilon, use_sample_averages=True) for epsilon in epsilons]),
+        "gradient bandit": ("𝛼", step_sizes,
+                            [dict(use_gradient=True, step_size=step_size, use_gradient_baseline=True) for step_size in step_sizes]),
+        "UCB": ("𝑐", confidence_levels,
+                [dict(epsilon=0., confidence_level=confidence_level, use_sample_averages=True) for confidence_level in confidence_levels]),
+        "optimistic initialization": ("𝑄_1", initial_values,
+                                      [dict(epsilon=0., initial_action_value_estimates=initial_value, step_size=0.1) for initial_value in initial_values]),
+    }
+
+    # endregion Body
+
+def sweep(configurations, runs=2000, steps=1000, workers=None, chunk_size=4, seed=None):
+    # region Summary
+    """
+    Evaluate a grid of bandit configurations: configurations of the same mode are tensorized into chunks
+    of shape (chunk_size × runs, arms) and chunks are distributed over a process pool.
+    :param configurations: List of keyword arguments of Bandit (e.g. dict(epsilon=0.1, use_sample_averages=True))
+    :param runs: Number of runs per configuration
+    :param steps: Number of steps to average the reward over (denoted as N)
+    :param workers: Number of worker processes; None uses all CPUs, 1 runs everything in the current process
+    :param chunk_size: Maximum number of configurations simulated together
+    :param seed: Seed for the independent random streams of the chunks
+    :return: Average reward over the first steps of every configuration, in the order of configurations
+    """
+    # endregion Summary
+
+    # region Body
+
+    chunks = split(configurations, chunk_size)
+
+    # Independent seeds for every chunk
+    seeds = [sequence.generate_state(1)[0] for sequence in np.random.SeedSequence(seed).spawn(len(chunks))]
+
+    # Arguments of run_chunk for every chunk
+    arguments = [([configurations[index] for index in chunk], runs, steps, chunk_seed) for chunk, chunk_seed in zip(chunks, seeds)]
+
+    if workers is None:
+        workers = os.cpu_count()
+
+    if workers == 1:
+        results = [run_chunk(*argument) for argument in arguments]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(run_chunk, *zip(*arguments)))
+
+    # Put the results of every chunk back in the order of configurations
+    average_rewards = np.zeros(len(configurations))
+    for chunk, result in zip(chunks, results):
+        average_rewards[chunk] = result
+
+    return average_rewards
+
+    # endregion Body
+
+# endregion Functions
@@ -0,0 +1,421 @@
+import asyncio
+import itertools
+import time
+
+import numpy as np
+
+class ServiceStatistics:
+    # region Summary
+    """
+    Throughput and latency counters of a BanditService
+    """
+    # endregion Summary
+
+    # region Constructor
+
+    def __init__(self):
+        # region Summary
+        """
+        Constructor of ServiceStatistics class
+        """
+        # endregion Summary
+
+        # region Body
+
+        # Moment the counters were (re)started
+        self.start_time = time.perf_counter()
+
+        # Number of answered act requests and their total and maximum latency (in nanoseconds)
+        self.act_count = 0
+        self.act_latency_total = 0
+        self.act_latency_max = 0
+
+        # Number of received rewards, applied rewards and rewards with unknown (or already used) request ids
+        self.feedback_count = 0
+        self.update_count = 0
+        self.unknown_feedback_count = 0
+
+        # Number of applied micro-batches and their total and maximum latency (in nanoseconds)
+        self.batch_count = 0
+        self.batch_latency_total = 0
+        self.batch_latency_max = 0
+
+        # endregion Body
+
+    # endregion Constructor
+
+    # region Functions
+
+    def summary(self):
+        # region Summary
+        """
+        Get a snapshot of the counters with derived throughput and average latencies
+        :return: Dictionary of counters
+        """
+        # endregion Summary
+
+        # region Body
+
+        elapsed = time.perf_counter() - self.start_time
+
+        return dict(elapsed=elapsed,
+                    act_count=self.act_count,
+                    acts_per_second=self.act_count / elapsed if elapsed > 0 else 0.,
+                    act_latency_mean_us=self.act_latency_total / max(self.act_count, 1) / 1e3,
+                    act_latency_max_us=self.act_latency_max / 1e3,
+                    feedback_count=self.feedback_count,
+                    update_count=self.update_count,
+                    updates_per_second=self.update_count / elapsed if elapsed > 0 else 0.,
+                    unknown_feedback_count=self.unknown_feedback_count,
+                    batch_count=self.batch_count,
+                    batch_size_mean=self.update_count / max(self.batch_count, 1),
+                    batch_latency_mean_us=self.batch_latency_total / max(self.batch_count, 1) / 1e3,
+                    batch_latency_max_us=self.batch_latency_max / 1e3)
+
+        # endregion Body
+
+    # endregion Functions
+
+
+class BanditService:
+    # region Summary
+    """
+    Asyncio decision service on top of a Bandit:
+      - act() answers immediately from the current estimates and remembers which action was given to which request,
+      - feedback() queues a (request id, reward) pair, rewards may arrive late and in any order,
+      - a background task drains the queue and applies the rewards to the Bandit in micro-batches.
+    The service runs in-process, serve_unix() exposes it on a Unix socket with a line-based protocol.
+    """
+    # endregion Summary
+
+    # region Constructor
+
+    def __init__(self, bandit, batch_size: int = 256, batch_interval=0.):
+        # region Summary
+        """
+        Constructor of BanditService class
+        :param bandit: Bandit answering the requests (initialized by start() if it wasn't initialized yet)
+        :param batch_size: Maximum number of rewards applied in 1 micro-batch
+        :param batch_interval: Time (in seconds) to wait for more rewards after the first reward of a micro-batch arrived
+        """
+        # endregion Summary
+
+        # region Body
+
+        self.bandit = bandit
+        self.batch_size = batch_size
+        self.batch_interval = batch_interval
+
+        # Action given to every request which hasn't received its reward yet
+        self.pending = dict()
+
+        # Generator of request ids
+        self.request_ids = itertools.count()
+
+        # Queue of delayed (request id, reward) pairs
+        self.queue = None
+
+        # Background task applying micro-batches
+        self.updater = None
+
+        self.statistics = ServiceStatistics()
+
+        # endregion Body
+
+    # endregion Constructor
+
+    # region Functions
+
+    async def start(self):
+        # region Summary
+        """
+        Start the background task applying the rewards
+        """
+        # endregion Summary
+
+        # region Body
+
+        if self.bandit.estimated_action_values is None:
+            self.bandit.initialize()
+
+        self.queue = asyncio.Queue()
+        self.updater = asyncio.create_task(self.update_loop())
+        self.statistics = ServiceStatistics()
+
+        # endregion Body
+
+    async def stop(self):
+        # region Summary
+        """
+        Apply all queued rewards and stop the background task
+        """
+        # endregion Summary
+
+        # region Body
+
+        await self.queue.join()
+
+        self.updater.cancel()
+        try:
+            await self.updater
+        except asyncio.CancelledError:
+            pass
+
+        # endregion Body
+
+    def act(self):
+        # region Summary
+        """
+        Answer an act request from the current estimates
+        :return: Request id (to send the reward with) and action
+        """
+        # endregion Summary
+
+        # region Body
+
+        start = time.perf_counter_ns()
+
+        request_id = next(self.request_ids)
+        action = int(self.bandit.act())
+        self.pending[request_id] = action
+
+        latency = time.perf_counter_ns() - start
+        self.statistics.act_count += 1
+        self.statistics.act_latency_total += latency
+        self.statistics.act_latency_max = max(self.statistics.act_latency_max, latency)
+
+        return request_id, action
+
+        # endregion Body
+
+    def feedback(self, request_id, reward):
+        # region Summary
+        """
+        Queue the reward of an earlier act request (without waiting for it to be applied)
+        :param request_id: Request id returned by act()
+        :param reward: Observed reward
+        """
+        # endregion Summary
+
+        # region Body
+
+        self.statistics.feedback_count += 1
+        self.queue.put_nowait((request_id, reward))
+
+        # endregion Body
+
+    def apply(self, batch):
+        # region Summary
+        """
+        Apply a micro-batch of rewards to the Bandit
+        :param batch: List of (request id, reward) pairs
+        """
+        # endregion Summary
+
+        # region Body
+
+        start = time.perf_counter_ns()
+
+        actions = []
+        rewards = []
+
+        for request_id, reward in batch:
+            # Every request can be rewarded only once
+            action = self.pending.pop(request_id, None)
+
+            if action is None:
+                self.statistics.unknown_feedback_count += 1
+                continue
+
+            actions.append(action)
+            rewards.append(reward)
+
+        # Apply the whole micro-batch with 1 vectorized update
+        self.bandit.update_batch(actions, rewards)
+        self.statistics.update_count += len(actions)
+
+        latency = time.perf_counter_ns() - start
+        self.statistics.batch_count += 1
+        self.statistics.batch_latency_total += latency
+        self.statistics.batch_latency_max = max(self.statistics.batch_latency_max, latency)
+
+        # endregion Body
+
+    async def update_loop(self):
+        # region Summary
+        """
+        Background task: wait for rewards and apply them in micro-batches of at most batch_size rewards
+        """
+        # endregion Summary
+
+        # region Body
+
+        while True:
+            batch = [await self.queue.get()]
+
+            # Give more rewards a chance to arrive
+            if self.batch_interval > 0:
+                await asyncio.sleep(self.batch_interval)
+
+            while len(batch) < self.batch_size and not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+
+            self.apply(batch)
+
+            for _ in batch:
+                self.queue.task_done()
+
+        # endregion Body
+
+    async def handle_connection(self, reader, writer):
+        # region Summary
+        """
+        Serve 1 Unix socket client. Protocol (1 command per line):
+          - "act" is answered with "<request id> <action>",
+          - "feedback <request id> <reward>" is not answered (unless it is malformed: "error bad request"),
+          - "stats" is answered with the counters as "name=value" pairs,
+          - blank lines are skipped and unknown commands are answered with "error unknown command".
+        :param reader: Stream reader
+        :param writer: Stream writer
+        """
+        # endregion Summary
+
+        # region Body
+
+        try:
+            while line := await reader.readline():
+                # Blank lines are skipped
+                if not line.strip():
+                    continue
+
+                command, *arguments = line.split()
+
+                if command == b"act":
+                    request_id, action = self.act()
+                    writer.write(b"%d %d\n" % (request_id, action))
+
+                elif command == b"feedback":
+                    # A malformed request is answered, the connection keeps being served
+                    try:
+                        request_id, reward = int(arguments[0]), float(arguments[1])
+                    except (IndexError, ValueError):
+                        writer.write(b"error bad request\n")
+                    else:
+                        self.feedback(request_id, reward)
+
+                elif command == b"stats":
+                    writer.write((" ".join(f"{name}={value}" for name, value in self.statistics.summary().items()) + "\n").encode())
+
+                else:
+                    writer.write(b"error unknown command\n")
+
+                # Only wait for the socket buffer when it starts filling up
+                if writer.transport.get_write_buffer_size() > 65536:
+                    await writer.drain()
+
+            await writer.drain()
+
+        finally:
+            writer.close()
+
+        # endregion Body
+
+    async def serve_unix(self, path):
+        # region Summary
+        """
+        Expose the service on a Unix socket
+        :param path: Socket path
+        :return: asyncio server
+        """
+        # endregion Summary
+
+        # region Body
+
+        return await asyncio.start_unix_server(self.handle_connection, path=path)
+
+        # endregion Body
+
+    # endregion Functions
+
+
+# region Functions
+
+async def generate_load(service, requests=100000, concurrency=64, max_delay=1e-3):
+    # region Summary
+    """
+    Load generator: concurrent in-process clients ask for actions and send back rewards after random delays
+    (so rewards arrive late and out of order). Rewards are sampled from the bandit's true action values.
+    :param service: Started BanditService
+    :param requests: Total number of act requests
+    :param concurrency: Number of concurrent clients
+    :param max_delay: Maximum reward delay (in seconds)
+    :return: Client-side latencies of the act requests (in nanoseconds)
+    """
+    # endregion Summary
+
+    # region Body
+
+    latencies = np.zeros(requests, dtype=np.int64)
+    counter = itertools.count()
+    delayed = set()
+
+    async def send_later(request_id, reward, delay):
+        await asyncio.sleep(delay)
+        service.feedback(request_id, reward)
+
+    async def client():
+        while (index := next(counter)) < requests:
+            start = time.perf_counter_ns()
+            request_id, action = service.act()
+            latencies[index] = time.perf_counter_ns() - start
+
+            reward = np.random.randn() + service.bandit.action_values[action]
+
+            # Deliver the reward later without blocking the client
+            task = asyncio.create_task(send_later(request_id, reward, np.random.rand() * max_delay))
+            delayed.add(task)
+            task.add_done_callback(delayed.discard)
+
+            # Let other clients and the updater run
+            await asyncio.sleep(0)
+
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    await asyncio.gather(*list(delayed))
+
+    return latencies
+
+    # endregion Body
+
+def benchmark(bandit, requests=100000, concurrency=64, max_delay=1e-3, batch_size=256, batch_interval=0.):
+    # region Summary
+    """
+    Run the load generator against an in-process BanditService
+    :param bandit: Bandit answering the requests
+    :param requests: Total number of act requests
+    :param concurrency: Number of concurrent clients
+    :param max_delay: Maximum reward delay (in seconds)
+    :param batch_size: Maximum number of rewards applied in 1 micro-batch
+    :param batch_interval: Time (in seconds) to wait for more rewards after the first reward of a micro-batch arrived
+    :return: Service counters and client-side act latency percentiles (in microseconds)
+    """
+    # endregion Summary
+
+    # region Body
+
+    async def run():
+        service = BanditService(bandit, batch_size=batch_size, batch_interval=batch_interval)
+        await service.start()
+        latencies = await generate_load(service, requests, concurrency, max_delay)
+        await service.stop()
+        return service.statistics.summary(), latencies
+
+    summary, latencies = asyncio.run(run())
+
+    for percentile in (50, 90, 99):
+        summary[f"client_act_latency_p{percentile}_us"] = np.percentile(latencies, percentile) / 1e3
+
+    return summary
+
+    # endregion Body
+
+# endregion Functions
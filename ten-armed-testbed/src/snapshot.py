@@ -0,0 +1,191 @@
+import importlib
+import json
+import struct
+
+import numpy as np
+
+# region Hyper-parameters
+
+# First bytes of every snapshot file
+MAGIC = b"BANDSNAP"
+
+# Version of the snapshot format
+VERSION = 1
+
+# Every array starts at a multiple of this many bytes
+ALIGNMENT = 64
+
+# endregion Hyper-parameters
+
+# region Helpers
+
+def align(offset):
+    # region Summary
+    """
+    Round an offset up to the next multiple of ALIGNMENT
+    :param offset: Offset in bytes
+    :return: Aligned offset
+    """
+    # endregion Summary
+
+    # region Body
+
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+    # endregion Body
+
+def split_state(bandit):
+    # region Summary
+    """
+    Split the attributes of a bandit into arrays (stored as raw data) and scalars (stored in the JSON header)
+    :param bandit: Bandit or BatchedBandit
+    :return: Dictionary of arrays and dictionary of scalars
+    """
+    # endregion Summary
+
+    # region Body
+
+    arrays = dict()
+    scalars = dict()
+
+    for name, value in vars(bandit).items():
+        if isinstance(value, np.ndarray):
+            arrays[name] = np.ascontiguousarray(value)
+        elif isinstance(value, np.generic):
+            scalars[name] = value.item()
+        elif value is None or isinstance(value, (bool, int, float, str)):
+            scalars[name] = value
+        else:
+            raise TypeError(f"Attribute {name} of type {type(value).__name__} can't be stored in a snapshot")
+
+    return arrays, scalars
+
+    # endregion Body
+
+# endregion Helpers
+
+# region Functions
+
+def save_snapshot(bandit, path, include_rng: bool = True):
+    # region Summary
+    """
+    Write the state of a Bandit or BatchedBandit (estimates, counts, time, average reward, ...) to a binary snapshot file.
+    Layout: MAGIC, version (uint32), header length (uint32), JSON header, then every array as contiguous raw data
+    starting at an ALIGNMENT-byte boundary, so that it can be memory-mapped in place.
+    :param bandit: Bandit or BatchedBandit
+    :param path: Snapshot file path
+    :param include_rng: if True, also store the state of the global NumPy random number generator
+    """
+    # endregion Summary
+
+    # region Body
+
+    arrays, scalars = split_state(bandit)
+
+    rng = None
+    if include_rng:
+        # Global Mersenne Twister state: key array is stored as raw data, the rest in the header
+        algorithm, keys, position, has_gauss, cached_gaussian = np.random.get_state()
+        arrays["__rng_keys__"] = keys
+        rng = dict(algorithm=algorithm, position=position, has_gauss=has_gauss, cached_gaussian=cached_gaussian)
+
+    # Describe every array, offsets are relative to the start of the data section
+    descriptions = dict()
+    offset = 0
+    for name, array in arrays.items():
+        offset = align(offset)
+        descriptions[name] = dict(dtype=array.dtype.str, shape=array.shape, offset=offset)
+        offset += array.nbytes
+
+    header = json.dumps(dict(module=type(bandit).__module__,
+                             name=type(bandit).__qualname__,
+                             scalars=scalars,
+                             arrays=descriptions,
+                             rng=rng)).encode()
+
+    # The data section starts at an aligned offset after the header
+    data_start = align(len(MAGIC) + 8 + len(header))
+
+    with open(path, "wb") as file:
+        file.write(MAGIC)
+        file.write(struct.pack("<II", VERSION, len(header)))
+        file.write(header)
+
+        for name, array in arrays.items():
+            file.seek(data_start + descriptions[name]["offset"])
+            file.write(array.tobytes())
+
+        # Make sure the file covers the last (possibly empty) array
+        file.truncate(data_start + offset)
+
+    # endregion Body
+
+def read_header(path):
+    # region Summary
+    """
+    Read the JSON header of a snapshot file
+    :param path: Snapshot file path
+    :return: Header and the offset of the data section
+    """
+    # endregion Summary
+
+    # region Body
+
+    with open(path, "rb") as file:
+        if file.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a bandit snapshot")
+
+        version, header_length = struct.unpack("<II", file.read(8))
+        if version != VERSION:
+            raise ValueError(f"Unsupported snapshot version {version}")
+
+        header = json.loads(file.read(header_length))
+
+    return header, align(len(MAGIC) + 8 + header_length)
+
+    # endregion Body
+
+def load_snapshot(path, mode="c", restore_rng: bool = True):
+    # region Summary
+    """
+    Restore a bandit from a snapshot file without copying its arrays: every array is a memory map of the file.
+    :param path: Snapshot file path
+    :param mode: Memory-map mode: "c" (copy-on-write, the file is never modified, so many forks can resume from it),
+                 "r" (read-only, for inspection) or "r+" (updates are written back to the file)
+    :param restore_rng: if True and the snapshot contains it, restore the state of the global NumPy random number generator
+    :return: Bandit or BatchedBandit
+    """
+    # endregion Summary
+
+    # region Body
+
+    header, data_start = read_header(path)
+
+    # Create the object without calling its constructor, all attributes come from the snapshot
+    cls = getattr(importlib.import_module(header["module"]), header["name"])
+    bandit = cls.__new__(cls)
+    bandit.__dict__.update(header["scalars"])
+
+    arrays = dict()
+    for name, description in header["arrays"].items():
+        dtype = np.dtype(description["dtype"])
+        shape = tuple(description["shape"])
+
+        if int(np.prod(shape)) == 0:
+            # Empty arrays can't be memory-mapped
+            arrays[name] = np.empty(shape, dtype=dtype)
+        else:
+            arrays[name] = np.memmap(path, dtype=dtype, mode=mode, offset=data_start + description["offset"], shape=shape)
+
+    rng_keys = arrays.pop("__rng_keys__", None)
+    bandit.__dict__.update(arrays)
+
+    if restore_rng and header["rng"] is not None:
+        rng = header["rng"]
+        np.random.set_state((rng["algorithm"], np.array(rng_keys), rng["position"], rng["has_gauss"], rng["cached_gaussian"]))
+
+    return bandit
+
+    # endregion Body
+
+# endregion Functions
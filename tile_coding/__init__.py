@@ -0,0 +1,6 @@
+from tile_coding.cache import TileCache
+from tile_coding.persistence import load_model, save_model
+from tile_coding.recorder import EpisodeRecorder, EpisodeStore, replay
+from tile_coding.shared import SharedIHT
+from tile_coding.telemetry import IHTTelemetry
+from tile_coding.tiles3 import IHT, ArrayIHT, GridTileCoder, hash_coords, hash_key, hash_rows, tiles, tiles_batch
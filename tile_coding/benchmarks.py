@@ -0,0 +1,256 @@
+import copy
+import json
+import platform
+import time
+
+import numpy as np
+
+from tile_coding.tiles3 import IHT, ArrayIHT, tiles, tiles_batch
+
+# region Hyper-parameters
+
+# Floats are drawn uniformly from [0, float_range) in every dimension (so about float_range tiles per dimension and tiling)
+float_range = 10.
+
+# Fields of a result which identify it (everything else is a measurement)
+key_fields = ("benchmark", "mode", "table", "num_tilings", "dimensions", "size", "fill")
+
+# endregion Hyper-parameters
+
+# region Helpers
+
+def best_time(function, repeats):
+    # region Summary
+    """
+    Time a function several times
+    :param function: Function without arguments
+    :param repeats: Number of timed repetitions
+    :return: Best time (in seconds)
+    """
+    # endregion Summary
+
+    # region Body
+
+    times = []
+
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+
+    return min(times)
+
+    # endregion Body
+
+def filled_table(table_type, size, fill, num_tilings, dimensions):
+    # region Summary
+    """
+    Create a table and fill it with tiles of random states up to the given share of its size
+    :param table_type: IHT or ArrayIHT
+    :param size: Size of the table
+    :param fill: Share of the size to fill (0 ≤ fill ≤ 1)
+    :param num_tilings: Number of tilings
+    :param dimensions: Number of floats
+    :return: Table
+    """
+    # endregion Summary
+
+    # region Body
+
+    table = table_type(size)
+
+    # Add states in batches until enough tiles are stored. They are drawn far away from the timed states
+    # (which only have a few hundred distinct tiles), so they only occupy the table.
+    while table.count() < fill * size:
+        states = max(1, (int(fill * size) - table.count()) // num_tilings)
+        tiles_batch(table, num_tilings, float_range + np.random.rand(states, dimensions) * float_range * size)
+
+    return table
+
+    # endregion Body
+
+def result_key(result):
+    # region Summary
+    """
+    Get the key identifying a result in a baseline
+    :param result: Result
+    :return: Key string
+    """
+    # endregion Summary
+
+    # region Body
+
+    return " ".join(f"{field}={result.get(field)}" for field in key_fields)
+
+    # endregion Body
+
+# endregion Helpers
+
+# region Functions
+
+def benchmark_tiles(num_tilings_list=(4, 8, 16, 32, 64), dimensions_list=(1, 2, 4), sizes=(2048, 65536), fills=(0., 0.5, 0.9),
+                    lookups=1000, repeats=3):
+    # region Summary
+    """
+    Time tiles() state by state (single) and tiles_batch() over all states (batched) with an IHT and an ArrayIHT,
+    for every tiling count, dimensionality, table size and fill level.
+    Every mode and repetition looks the same states up in its own copy of the same filled table.
+    :param num_tilings_list: Numbers of tilings
+    :param dimensions_list: Numbers of floats
+    :param sizes: Table sizes
+    :param fills: Shares of the table filled before timing
+    :param lookups: Number of states looked up per repetition
+    :param repeats: Number of timed repetitions (the best one is reported)
+    :return: List of results
+    """
+    # endregion Summary
+
+    # region Body
+
+    results = []
+
+    for num_tilings in num_tilings_list:
+        for dimensions in dimensions_list:
+            for size in sizes:
+                for fill in fills:
+                    for table_type in (IHT, ArrayIHT):
+                        filled = filled_table(table_type, size, fill, num_tilings, dimensions)
+                        states = np.random.rand(lookups, dimensions) * float_range
+                        state_lists = states.tolist()
+
+                        def single(table):
+                            for floats in state_lists:
+                                tiles(table, num_tilings, floats)
+
+                        def batched(table):
+                            tiles_batch(table, num_tilings, states)
+
+                        for mode, function in (("single", single), ("batched", batched)):
+                            # Lookups insert the new tiles, so every mode and repetition starts from a copy of the same
+                            # filled table (copying isn't timed): both modes see the reported fill and do the same inserts
+                            times = []
+                            for _ in range(repeats):
+                                table = copy.deepcopy(filled)
+                                start = time.perf_counter()
+                                function(table)
+                                times.append(time.perf_counter() - start)
+
+                            results.append(dict(benchmark="tiles", mode=mode, table=table_type.__name__, num_tilings=num_tilings,
+                                                dimensions=dimensions, size=size, fill=fill, seconds_per_lookup=min(times) / lookups,
+                                                final_fill=table.count() / size))
+
+    return results
+
+    # endregion Body
+
+def benchmark_get_index(sizes=(2048, 65536), fills=(0., 0.5, 0.9), key_width=4, lookups=10000, repeats=3):
+    # region Summary
+    """
+    Time get_index() key by key (single) and ArrayIHT.get_indices() over all keys (batched) on tables of every size and fill level.
+    Half of the keys are stored already, so hits and inserts (or collisions) are both timed.
+    :param sizes: Table sizes
+    :param fills: Shares of the table filled before timing
+    :param key_width: Number of coordinates of a key
+    :param lookups: Number of keys looked up per repetition
+    :param repeats: Number of timed repetitions (the best one is reported)
+    :return: List of results
+    """
+    # endregion Summary
+
+    # region Body
+
+    results = []
+
+    for size in sizes:
+        for fill in fills:
+            stored = np.random.randint(1 << 20, size=(int(fill * size), key_width))
+            new = np.random.randint(1 << 20, size=(lookups - lookups // 2, key_width))
+            keys = np.concatenate([stored[np.random.randint(len(stored), size=lookups // 2)] if len(stored) else new[:lookups // 2], new])
+            key_tuples = [tuple(key) for key in keys.tolist()]
+
+            for table_type in (IHT, ArrayIHT):
+                modes = [("single", lambda table: [table.get_index(key) for key in key_tuples])]
+                if table_type is ArrayIHT:
+                    modes.append(("batched", lambda table: table.get_indices(keys)))
+
+                for mode, function in modes:
+                    # Every repetition starts from the same filled table, filling isn't timed
+                    times = []
+                    for _ in range(repeats):
+                        table = table_type(size)
+                        for key in stored.tolist():
+                            table.get_index(tuple(key))
+
+                        start = time.perf_counter()
+                        function(table)
+                        times.append(time.perf_counter() - start)
+
+                    results.append(dict(benchmark="get_index", mode=mode, table=table_type.__name__, num_tilings=None,
+                                        dimensions=None, size=size, fill=fill, seconds_per_lookup=min(times) / lookups))
+
+    return results
+
+    # endregion Body
+
+def save_baseline(results, path):
+    # region Summary
+    """
+    Write results to a JSON baseline, with the Python and NumPy versions they were measured with
+    :param results: List of results
+    :param path: Baseline file path
+    """
+    # endregion Summary
+
+    # region Body
+
+    with open(path, "w") as file:
+        json.dump(dict(python=platform.python_version(),
+                       numpy=np.__version__,
+                       machine=platform.machine(),
+                       date=time.strftime("%Y-%m-%d %H:%M:%S"),
+                       results=results), file, indent=1)
+
+    # endregion Body
+
+def compare_baseline(results, path, tolerance=0.2):
+    # region Summary
+    """
+    Compare results with a JSON baseline
+    :param results: List of results
+    :param path: Baseline file path
+    :param tolerance: Relative change of the time per lookup that counts as a regression or a speedup
+    :return: Dictionary of "regressions", "speedups" and "unchanged" lists of (key, baseline seconds, current seconds, ratio),
+             and "missing" keys of results without a baseline
+    """
+    # endregion Summary
+
+    # region Body
+
+    with open(path) as file:
+        baseline = {result_key(result): result for result in json.load(file)["results"]}
+
+    comparison = dict(regressions=[], speedups=[], unchanged=[], missing=[])
+
+    for result in results:
+        key = result_key(result)
+
+        if key not in baseline:
+            comparison["missing"].append(key)
+            continue
+
+        before = baseline[key]["seconds_per_lookup"]
+        after = result["seconds_per_lookup"]
+        ratio = after / before
+
+        if ratio > 1 + tolerance:
+            comparison["regressions"].append((key, before, after, ratio))
+        elif ratio < 1 / (1 + tolerance):
+            comparison["speedups"].append((key, before, after, ratio))
+        else:
+            comparison["unchanged"].append((key, before, after, ratio))
+
+    return comparison
+
+    # endregion Body
+
+# endregion Functions
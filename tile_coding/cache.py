@@ -0,0 +1,127 @@
+from collections import OrderedDict
+from math import floor
+
+from tile_coding.tiles3 import GridTileCoder, tiles
+
+class TileCache:
+    # region Summary
+    """
+    Bounded memo cache of active tiles (LRU with explicit eviction).
+    tiles() only depends on the quantized floats floor(f * num_tilings) and the ints, so they are the cache key:
+    repeated lookups of the same (state, action), within a step (action selection, value, learning) and across steps,
+    skip the tiling and the hashing. The least recently used entry is evicted once max_entries is reached.
+    """
+    # endregion Summary
+
+    # region Constructor
+
+    def __init__(self, iht_or_size, num_tilings, max_entries: int = 1024):
+        # region Summary
+        """
+        Constructor of TileCache class
+        :param iht_or_size: Either an IHT (or ArrayIHT) of a given size, an integer "size" (range of the indices from 0), or a GridTileCoder
+        :param num_tilings: Number of tilings
+        :param max_entries: Maximum number of cached lookups
+        """
+        # endregion Summary
+
+        # region Body
+
+        self.iht_or_size = iht_or_size
+        self.num_tilings = num_tilings
+        self.max_entries = max_entries
+
+        # Active tiles of every cached key, from the least to the most recently used
+        self.entries = OrderedDict()
+
+        # Number of lookups answered from the cache, computed, and evicted entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        # endregion Body
+
+    # endregion Constructor
+
+    # region Functions
+
+    def tiles(self, floats, ints=None, read_only=False):
+        # region Summary
+        """
+        Maps floating and integer variables to a list of tiles, like tiles()
+        :param floats: Float variables
+        :param ints: Integer variables
+        :param read_only: Read-only? (lookups with tiles missing from the IHT are not cached)
+        :return: Num-tilings tile indices corresponding to the floats and ints
+        """
+        # endregion Summary
+
+        # region Body
+
+        if ints is None:
+            ints = []
+
+        key = (tuple([floor(f * self.num_tilings) for f in floats]), tuple(ints))
+
+        active_tiles = self.entries.get(key)
+
+        if active_tiles is not None:
+            self.hits += 1
+            self.entries.move_to_end(key)
+
+            # A copy, so that callers can't modify the cached tiles
+            return list(active_tiles)
+
+        self.misses += 1
+
+        if isinstance(self.iht_or_size, GridTileCoder):
+            active_tiles = self.iht_or_size.tiles(floats, ints)
+        else:
+            active_tiles = tiles(self.iht_or_size, self.num_tilings, floats, ints, read_only)
+
+        if None not in active_tiles and self.max_entries > 0:
+            self.entries[key] = list(active_tiles)
+
+            if len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+        return active_tiles
+
+        # endregion Body
+
+    def clear(self):
+        # region Summary
+        """
+        Evict all entries (needed when the table behind the cache is replaced), counters are kept
+        """
+        # endregion Summary
+
+        # region Body
+
+        self.evictions += len(self.entries)
+        self.entries.clear()
+
+        # endregion Body
+
+    def statistics(self):
+        # region Summary
+        """
+        Get the counters of the cache
+        :return: Dictionary of counters
+        """
+        # endregion Summary
+
+        # region Body
+
+        lookups = self.hits + self.misses
+
+        return dict(entries=len(self.entries),
+                    hits=self.hits,
+                    misses=self.misses,
+                    evictions=self.evictions,
+                    hit_rate=self.hits / lookups if lookups > 0 else 0.)
+
+        # endregion Body
+
+    # endregion Functions
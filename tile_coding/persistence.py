@@ -0,0 +1,284 @@
+import importlib
+import json
+import struct
+import types
+
+import numpy as np
+
+from tile_coding.cache import TileCache
+from tile_coding.tiles3 import IHT, ArrayIHT, GridTileCoder
+
+# region Hyper-parameters
+
+# First bytes of every model file
+MAGIC = b"TILEMODL"
+
+# Version of the model format
+VERSION = 1
+
+# Every array starts at a multiple of this many bytes
+ALIGNMENT = 64
+
+# endregion Hyper-parameters
+
+# region Helpers
+
+def align(offset):
+    # region Summary
+    """
+    Round an offset up to the next multiple of ALIGNMENT
+    :param offset: Offset in bytes
+    :return: Aligned offset
+    """
+    # endregion Summary
+
+    # region Body
+
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+    # endregion Body
+
+def split_state(model):
+    # region Summary
+    """
+    Split the attributes of a tile-coded model (ValueFunction, SARSA, ...) into arrays (stored as raw data)
+    and descriptions of everything else (stored in the JSON header).
+    An IHT is converted to an ArrayIHT, so that the hash table is made of arrays too.
+    A sparse trace (e.g. SparseTrace of SARSA(sparse_trace=True)) is folded first, so that its deferred updates are in the
+    stored weights, then its entries are stored as arrays of tiles and values.
+    :param model: Model
+    :return: Dictionary of arrays and dictionary of descriptions
+    """
+    # endregion Summary
+
+    # region Body
+
+    arrays = dict()
+    attributes = dict()
+
+    for name, value in vars(model).items():
+        if isinstance(value, (IHT, ArrayIHT)):
+            table = ArrayIHT.from_iht(value) if isinstance(value, IHT) else value
+            if table.keys is not None:
+                arrays[f"{name}.keys"] = np.ascontiguousarray(table.keys)
+            arrays[f"{name}.values"] = np.ascontiguousarray(table.values)
+            attributes[name] = dict(type="table", size=table.size, overfull_count=table.overfull_count, count=table.count_value,
+                                    key_width=table.key_width, python_hash=table.python_hash)
+
+        elif isinstance(value, TileCache):
+            # Cached tiles are rebuilt on demand, only the configuration and the source of the tiles are kept
+            source = next(other for other, candidate in vars(model).items() if candidate is value.iht_or_size)
+            attributes[name] = dict(type="tile_cache", source=source, num_tilings=value.num_tilings, max_entries=value.max_entries)
+
+        elif hasattr(value, "fold") and hasattr(value, "entries"):
+            # Recognized by its interface, the class lives in the project using it
+            value.fold()
+            source = next(other for other, candidate in vars(model).items() if candidate is value.weights)
+            arrays[f"{name}.tiles"] = np.fromiter(value.entries.keys(), dtype=np.int64, count=len(value.entries))
+            arrays[f"{name}.entries"] = np.fromiter(value.entries.values(), dtype=np.float64, count=len(value.entries))
+            attributes[name] = dict(type="sparse_trace", module=type(value).__module__, name=type(value).__qualname__,
+                                    source=source, threshold=value.threshold, minimum_scale=value.minimum_scale)
+
+        elif isinstance(value, GridTileCoder):
+            attributes[name] = dict(type="grid_tile_coder", state=vars(value))
+
+        elif isinstance(value, types.FunctionType):
+            attributes[name] = dict(type="function", module=value.__module__, name=value.__qualname__)
+
+        elif isinstance(value, np.ndarray):
+            arrays[name] = np.ascontiguousarray(value)
+
+        elif isinstance(value, np.generic):
+            attributes[name] = dict(type="scalar", value=value.item())
+
+        elif value is None or isinstance(value, (bool, int, float, str)):
+            attributes[name] = dict(type="scalar", value=value)
+
+        else:
+            raise TypeError(f"Attribute {name} of type {type(value).__name__} can't be stored in a model file")
+
+    return arrays, attributes
+
+    # endregion Body
+
+def map_array(path, description, data_start, mode):
+    # region Summary
+    """
+    Memory-map 1 array of a model file
+    :param path: Model file path
+    :param description: Description of the array (dtype, shape, offset)
+    :param data_start: Offset of the data section
+    :param mode: Memory-map mode
+    :return: Memory map (or an empty array)
+    """
+    # endregion Summary
+
+    # region Body
+
+    dtype = np.dtype(description["dtype"])
+    shape = tuple(description["shape"])
+
+    # Empty arrays can't be memory-mapped
+    if int(np.prod(shape)) == 0:
+        return np.empty(shape, dtype=dtype)
+
+    return np.memmap(path, dtype=dtype, mode=mode, offset=data_start + description["offset"], shape=shape)
+
+    # endregion Body
+
+# endregion Helpers
+
+# region Functions
+
+def save_model(model, path):
+    # region Summary
+    """
+    Write a tile-coded model (hash table, weights, traces, step sizes, ...) to a single file.
+    Layout: MAGIC, version (uint32), header length (uint32), JSON header, then every array as contiguous raw data
+    starting at an ALIGNMENT-byte boundary, so that it can be memory-mapped in place.
+    :param model: Model (ValueFunction, SARSA, ...)
+    :param path: Model file path
+    """
+    # endregion Summary
+
+    # region Body
+
+    arrays, attributes = split_state(model)
+
+    # Describe every array, offsets are relative to the start of the data section
+    descriptions = dict()
+    offset = 0
+    for name, array in arrays.items():
+        offset = align(offset)
+        descriptions[name] = dict(dtype=array.dtype.str, shape=array.shape, offset=offset)
+        offset += array.nbytes
+
+    header = json.dumps(dict(module=type(model).__module__,
+                             name=type(model).__qualname__,
+                             attributes=attributes,
+                             arrays=descriptions)).encode()
+
+    # The data section starts at an aligned offset after the header
+    data_start = align(len(MAGIC) + 8 + len(header))
+
+    with open(path, "wb") as file:
+        file.write(MAGIC)
+        file.write(struct.pack("<II", VERSION, len(header)))
+        file.write(header)
+
+        for name, array in arrays.items():
+            file.seek(data_start + descriptions[name]["offset"])
+            file.write(array.tobytes())
+
+        # Make sure the file covers the last (possibly empty) array
+        file.truncate(data_start + offset)
+
+    # endregion Body
+
+def read_header(path):
+    # region Summary
+    """
+    Read the JSON header of a model file
+    :param path: Model file path
+    :return: Header and the offset of the data section
+    """
+    # endregion Summary
+
+    # region Body
+
+    with open(path, "rb") as file:
+        if file.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a tile-coded model file")
+
+        version, header_length = struct.unpack("<II", file.read(8))
+        if version != VERSION:
+            raise ValueError(f"Unsupported model file version {version}")
+
+        header = json.loads(file.read(header_length))
+
+    return header, align(len(MAGIC) + 8 + header_length)
+
+    # endregion Body
+
+def load_model(path, mode="r"):
+    # region Summary
+    """
+    Restore a tile-coded model from a model file without copying its arrays: the hash table (as an ArrayIHT),
+    the weights and every other array are memory maps of the file, so processes loading the same file share its pages.
+    :param path: Model file path
+    :param mode: Memory-map mode: "r" (read-only, for evaluation: the table is frozen and unseen tiles get a weight of 0),
+                 "c" (copy-on-write, for warm starts: learning continues in private memory, the file is never modified)
+                 or "r+" (learning is written back to the file)
+    :return: Model
+    """
+    # endregion Summary
+
+    # region Body
+
+    header, data_start = read_header(path)
+    arrays = {name: map_array(path, description, data_start, mode) for name, description in header["arrays"].items()}
+
+    # Create the object without calling its constructor, all attributes come from the model file
+    cls = getattr(importlib.import_module(header["module"]), header["name"])
+    model = cls.__new__(cls)
+
+    caches = dict()
+    traces = dict()
+
+    for name, attribute in header["attributes"].items():
+        if attribute["type"] == "table":
+            table = ArrayIHT.__new__(ArrayIHT)
+            table.size = attribute["size"]
+            table.overfull_count = attribute["overfull_count"]
+            table.values = arrays.pop(f"{name}.values")
+            table.keys = arrays.pop(f"{name}.keys", None)
+            table.key_width = attribute["key_width"]
+            table.capacity = len(table.values)
+            table.mask = table.capacity - 1
+            table.count_value = attribute["count"]
+            table.telemetry = None
+            table.python_hash = attribute["python_hash"]
+            table.frozen = mode == "r"
+            setattr(model, name, table)
+
+        elif attribute["type"] == "tile_cache":
+            # Caches are created once their source is restored
+            caches[name] = attribute
+
+        elif attribute["type"] == "sparse_trace":
+            # Traces are created once the weights they apply to are restored
+            traces[name] = attribute, arrays.pop(f"{name}.tiles"), arrays.pop(f"{name}.entries")
+
+        elif attribute["type"] == "grid_tile_coder":
+            coder = GridTileCoder.__new__(GridTileCoder)
+            coder.__dict__.update(attribute["state"])
+            setattr(model, name, coder)
+
+        elif attribute["type"] == "function":
+            setattr(model, name, getattr(importlib.import_module(attribute["module"]), attribute["name"]))
+
+        else:
+            setattr(model, name, attribute["value"])
+
+    model.__dict__.update(arrays)
+
+    for name, attribute in caches.items():
+        setattr(model, name, TileCache(getattr(model, attribute["source"]), attribute["num_tilings"], attribute["max_entries"]))
+
+    for name, (attribute, tiles, entries) in traces.items():
+        # The trace was folded when saved, so there is no deferred scale or weight increment
+        trace_cls = getattr(importlib.import_module(attribute["module"]), attribute["name"])
+        trace = trace_cls.__new__(trace_cls)
+        trace.weights = getattr(model, attribute["source"])
+        trace.threshold = attribute["threshold"]
+        trace.minimum_scale = attribute["minimum_scale"]
+        trace.entries = dict(zip(tiles.tolist(), entries.tolist()))
+        trace.scale = 1.0
+        trace.increment = 0.0
+        setattr(model, name, trace)
+
+    return model
+
+    # endregion Body
+
+# endregion Functions
@@ -0,0 +1,417 @@
+import os
+import struct
+
+import numpy as np
+
+# region Hyper-parameters
+
+# First bytes of every episode file
+MAGIC = b"EPISODES"
+
+# Version of the episode format (2: per-episode truncation flags)
+VERSION = 2
+
+# First bytes of every chunk
+CHUNK_MAGIC = b"CHNK"
+
+# Every chunk and every column starts at a multiple of this many bytes
+ALIGNMENT = 64
+
+# Columns of a chunk, in file order (dtypes are little-endian, so files are portable)
+columns = (("positions", np.dtype("<f4")), ("velocities", np.dtype("<f4")), ("actions", np.dtype("i1")), ("rewards", np.dtype("<f4")))
+
+# endregion Hyper-parameters
+
+# region Helpers
+
+def align(offset):
+    # region Summary
+    """
+    Round an offset up to the next multiple of ALIGNMENT
+    :param offset: Offset in bytes
+    :return: Aligned offset
+    """
+    # endregion Summary
+
+    # region Body
+
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+    # endregion Body
+
+def chunk_layout(episodes, transitions):
+    # region Summary
+    """
+    Get the offsets of the parts of a chunk, relative to its start
+    :param episodes: Number of episodes in the chunk
+    :param transitions: Number of transitions in the chunk
+    :return: Offset of the episode lengths (followed by 1 truncation flag byte per episode), dictionary of column offsets
+             and the size of the chunk
+    """
+    # endregion Summary
+
+    # region Body
+
+    lengths_offset = align(len(CHUNK_MAGIC) + 12)
+    offset = lengths_offset + 9 * episodes
+
+    offsets = dict()
+    for name, dtype in columns:
+        offset = align(offset)
+        offsets[name] = offset
+        offset += dtype.itemsize * transitions
+
+    return lengths_offset, offsets, align(offset)
+
+    # endregion Body
+
+def scan_chunks(path):
+    # region Summary
+    """
+    Read the chunk headers of an episode file
+    :param path: Episode file path
+    :return: List of (chunk offset, number of episodes, number of transitions) of the complete chunks,
+             and the end of the last complete chunk (a chunk cut off by a crash is left out)
+    """
+    # endregion Summary
+
+    # region Body
+
+    file_size = os.path.getsize(path)
+    chunks = []
+
+    with open(path, "rb") as file:
+        if file.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not an episode file")
+
+        version, = struct.unpack("<I", file.read(4))
+        if version != VERSION:
+            raise ValueError(f"Unsupported episode file version {version}")
+
+        offset = align(len(MAGIC) + 4)
+
+        while offset + len(CHUNK_MAGIC) + 12 <= file_size:
+            file.seek(offset)
+            if file.read(len(CHUNK_MAGIC)) != CHUNK_MAGIC:
+                break
+
+            episodes, transitions = struct.unpack("<IQ", file.read(12))
+            size = chunk_layout(episodes, transitions)[2]
+            if offset + size > file_size:
+                break
+
+            chunks.append((offset, episodes, transitions))
+            offset += size
+
+    return chunks, offset
+
+    # endregion Body
+
+# endregion Helpers
+
+
+class EpisodeRecorder:
+    # region Summary
+    """
+    Opt-in recorder of mountain car episodes (e.g. recorder=... of semi_gradient_n_step_sarsa() or play()).
+    Row t of an episode is (position, velocity, action, reward) at time t: the state, the action selected in it
+    and the reward received when reaching it (0 at time 0), so an episode of T steps has T + 1 rows.
+    Finished episodes are buffered and appended to the file as chunks of columns (float32 positions, velocities and rewards,
+    int8 actions) together with their lengths and truncation flags, so the file is only ever appended to and every column
+    can be memory-mapped. An episode is truncated when it was cut off (by a step budget or limit) before reaching the goal,
+    so its last row isn't a terminal state.
+    """
+    # endregion Summary
+
+    # region Constructor
+
+    def __init__(self, path, chunk_transitions: int = 65536):
+        # region Summary
+        """
+        Constructor of EpisodeRecorder class, creates the file or continues an existing one
+        :param path: Episode file path
+        :param chunk_transitions: Number of buffered rows after which finished episodes are written as a chunk
+        """
+        # endregion Summary
+
+        # region Body
+
+        self.path = path
+        self.chunk_transitions = chunk_transitions
+
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            with open(path, "wb") as file:
+                file.write(MAGIC)
+                file.write(struct.pack("<I", VERSION))
+                file.truncate(align(len(MAGIC) + 4))
+        else:
+            # Drop a chunk cut off by a crash, so that new chunks follow the last complete one
+            _, end = scan_chunks(path)
+            with open(path, "r+b") as file:
+                file.truncate(end)
+
+        # Rows of the current episode, and rows, lengths and truncation flags of the finished episodes which aren't written yet
+        self.episode = []
+        self.buffer = []
+        self.lengths = []
+        self.truncated = []
+
+        # endregion Body
+
+    # endregion Constructor
+
+    # region Functions
+
+    def record(self, position, velocity, action, reward=0.0):
+        # region Summary
+        """
+        Record 1 row of the current episode
+        :param position: Position
+        :param velocity: Velocity
+        :param action: Action selected at this state
+        :param reward: Reward received when reaching this state (0 for the start state)
+        """
+        # endregion Summary
+
+        # region Body
+
+        self.episode.append((position, velocity, action, reward))
+
+        # endregion Body
+
+    def end_episode(self, truncated: bool = False):
+        # region Summary
+        """
+        Finish the current episode (and write a chunk once enough rows are buffered)
+        :param truncated: if True, the episode was cut off before reaching the goal (its last state isn't terminal)
+        """
+        # endregion Summary
+
+        # region Body
+
+        if self.episode:
+            self.buffer.extend(self.episode)
+            self.lengths.append(len(self.episode))
+            self.truncated.append(truncated)
+            self.episode = []
+
+        if len(self.buffer) >= self.chunk_transitions:
+            self.flush()
+
+        # endregion Body
+
+    def flush(self):
+        # region Summary
+        """
+        Append the buffered finished episodes to the file as 1 chunk
+        """
+        # endregion Summary
+
+        # region Body
+
+        if not self.lengths:
+            return
+
+        transitions = len(self.buffer)
+        lengths_offset, offsets, size = chunk_layout(len(self.lengths), transitions)
+        rows = list(zip(*self.buffer))
+
+        with open(self.path, "r+b") as file:
+            start = file.seek(0, os.SEEK_END)
+
+            file.write(CHUNK_MAGIC)
+            file.write(struct.pack("<IQ", len(self.lengths), transitions))
+            file.seek(start + lengths_offset)
+            file.write(np.array(self.lengths, dtype="<i8").tobytes())
+            file.write(np.array(self.truncated, dtype="i1").tobytes())
+
+            for (name, dtype), values in zip(columns, rows):
+                file.seek(start + offsets[name])
+                file.write(np.array(values, dtype=dtype).tobytes())
+
+            file.truncate(start + size)
+            file.flush()
+            os.fsync(file.fileno())
+
+        self.buffer = []
+        self.lengths = []
+        self.truncated = []
+
+        # endregion Body
+
+    def close(self):
+        # region Summary
+        """
+        Write the buffered finished episodes (an unfinished episode is dropped)
+        """
+        # endregion Summary
+
+        # region Body
+
+        self.flush()
+
+        # endregion Body
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exception):
+        self.close()
+
+    # endregion Functions
+
+
+class EpisodeStore:
+    # region Summary
+    """
+    Read-only view of an episode file: the columns of every chunk are memory-mapped, and the rows of episode i are
+    rows offsets[i] ... offsets[i + 1] - 1 of all recorded rows.
+    """
+    # endregion Summary
+
+    # region Constructor
+
+    def __init__(self, path):
+        # region Summary
+        """
+        Constructor of EpisodeStore class
+        :param path: Episode file path
+        """
+        # endregion Summary
+
+        # region Body
+
+        self.path = path
+
+        # Memory maps of the columns of every chunk, and the chunk and first row within the chunk of every episode
+        self.chunks = []
+        chunk_of_episode = []
+        start_of_episode = []
+        lengths = []
+        truncated = []
+
+        chunks, _ = scan_chunks(path)
+
+        for index, (offset, episodes, transitions) in enumerate(chunks):
+            lengths_offset, offsets, _ = chunk_layout(episodes, transitions)
+
+            chunk_lengths = np.fromfile(path, dtype="<i8", count=episodes, offset=offset + lengths_offset)
+            truncated.extend(np.fromfile(path, dtype="i1", count=episodes, offset=offset + lengths_offset + 8 * episodes).tolist())
+            self.chunks.append({name: np.memmap(path, dtype=dtype, mode="r", offset=offset + offsets[name], shape=(transitions,))
+                                for name, dtype in columns})
+
+            chunk_of_episode.extend([index] * episodes)
+            start_of_episode.extend(np.concatenate([[0], np.cumsum(chunk_lengths)[:-1]]).tolist())
+            lengths.extend(chunk_lengths.tolist())
+
+        self.chunk_of_episode = np.array(chunk_of_episode, dtype=np.int64)
+        self.start_of_episode = np.array(start_of_episode, dtype=np.int64)
+        self.lengths = np.array(lengths, dtype=np.int64)
+
+        # Whether every episode was cut off before reaching the goal
+        self.truncated = np.array(truncated, dtype=bool)
+
+        # Offset of the first row of every episode among all recorded rows (and the total number of rows)
+        self.offsets = np.concatenate([[0], np.cumsum(self.lengths)]).astype(np.int64)
+
+        # endregion Body
+
+    # endregion Constructor
+
+    # region Functions
+
+    def __len__(self):
+        return len(self.lengths)
+
+    def episode(self, index):
+        # region Summary
+        """
+        Get the rows of 1 episode without copying them
+        :param index: Episode index (negative indices count from the end)
+        :return: Dictionary of column name: array of shape (rows,), and "truncated": whether the episode was cut off
+        """
+        # endregion Summary
+
+        # region Body
+
+        index = range(len(self))[index]
+        chunk = self.chunks[self.chunk_of_episode[index]]
+        start = self.start_of_episode[index]
+
+        episode = {name: chunk[name][start:start + self.lengths[index]] for name, _ in columns}
+        episode["truncated"] = bool(self.truncated[index])
+
+        return episode
+
+        # endregion Body
+
+    def column(self, name):
+        # region Summary
+        """
+        Get 1 column of all recorded rows (copied into 1 array if there are several chunks)
+        :param name: Column name (positions, velocities, actions or rewards)
+        :return: Array of shape (rows,)
+        """
+        # endregion Summary
+
+        # region Body
+
+        if len(self.chunks) == 1:
+            return self.chunks[0][name]
+
+        return np.concatenate([chunk[name] for chunk in self.chunks]) if self.chunks else np.zeros(0, dtype=dict(columns)[name])
+
+        # endregion Body
+
+    # endregion Functions
+
+# region Functions
+
+def replay(learner, episode, number_of_steps=1):
+    # region Summary
+    """
+    Feed the transitions of a recorded episode back into a learner (ValueFunction, SARSA, ...) without simulating it again:
+    n-step SARSA updates along the recorded states, actions and rewards, with the learner's own value() and learn().
+    With number_of_steps=1 the targets are the ones of play() (reward + value of the next state and action).
+    The last state of a truncated episode isn't terminal, so the returns reaching it bootstrap from its value.
+    Positions and velocities were recorded as float32, so they are close to (not exactly) the simulated ones.
+    :param learner: Learner with value(position, velocity, action) and learn(position, velocity, action, target)
+    :param episode: Episode (dictionary of columns and the truncation flag, as returned by EpisodeStore.episode())
+    :param number_of_steps: Number of steps of the returns
+    """
+    # endregion Summary
+
+    # region Body
+
+    # Python floats and ints are faster to tile than NumPy scalars
+    positions = np.asarray(episode["positions"], dtype=np.float64).tolist()
+    velocities = np.asarray(episode["velocities"], dtype=np.float64).tolist()
+    actions = np.asarray(episode["actions"], dtype=np.int64).tolist()
+    rewards = np.asarray(episode["rewards"], dtype=np.float64).tolist()
+
+    # Length of the episode (denoted as T)
+    episode_length = len(positions) - 1
+    truncated = episode.get("truncated", False)
+
+    # Sum of the rewards of times update time + 1 ... min(T, update time + n)
+    reward_sum = sum(rewards[1:min(episode_length, number_of_steps) + 1])
+
+    for update_time in range(episode_length):
+        returns = reward_sum
+
+        # Add the estimated state-action value of time update time + n if it is within the episode,
+        # or of the last recorded time if the episode was truncated before it
+        if update_time + number_of_steps <= episode_length or truncated:
+            bootstrap_time = min(update_time + number_of_steps, episode_length)
+            returns += learner.value(positions[bootstrap_time], velocities[bootstrap_time], actions[bootstrap_time])
+
+        learner.learn(positions[update_time], velocities[update_time], actions[update_time], returns)
+
+        # The reward of time update time + 1 leaves the return and the reward of time update time + n + 1 enters it
+        reward_sum -= rewards[update_time + 1]
+        if update_time + number_of_steps + 1 <= episode_length:
+            reward_sum += rewards[update_time + number_of_steps + 1]
+
+    # endregion Body
+
+# endregion Functions
@@ -0,0 +1,185 @@
+import multiprocessing
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+
+from tile_coding.tiles3 import ArrayIHT
+
+class SharedIHT(ArrayIHT):
+    # region Summary
+    """
+    ArrayIHT living in multiprocessing.shared_memory, together with 1 weight per index.
+    Every process attached to the same block sees the same table, and the row hash (hash_rows) is deterministic,
+    so all workers map identical (state, action) inputs to identical indices and can feed 1 shared weight vector
+    (Hogwild-style updates, or periodic reductions of private copies).
+    Lookups of stored keys are lock-free. Inserts take the lock and look the key up again, because another process
+    may have stored it meanwhile. Once the table is full, collisions don't modify it and don't take the lock
+    (so overfull_count can miss some of the concurrent collisions).
+    Block layout (int64 unless stated): [count, overfull_count], values (capacity), keys (capacity × key_width),
+    weights (size, float64).
+    """
+    # endregion Summary
+
+    # region Constructor
+
+    def __init__(self, size_val, key_width, name=None, lock=None, create: bool = True):
+        # region Summary
+        """
+        Constructor of SharedIHT class
+        :param size_val: Number of indices (the maximum number of stored keys)
+        :param key_width: Number of coordinates in a key (1 + number of floats + number of ints for tiles())
+        :param name: Name of the shared memory block (generated if None and create)
+        :param lock: Lock guarding inserts, the creator's lock when attaching (a new multiprocessing.Lock if None)
+        :param create: if True, create and initialize a new block, otherwise attach to the existing block called name
+        """
+        # endregion Summary
+
+        # region Body
+
+        self.size = size_val
+        self.key_width = key_width
+
+        # Same table geometry as ArrayIHT
+        self.capacity = 1 << max(1, (2 * size_val - 1).bit_length())
+        self.mask = self.capacity - 1
+
+        words = 2 + self.capacity + self.capacity * key_width + size_val
+        if create:
+            self.memory = SharedMemory(name=name, create=True, size=8 * words)
+        else:
+            # Child processes share the resource tracker of the creator, so attaching doesn't change who frees the block
+            self.memory = SharedMemory(name=name)
+
+        offset = 0
+        self.header = np.ndarray(2, dtype=np.int64, buffer=self.memory.buf, offset=offset)
+        offset += self.header.nbytes
+        self.values = np.ndarray(self.capacity, dtype=np.int64, buffer=self.memory.buf, offset=offset)
+        offset += self.values.nbytes
+        self.keys = np.ndarray((self.capacity, key_width), dtype=np.int64, buffer=self.memory.buf, offset=offset)
+        offset += self.keys.nbytes
+        self.weights = np.ndarray(size_val, dtype=np.float64, buffer=self.memory.buf, offset=offset)
+
+        if create:
+            self.header[:] = 0
+            self.values[:] = -1
+            self.keys[:] = 0
+            self.weights[:] = 0
+
+        self.lock = multiprocessing.Lock() if lock is None else lock
+
+        self.telemetry = None
+        self.python_hash = False
+        self.frozen = False
+
+        # endregion Body
+
+    # endregion Constructor
+
+    # region Functions
+
+    @property
+    def count_value(self):
+        return int(self.header[0])
+
+    @count_value.setter
+    def count_value(self, value):
+        self.header[0] = value
+
+    @property
+    def overfull_count(self):
+        return int(self.header[1])
+
+    @overfull_count.setter
+    def overfull_count(self, value):
+        self.header[1] = value
+
+    @property
+    def name(self):
+        return self.memory.name
+
+    def __reduce__(self):
+        # Other processes attach to the same block (the lock can only be passed when they are started, e.g. in initargs)
+        return SharedIHT, (self.size, self.key_width, self.name, self.lock, False)
+
+    def get_index(self, obj, read_only=False):
+        # region Summary
+        """
+        Get the index of 1 key, inserting it if it is new
+        :param obj: Key (tuple of integers)
+        :param read_only: if True, return None for new keys instead of inserting them
+        :return: Index
+        """
+        # endregion Summary
+
+        # region Body
+
+        index = super().get_index(obj, read_only=True)
+
+        if index is not None or read_only:
+            return index
+
+        if self.full():
+            return super().get_index(obj)
+
+        with self.lock:
+            return super().get_index(obj)
+
+        # endregion Body
+
+    def get_indices(self, keys, read_only=False):
+        # region Summary
+        """
+        Get the indices of many keys at once, inserting the new ones
+        :param keys: Keys of shape (N, key_width)
+        :param read_only: if True, return -1 for new keys instead of inserting them
+        :return: Indices of shape (N,)
+        """
+        # endregion Summary
+
+        # region Body
+
+        keys = np.asarray(keys, dtype=np.int64).reshape(len(keys), -1)
+        indices = super().get_indices(keys, read_only=True)
+
+        missing = indices < 0
+        if read_only or not missing.any():
+            return indices
+
+        if self.full():
+            indices[missing] = super().get_indices(keys[missing])
+        else:
+            with self.lock:
+                indices[missing] = super().get_indices(keys[missing])
+
+        return indices
+
+        # endregion Body
+
+    def close(self):
+        # region Summary
+        """
+        Detach this process from the block (arrays of the table can't be used afterwards)
+        """
+        # endregion Summary
+
+        # region Body
+
+        self.header = self.values = self.keys = self.weights = None
+        self.memory.close()
+
+        # endregion Body
+
+    def unlink(self):
+        # region Summary
+        """
+        Free the block (called once, by the creator, after all processes are done)
+        """
+        # endregion Summary
+
+        # region Body
+
+        self.memory.unlink()
+
+        # endregion Body
+
+    # endregion Functions
@@ -0,0 +1,259 @@
+import heapq
+from collections import Counter
+
+import numpy as np
+
+from tile_coding.tiles3 import ArrayIHT, hash_key, hash_rows
+
+class IHTTelemetry:
+    # region Summary
+    """
+    Occupancy and collision telemetry of an IHT (or ArrayIHT), to size the table from data.
+    Once attached, the table reports every insert and every collision (a new key after the table is full,
+    which shares the index of another key). Lookups of stored keys aren't reported, so the hot path costs nothing.
+    Keys of tiles() are (tiling, float coordinates..., ints...), so the last ints_number coordinates of a key are
+    its int features (e.g. the action) and occupancy and collisions are also counted per int features.
+    Readouts:
+      - load factor, and its history recorded by sample() (e.g. once per episode or every 1000 steps),
+      - collisions: lookups which aliased (overfull_count) and distinct aliased keys,
+      - per-int-feature occupancy (stored keys) and collisions,
+      - probe lengths of an ArrayIHT (a dict doesn't expose its probing).
+    Readouts stay cheap in long over-full runs: only the first max_aliased_keys aliased keys are kept as a sample,
+    and their distinct count is estimated from the aliased_sketch_size smallest key hashes (a K-minimum-values sketch,
+    exact until that many distinct keys aliased).
+    Lookups served by a TileCache (e.g. of ValueFunction or SARSA) don't reach the table, so with a cache collisions
+    and overfull_count only count the lookups which missed the cache, not every lookup like a bare IHT.
+    """
+    # endregion Summary
+
+    # region Constructor
+
+    def __init__(self, iht, ints_number: int = 1, max_aliased_keys: int = 10000, aliased_sketch_size: int = 1024):
+        # region Summary
+        """
+        Constructor of IHTTelemetry class, attaches the telemetry to the table
+        :param iht: IHT or ArrayIHT
+        :param ints_number: Number of int features at the end of every key
+        :param max_aliased_keys: Maximum number of aliased keys kept in aliased_keys
+        :param aliased_sketch_size: Number of smallest aliased key hashes kept to estimate the number of distinct aliased keys
+        """
+        # endregion Summary
+
+        # region Body
+
+        self.iht = iht
+        self.ints_number = ints_number
+
+        # Number of stored keys and of collisions for every combination of int features
+        self.occupancy = Counter()
+        self.collisions = Counter()
+
+        # Sample of the distinct keys which were given the index of another key (the first max_aliased_keys ones)
+        self.max_aliased_keys = max_aliased_keys
+        self.aliased_keys = set()
+
+        # Smallest hashes of the aliased keys (as a max-heap of negated hashes, and as a set)
+        self.aliased_sketch_size = aliased_sketch_size
+        self.aliased_heap = []
+        self.aliased_hashes = set()
+
+        # Samples of (time, number of stored keys, load factor, number of colliding lookups)
+        self.history = []
+
+        # Keys stored before the telemetry was attached
+        if isinstance(iht, ArrayIHT):
+            if iht.keys is not None:
+                self.record_inserts(iht.keys[iht.values >= 0])
+        else:
+            self.record_inserts(iht.dictionary.keys())
+
+        iht.telemetry = self
+
+        # endregion Body
+
+    # endregion Constructor
+
+    # region Functions
+
+    def int_features(self, key):
+        # region Summary
+        """
+        Get the int features of a key
+        :param key: Key (sequence of integers)
+        :return: Tuple of the last ints_number coordinates
+        """
+        # endregion Summary
+
+        # region Body
+
+        return tuple(key[len(key) - self.ints_number:])
+
+        # endregion Body
+
+    def record_inserts(self, keys):
+        # region Summary
+        """
+        Called by the table for newly stored keys
+        :param keys: Keys (sequences of integers or an array of shape (N, key_width))
+        """
+        # endregion Summary
+
+        # region Body
+
+        if isinstance(keys, np.ndarray):
+            keys = keys.tolist()
+
+        self.occupancy.update(self.int_features(key) for key in keys)
+
+        # endregion Body
+
+    def record_collisions(self, keys):
+        # region Summary
+        """
+        Called by the table for lookups of new keys after it is full
+        :param keys: Keys (sequences of integers or an array of shape (N, key_width))
+        """
+        # endregion Summary
+
+        # region Body
+
+        if isinstance(keys, np.ndarray):
+            hashes = hash_rows(keys).tolist()
+            keys = keys.tolist()
+        else:
+            keys = [tuple(key) for key in keys]
+            hashes = [hash_key(key) for key in keys]
+
+        for key, key_hash in zip(keys, hashes):
+            self.collisions[self.int_features(key)] += 1
+
+            if len(self.aliased_keys) < self.max_aliased_keys:
+                self.aliased_keys.add(tuple(key))
+
+            # Keep the aliased_sketch_size smallest distinct hashes
+            if key_hash in self.aliased_hashes:
+                continue
+            if len(self.aliased_heap) < self.aliased_sketch_size:
+                heapq.heappush(self.aliased_heap, -key_hash)
+                self.aliased_hashes.add(key_hash)
+            elif key_hash < -self.aliased_heap[0]:
+                self.aliased_hashes.discard(-heapq.heappushpop(self.aliased_heap, -key_hash))
+                self.aliased_hashes.add(key_hash)
+
+        # endregion Body
+
+    def aliased_key_count(self):
+        # region Summary
+        """
+        Estimate the number of distinct aliased keys (exact while fewer than aliased_sketch_size keys aliased)
+        :return: Number of distinct aliased keys
+        """
+        # endregion Summary
+
+        # region Body
+
+        if len(self.aliased_heap) < self.aliased_sketch_size:
+            return len(self.aliased_heap)
+
+        # Hashes are uniform on [0, 2^64), so the k-th smallest of d distinct ones is about k / d of the range
+        return int(round((self.aliased_sketch_size - 1) / (-self.aliased_heap[0] / 2 ** 64)))
+
+        # endregion Body
+
+    def load_factor(self):
+        # region Summary
+        """
+        Get the share of indices in use
+        :return: Load factor
+        """
+        # endregion Summary
+
+        # region Body
+
+        return self.iht.count() / self.iht.size
+
+        # endregion Body
+
+    def sample(self, time=None):
+        # region Summary
+        """
+        Record the current load factor and collision count
+        :param time: Time of the sample (e.g. episode or step), the number of earlier samples if None
+        """
+        # endregion Summary
+
+        # region Body
+
+        self.history.append((len(self.history) if time is None else time, self.iht.count(), self.load_factor(), self.iht.overfull_count))
+
+        # endregion Body
+
+    def load_factor_history(self):
+        # region Summary
+        """
+        Get the recorded samples
+        :return: Times, numbers of stored keys, load factors and numbers of colliding lookups, each of shape (samples,)
+        """
+        # endregion Summary
+
+        # region Body
+
+        history = np.array(self.history, dtype=float).reshape(-1, 4)
+
+        return history[:, 0], history[:, 1].astype(np.int64), history[:, 2], history[:, 3].astype(np.int64)
+
+        # endregion Body
+
+    def probe_lengths(self):
+        # region Summary
+        """
+        Get the probe length histogram of an ArrayIHT: the number of slots a lookup of every stored key visits
+        :return: Histogram (element i is the number of keys found after i + 1 probes), None for an IHT
+        """
+        # endregion Summary
+
+        # region Body
+
+        if not isinstance(self.iht, ArrayIHT):
+            return None
+
+        slots = np.flatnonzero(self.iht.values >= 0)
+        if slots.size == 0:
+            return np.zeros(0, dtype=np.int64)
+
+        # Distance from the slot the key hashes to (wrapping around the end of the table)
+        home = (hash_rows(self.iht.keys[slots]) & np.uint64(self.iht.mask)).astype(np.int64)
+        lengths = ((slots - home) & self.iht.mask) + 1
+
+        return np.bincount(lengths)[1:]
+
+        # endregion Body
+
+    def summary(self):
+        # region Summary
+        """
+        Get all readouts at once
+        :return: Dictionary of readouts
+        """
+        # endregion Summary
+
+        # region Body
+
+        summary = dict(size=self.iht.size,
+                       count=self.iht.count(),
+                       load_factor=self.load_factor(),
+                       colliding_lookups=self.iht.overfull_count,
+                       aliased_keys=self.aliased_key_count(),
+                       occupancy=dict(self.occupancy),
+                       collisions=dict(self.collisions))
+
+        probe_lengths = self.probe_lengths()
+        if probe_lengths is not None and probe_lengths.size:
+            summary["probe_length_mean"] = float(np.dot(np.arange(1, probe_lengths.size + 1), probe_lengths) / probe_lengths.sum())
+            summary["probe_length_max"] = probe_lengths.size
+
+        return summary
+
+        # endregion Body
+
+    # endregion Functions
@@ -0,0 +1,678 @@
+from math import floor
+
+import numpy as np
+
+# region Summary
+"""
+Following are some utilities for tile coding from R. Sutton.
+They were copied from http://incompleteideas.net/tiles/tiles3.py-remove with some naming convention changes,
+and are shared by mountain-car, mountain-car-et and access-control.
+"""
+# endregion Summary
+
+class IHT:
+    # region Summary
+    """
+    Index Hash Table - a structure to handle collisions
+    """
+    # endregion Summary
+
+    # region Constructor
+
+    def __init__(self, size_val):
+        self.size = size_val
+        self.overfull_count = 0
+        self.dictionary = {}
+
+        # Optional IHTTelemetry, told about every insert and collision (lookups of stored keys aren't reported)
+        self.telemetry = None
+
+    # endregion Constructor
+
+    # region Functions
+
+    def count(self):
+        return len(self.dictionary)
+
+    def full(self):
+        return len(self.dictionary) >= self.size
+
+    def get_index(self, obj, read_only=False):
+        d = self.dictionary
+        if obj in d:
+            return d[obj]
+        elif read_only:
+            return None
+        size = self.size
+        count = self.count()
+        if count >= size:
+            if self.overfull_count == 0: print('IHT full, starting to allow collisions')
+            self.overfull_count += 1
+            if self.telemetry is not None: self.telemetry.record_collisions([obj])
+            return hash(obj) % self.size
+        else:
+            d[obj] = count
+            if self.telemetry is not None: self.telemetry.record_inserts([obj])
+            return count
+
+    # endregion Functions
+
+
+class ArrayIHT:
+    # region Summary
+    """
+    Index Hash Table backed by NumPy arrays - a drop-in replacement for IHT.
+    Keys (integer coordinate rows of a fixed width) and their indices are stored in flat arrays with open addressing
+    (linear probing) on a table of at least twice the size, hashed with a deterministic integer hash (hash_rows).
+    Unlike IHT, lookups and inserts of many keys can be done at once (get_indices) and the table can be copied,
+    saved or shared as plain arrays. Collisions after the table is full follow IHT: overfull_count is incremented
+    and the index is the key's hash modulo the size.
+    """
+    # endregion Summary
+
+    # region Constructor
+
+    def __init__(self, size_val, key_width=None):
+        # region Summary
+        """
+        Constructor of ArrayIHT class
+        :param size_val: Number of indices (the maximum number of stored keys)
+        :param key_width: Number of coordinates in a key, set by the first lookup if None
+        """
+        # endregion Summary
+
+        # region Body
+
+        self.size = size_val
+        self.overfull_count = 0
+
+        # Number of slots: the smallest power of 2 which is at least twice the size, so the load factor stays ≤ 0.5
+        self.capacity = 1 << max(1, (2 * size_val - 1).bit_length())
+        self.mask = self.capacity - 1
+
+        # Index stored in every slot (-1 for empty slots) and the key of every slot
+        self.values = np.full(self.capacity, -1, dtype=np.int64)
+        self.keys = None
+        self.key_width = None
+        if key_width is not None:
+            self.set_key_width(key_width)
+
+        # Number of stored keys
+        self.count_value = 0
+
+        # Optional IHTTelemetry, told about every insert and collision (lookups of stored keys aren't reported)
+        self.telemetry = None
+
+        # If True, collisions use hash() of the key tuple like IHT (set for tables converted from an IHT, see from_iht)
+        self.python_hash = False
+
+        # If True, new keys are never stored (e.g. the arrays are memory-mapped read-only): they get the next free index,
+        # whose weight is still 0 exactly like the weight of a newly stored key
+        self.frozen = False
+
+        # endregion Body
+
+    # endregion Constructor
+
+    # region Functions
+
+    @classmethod
+    def from_iht(cls, iht):
+        # region Summary
+        """
+        Convert an IHT to an ArrayIHT with the same indices (collisions also keep using hash() of the key tuple)
+        :param iht: IHT
+        :return: ArrayIHT
+        """
+        # endregion Summary
+
+        # region Body
+
+        table = cls(iht.size)
+        table.python_hash = True
+
+        # Inserting the keys in order of their indices assigns the same indices
+        keys = sorted(iht.dictionary, key=iht.dictionary.get)
+        if keys:
+            table.get_indices(np.array(keys, dtype=np.int64))
+
+        table.overfull_count = iht.overfull_count
+
+        return table
+
+        # endregion Body
+
+    def set_key_width(self, key_width):
+        # region Summary
+        """
+        Allocate the key array for keys of the given width (only once)
+        :param key_width: Number of coordinates in a key
+        """
+        # endregion Summary
+
+        # region Body
+
+        if self.key_width is None:
+            self.key_width = key_width
+            self.keys = np.zeros((self.capacity, key_width), dtype=np.int64)
+        elif self.key_width != key_width:
+            raise ValueError(f"Keys of width {key_width} don't fit a table of keys of width {self.key_width}")
+
+        # endregion Body
+
+    def count(self):
+        return self.count_value
+
+    def full(self):
+        return self.count_value >= self.size
+
+    def collide(self, keys, hashes):
+        # region Summary
+        """
+        Handle lookups of new keys when the table is full (like IHT)
+        :param keys: Keys of shape (N, key_width)
+        :param hashes: Hashes of the keys of shape (N,)
+        :return: Indices (hash modulo size) of shape (N,)
+        """
+        # endregion Summary
+
+        # region Body
+
+        if self.overfull_count == 0: print('IHT full, starting to allow collisions')
+        self.overfull_count += len(hashes)
+
+        if self.python_hash:
+            return np.array([hash(tuple(key)) % self.size for key in keys.tolist()], dtype=np.int64)
+
+        return (hashes % np.uint64(self.size)).astype(np.int64)
+
+        # endregion Body
+
+    def get_index(self, obj, read_only=False):
+        # region Summary
+        """
+        Get the index of 1 key, inserting it if it is new
+        :param obj: Key (tuple of integers)
+        :param read_only: if True, return None for new keys instead of inserting them
+        :return: Index
+        """
+        # endregion Summary
+
+        # region Body
+
+        key = [int(coordinate) for coordinate in obj]
+        self.set_key_width(len(key))
+
+        h = hash_key(key)
+        position = h & self.mask
+
+        # Linear probing until the key or an empty slot is found
+        while self.values[position] >= 0:
+            if self.keys[position].tolist() == key:
+                return int(self.values[position])
+            position = (position + 1) & self.mask
+
+        if read_only:
+            return None
+
+        if self.count_value >= self.size:
+            if self.telemetry is not None: self.telemetry.record_collisions([key])
+            return int(self.collide(np.array([key]), np.array([h], dtype=np.uint64))[0])
+
+        if self.frozen:
+            return self.count_value
+
+        self.keys[position] = key
+        self.values[position] = self.count_value
+        self.count_value += 1
+        if self.telemetry is not None: self.telemetry.record_inserts([key])
+
+        return self.count_value - 1
+
+        # endregion Body
+
+    def get_indices(self, keys, read_only=False):
+        # region Summary
+        """
+        Get the indices of many keys at once, inserting the new ones.
+        Indices of new keys are assigned in order of first appearance, exactly as calling get_index() key by key.
+        :param keys: Keys of shape (N, key_width)
+        :param read_only: if True, return -1 for new keys instead of inserting them
+        :return: Indices of shape (N,)
+        """
+        # endregion Summary
+
+        # region Body
+
+        keys = np.asarray(keys, dtype=np.int64).reshape(len(keys), -1)
+        self.set_key_width(keys.shape[1])
+
+        hashes = hash_rows(keys)
+        indices = np.full(len(keys), -1, dtype=np.int64)
+
+        # region Lookup
+
+        # Probe all keys in lockstep: every round, every unresolved key looks at its next slot
+        positions = (hashes & np.uint64(self.mask)).astype(np.int64)
+        missing = np.zeros(len(keys), dtype=bool)
+        pending = np.arange(len(keys))
+
+        while pending.size:
+            slots = positions[pending]
+            values = self.values[slots]
+            empty = values < 0
+            match = ~empty & np.all(self.keys[slots] == keys[pending], axis=1)
+
+            indices[pending[match]] = values[match]
+            missing[pending[empty]] = True
+
+            # Keys which found an occupied slot of another key move on
+            pending = pending[~empty & ~match]
+            positions[pending] = (positions[pending] + 1) & self.mask
+
+        # endregion Lookup
+
+        if read_only or not missing.any():
+            return indices
+
+        # A frozen table gives new keys the next free index (with a weight of 0) until it is full
+        if self.frozen and self.count_value < self.size:
+            indices[missing] = self.count_value
+            return indices
+
+        # region Insert
+
+        # Distinct new keys in order of first appearance, found by their hashes (sorting 1 column is much faster than
+        # sorting rows) unless 2 different keys share a 64-bit hash
+        missing_rows = np.flatnonzero(missing)
+        missing_keys = keys[missing_rows]
+        _, first, inverse = np.unique(hashes[missing_rows], return_index=True, return_inverse=True)
+        inverse = inverse.reshape(-1)
+        if not np.array_equal(missing_keys[first[inverse]], missing_keys):
+            _, first, inverse = np.unique(missing_keys, axis=0, return_index=True, return_inverse=True)
+            inverse = inverse.reshape(-1)
+        new_keys = missing_keys[first]
+        ranks = np.empty(len(new_keys), dtype=np.int64)
+        ranks[np.argsort(first)] = np.arange(len(new_keys))
+
+        # Only the first keys fit into the rest of the table
+        inserted = ranks < self.size - self.count_value
+        new_indices = np.where(inserted, self.count_value + ranks, -1)
+
+        # Claim empty slots in rounds: when several keys reach the same empty slot, the earliest key gets it
+        candidates = np.flatnonzero(inserted)
+        candidate_positions = positions[missing_rows[first[candidates]]]
+        while candidates.size:
+            free = self.values[candidate_positions] < 0
+
+            # Sort free claims by slot, then by rank, and keep the first claim of every slot
+            claims = np.flatnonzero(free)
+            claims = claims[np.lexsort((ranks[candidates[claims]], candidate_positions[claims]))]
+            winners = claims[np.r_[True, np.diff(candidate_positions[claims]) != 0]] if claims.size else claims
+
+            self.keys[candidate_positions[winners]] = new_keys[candidates[winners]]
+            self.values[candidate_positions[winners]] = new_indices[candidates[winners]]
+
+            # Everybody else probes the next slot
+            remaining = np.ones(candidates.size, dtype=bool)
+            remaining[winners] = False
+            candidates = candidates[remaining]
+            candidate_positions = (candidate_positions[remaining] + 1) & self.mask
+
+        self.count_value += int(np.count_nonzero(inserted))
+        if self.telemetry is not None: self.telemetry.record_inserts(new_keys[inserted])
+
+        # New keys which didn't fit collide like in IHT
+        overfull = ~inserted[inverse]
+        if overfull.any():
+            if self.telemetry is not None: self.telemetry.record_collisions(missing_keys[overfull])
+            new_indices = new_indices[inverse]
+            new_indices[overfull] = self.collide(missing_keys[overfull], hashes[missing_rows[overfull]])
+            indices[missing_rows] = new_indices
+        else:
+            indices[missing_rows] = new_indices[inverse]
+
+        # endregion Insert
+
+        return indices
+
+        # endregion Body
+
+    # endregion Functions
+
+
+class GridTileCoder:
+    # region Summary
+    """
+    Tile coder for bounded domains: every tile index is computed arithmetically, without a hash table or collisions.
+    Tilings are the same as in tiles() (a float is gridded at unit intervals, tiling t is offset by t * (1 + 2j) / num_tilings
+    along float j), so 2 states share a tile exactly when they share it in tiles().
+    Since the floats and ints are bounded, every tiling only covers a finite grid of tiles:
+    index = tiling * tiling_size + Σ_j (coordinate_j - lowest coordinate_j) * stride_j + ints part.
+    """
+    # endregion Summary
+
+    # region Constructor
+
+    def __init__(self, num_tilings, float_bounds, int_bounds=()):
+        # region Summary
+        """
+        Constructor of GridTileCoder class
+        :param num_tilings: Number of tilings (like in tiles())
+        :param float_bounds: (minimum, maximum) of every float variable, after the scaling done before calling tiles
+        :param int_bounds: (minimum, maximum) of every integer variable (both inclusive)
+        """
+        # endregion Summary
+
+        # region Body
+
+        self.num_tilings = num_tilings
+
+        # Range of the quantized floats, floor(f * num_tilings)
+        self.q_bounds = [(floor(low * num_tilings), floor(high * num_tilings)) for low, high in float_bounds]
+        self.int_bounds = [(int(low), int(high)) for low, high in int_bounds]
+
+        # Coordinates grow with the tiling, so the lowest one is in tiling 0 and the highest one in the last tiling
+        self.low_coords = [q_low // num_tilings for q_low, _ in self.q_bounds]
+        high_coords = [(q_high + (num_tilings - 1) * (1 + 2 * j)) // num_tilings for j, (_, q_high) in enumerate(self.q_bounds)]
+
+        # Number of tiles along every float and number of values of every int
+        self.shape = ([high - low + 1 for low, high in zip(self.low_coords, high_coords)] +
+                      [high - low + 1 for low, high in self.int_bounds])
+
+        # Row-major strides within 1 tiling
+        self.strides = [int(np.prod(self.shape[j + 1:])) for j in range(len(self.shape))]
+
+        # Number of tiles of 1 tiling and of all tilings
+        self.tiling_size = int(np.prod(self.shape))
+        self.size = num_tilings * self.tiling_size
+
+        # Offset of float j in tiling t is t * (1 + 2j), listed per float
+        self.offsets = [[tiling * (1 + 2 * j) for tiling in range(num_tilings)] for j in range(len(self.q_bounds))]
+
+        # First index of every tiling, shifted so that the lowest coordinates map to 0
+        shift = sum(low * stride for low, stride in zip(self.low_coords, self.strides))
+        self.tiling_starts = [tiling * self.tiling_size - shift for tiling in range(num_tilings)]
+
+        # endregion Body
+
+    # endregion Constructor
+
+    # region Functions
+
+    def tiles(self, floats, ints=None):
+        # region Summary
+        """
+        Maps floating and integer variables to a list of tiles (a drop-in for tiles() with an IHT)
+        :param floats: Float variables, within float_bounds
+        :param ints: Integer variables, within int_bounds
+        :return: Num-tilings tile indices corresponding to the floats and ints
+        """
+        # endregion Summary
+
+        # region Body
+
+        if ints is None:
+            ints = []
+
+        num_tilings = self.num_tilings
+        q_floats = [floor(f * num_tilings) for f in floats]
+
+        for q, (q_low, q_high) in zip(q_floats, self.q_bounds):
+            if not q_low <= q <= q_high:
+                raise ValueError(f"Float variables {floats} are out of bounds")
+
+        # Ints select the same tile in every tiling
+        base = 0
+        for value, (low, high), stride in zip(ints, self.int_bounds, self.strides[len(q_floats):]):
+            if not low <= value <= high:
+                raise ValueError(f"Integer variables {ints} are out of bounds")
+            base += (value - low) * stride
+
+        # Contribution of every float to the index in every tiling
+        columns = [[(q + offset) // num_tilings * stride for offset in offsets]
+                   for q, offsets, stride in zip(q_floats, self.offsets, self.strides)]
+
+        return [sum(parts) + base for parts in zip(self.tiling_starts, *columns)]
+
+        # endregion Body
+
+    def tiles_batch(self, floats, ints=None):
+        # region Summary
+        """
+        Maps many states at once to tiles, the batched counterpart of tiles()
+        :param floats: Float variables of shape (N, d), within float_bounds
+        :param ints: Integer variables: None, an array of shape (N, m), or a sequence of m integers shared by all states
+        :return: Tile indices of shape (N, num_tilings)
+        """
+        # endregion Summary
+
+        # region Body
+
+        floats = np.atleast_2d(np.asarray(floats, dtype=float))
+        n, d = floats.shape
+
+        q_floats = np.floor(floats * self.num_tilings).astype(np.int64)
+        q_bounds = np.array(self.q_bounds, dtype=np.int64).reshape(d, 2)
+        if np.any(q_floats < q_bounds[:, 0]) or np.any(q_floats > q_bounds[:, 1]):
+            raise ValueError("Float variables are out of bounds")
+
+        strides = np.array(self.strides, dtype=np.int64)
+
+        # Ints select the same tile in every tiling, shape (N,)
+        base = np.zeros(n, dtype=np.int64)
+        if ints is not None and len(self.int_bounds):
+            ints = np.broadcast_to(np.asarray(ints, dtype=np.int64), (n, len(self.int_bounds)))
+            int_bounds = np.array(self.int_bounds, dtype=np.int64)
+            if np.any(ints < int_bounds[:, 0]) or np.any(ints > int_bounds[:, 1]):
+                raise ValueError("Integer variables are out of bounds")
+            base = (ints - int_bounds[:, 0]) @ strides[d:]
+
+        tilings = np.arange(self.num_tilings)
+
+        # Offset of float j in tiling t is t * (1 + 2j), shape (num_tilings, d)
+        offsets = tilings[:, np.newaxis] * (1 + 2 * np.arange(d))
+
+        # Coordinates relative to the lowest ones, shape (N, num_tilings, d)
+        coords = (q_floats[:, np.newaxis, :] + offsets[np.newaxis, :, :]) // self.num_tilings - np.array(self.low_coords, dtype=np.int64)
+
+        return tilings * self.tiling_size + coords @ strides[:d] + base[:, np.newaxis]
+
+        # endregion Body
+
+    # endregion Functions
+
+
+# region Functions
+
+def hash_key(key):
+    # region Summary
+    """
+    Deterministic 64-bit hash of 1 key (the scalar counterpart of hash_rows, both give the same hash)
+    :param key: List of integers
+    :return: Hash
+    """
+    # endregion Summary
+
+    # region Body
+
+    mask = 0xFFFFFFFFFFFFFFFF
+    h = 0
+    for coordinate in key:
+        # Mix every coordinate into the hash with the splitmix64 finalizer
+        z = ((h ^ (coordinate & mask)) + 0x9E3779B97F4A7C15) & mask
+        z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & mask
+        z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & mask
+        h = z ^ (z >> 31)
+
+    return h
+
+    # endregion Body
+
+def hash_rows(keys):
+    # region Summary
+    """
+    Deterministic 64-bit hash of every row of an integer array (unlike hash(), it doesn't change between processes)
+    :param keys: Keys of shape (N, key_width)
+    :return: Hashes of shape (N,)
+    """
+    # endregion Summary
+
+    # region Body
+
+    keys = np.asarray(keys, dtype=np.int64).view(np.uint64)
+    h = np.zeros(len(keys), dtype=np.uint64)
+
+    for column in keys.T:
+        # Mix every coordinate into the hash with the splitmix64 finalizer (uint64 arithmetic wraps around)
+        z = (h ^ column) + np.uint64(0x9E3779B97F4A7C15)
+        z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+        h = z ^ (z >> np.uint64(31))
+
+    return h
+
+    # endregion Body
+
+def hash_coords(coordinates, m, read_only=False):
+    # region Summary
+    """
+    Hash coordinates.
+    :param coordinates: Coordinates
+    :param m: Either an IHT (or ArrayIHT) of a given size, or an integer "size" (range of the indices from 0)
+    :param read_only: Read-only?
+    :return: Hash coordinates
+    """
+    # endregion Summary
+
+    # region Body
+
+    if isinstance(m, (IHT, ArrayIHT)):
+        return m.get_index(tuple(coordinates), read_only)
+
+    if isinstance(m, int):
+        return hash(tuple(coordinates)) % m
+
+    if m is None:
+        return coordinates
+
+    # endregion Body
+
+def tiles(iht_or_size, num_tilings, floats, ints=None, read_only=False):
+    # region Summary
+    """
+    Maps floating and integer variables to a list of tiles
+    :param iht_or_size: Either an IHT of a given size, or an integer "size" (range of the indices from 0)
+    :param num_tilings: Should be a power of 2. To make the offsetting work properly,
+                        it should also be greater than or equal to 4 times the number of floats.
+    :param floats: The float variables will be gridded at unit intervals,
+                   so generalization will be by approximately 1 in each direction,
+                   and any scaling will have to be done externally before calling tiles.
+    :param ints: Integer variables
+    :param read_only: Read-only?
+    :return: Num-tilings tile indices corresponding to the floats and ints
+    """
+    # endregion Summary
+
+    # region Body
+
+    if ints is None:
+        ints = []
+
+    q_floats = [floor(f * num_tilings) for f in floats]
+
+    tiles = []
+
+    for tiling in range(num_tilings):
+        tilingX2 = tiling * 2
+
+        coords = [tiling]
+
+        b = tiling
+
+        for q in q_floats:
+            coords.append((q + b) // num_tilings)
+
+            b += tilingX2
+
+        coords.extend(ints)
+
+        tiles.append(hash_coords(coords, iht_or_size, read_only))
+
+    return tiles
+
+    # endregion Body
+
+def tiles_batch(iht_or_size, num_tilings, floats, ints=None, read_only=False):
+    # region Summary
+    """
+    Maps many states at once to tiles, the batched counterpart of tiles()
+    :param iht_or_size: Either an IHT (or ArrayIHT) of a given size, or an integer "size" (range of the indices from 0)
+    :param num_tilings: Should be a power of 2. To make the offsetting work properly,
+                        it should also be greater than or equal to 4 times the number of floats.
+    :param floats: Float variables of shape (N, d), gridded at unit intervals like in tiles()
+    :param ints: Integer variables: None, an array of shape (N, m), or a sequence of m integers shared by all states
+    :param read_only: Read-only?
+    :return: Tile indices of shape (N, num_tilings), row i is equal to tiles() of state i
+             (with an IHT, new indices are assigned in the same order as calling tiles() state by state)
+    """
+    # endregion Summary
+
+    # region Body
+
+    floats = np.atleast_2d(np.asarray(floats, dtype=float))
+    n = floats.shape[0]
+
+    if ints is None:
+        ints = np.zeros((n, 0), dtype=np.int64)
+    else:
+        ints = np.asarray(ints, dtype=np.int64)
+        if ints.ndim == 1:
+            ints = np.broadcast_to(ints, (n, len(ints)))
+
+    tilings = np.arange(num_tilings)
+
+    # Quantized floats of shape (N, d)
+    q_floats = np.floor(floats * num_tilings).astype(np.int64)
+
+    # Offset of float j in tiling t is t * (1 + 2j), shape (num_tilings, d)
+    offsets = tilings[:, np.newaxis] * (1 + 2 * np.arange(floats.shape[1]))
+
+    # Coordinates of shape (N, num_tilings, 1 + d + m): tiling, offset quantized floats, ints
+    coords = np.concatenate([np.broadcast_to(tilings[np.newaxis, :, np.newaxis], (n, num_tilings, 1)),
+                             (q_floats[:, np.newaxis, :] + offsets[np.newaxis, :, :]) // num_tilings,
+                             np.broadcast_to(ints[:, np.newaxis, :], (n, num_tilings, ints.shape[1]))], axis=2)
+
+    if iht_or_size is None:
+        return coords
+
+    # An ArrayIHT looks up all coordinate rows at once
+    if isinstance(iht_or_size, ArrayIHT):
+        return iht_or_size.get_indices(coords.reshape(n * num_tilings, -1), read_only).reshape(n, num_tilings)
+
+    rows = coords.reshape(n * num_tilings, -1)
+
+    # Read-only lookups don't change the table (or its counters), so every distinct tile is hashed only once
+    # (states close to each other, e.g. of an evaluation grid, share most of their tiles)
+    inverse = None
+    if read_only:
+        _, first, inverse = np.unique(hash_rows(rows), return_index=True, return_inverse=True)
+        inverse = inverse.reshape(-1)
+        if np.array_equal(rows[first[inverse]], rows):
+            rows = rows[first]
+        else:
+            inverse = None
+
+    # Only hashing is left per tile, coordinate rows are converted to Python ints in 1 call
+    indices = [hash_coords(coordinates, iht_or_size, read_only) for coordinates in rows.tolist()]
+
+    # Tiles missing from a read-only IHT are marked with -1
+    indices = np.array([-1 if index is None else index for index in indices], dtype=np.int64)
+    if inverse is not None:
+        indices = indices[inverse]
+
+    return indices.reshape(n, num_tilings)
+
+    # endregion Body
+
+# endregion Functions